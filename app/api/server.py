@@ -1,15 +1,30 @@
 from __future__ import annotations
-from fastapi import FastAPI, Depends, HTTPException, status
+from contextlib import asynccontextmanager
+from fastapi import FastAPI, Depends, HTTPException, WebSocket, WebSocketDisconnect, status
 from fastapi.security import HTTPBasic, HTTPBasicCredentials
-from fastapi.responses import JSONResponse, Response, HTMLResponse
+from fastapi.responses import JSONResponse, Response, HTMLResponse, StreamingResponse
+import asyncio
 import base64
 
+from app.api.streaming import BOUNDARY, StreamHub
 from app.core.config import CONFIG
-from app.core.redis_client import RedisCache
+from app.core.redis_client import AsyncRedisCache
+from app.utils.metrics import METRICS, render_prometheus
 
 security = HTTPBasic()
-app = FastAPI(title="Pi Live Detect")
-cache = RedisCache()
+# asyncio-native Redis access: handlers await their own pooled connection
+# instead of blocking the event loop on every call
+cache = AsyncRedisCache()
+hub = StreamHub(cache)
+
+
+@asynccontextmanager
+async def lifespan(_: FastAPI):
+    yield
+    await cache.close()
+
+
+app = FastAPI(title="Pi Live Detect", lifespan=lifespan)
 
 
 def check_auth(credentials: HTTPBasicCredentials = Depends(security)):
@@ -24,6 +39,21 @@ def check_auth(credentials: HTTPBasicCredentials = Depends(security)):
     return True
 
 
+def _ws_authorized(websocket: WebSocket) -> bool:
+    """Basic auth for WebSockets: the Authorization header, or `?auth=<base64 user:pass>` for browsers."""
+    header = websocket.headers.get("authorization", "")
+    token = header[6:] if header.lower().startswith("basic ") else websocket.query_params.get("auth", "")
+    try:
+        username, _, password = base64.b64decode(token).decode("utf-8").partition(":")
+    except Exception:
+        return False
+    return username == CONFIG.api.username and password == CONFIG.api.password
+
+
+def _known_stream(name: str) -> bool:
+    return any(s.name == name for s in CONFIG.rtsp_streams)
+
+
 @app.get("/config", response_class=JSONResponse)
 async def get_config(_: bool = Depends(check_auth)):
     return CONFIG.model_dump()
@@ -31,16 +61,23 @@ async def get_config(_: bool = Depends(check_auth)):
 
 @app.get("/cache/keys")
 async def list_cache_keys(_: bool = Depends(check_auth)):
-    return {"keys": cache.list_keys("*")}
+    """Live keys of known streams, loggers, probes and metrics, from the key indexes (no SCAN)."""
+    return {"keys": await cache.indexed_keys()}
+
+
+@app.get("/admin/cache/scan")
+async def scan_cache_keys(pattern: str = "*", limit: int = 1000, _: bool = Depends(check_auth)):
+    """Debugging: SCAN the whole keyspace (O(keyspace), do not poll)."""
+    return {"keys": await cache.list_keys(pattern, limit=limit)}
 
 
 @app.get("/cache/get")
 async def cache_get(key: str, _: bool = Depends(check_auth)):
-    data = cache.get_json(key)
+    data = await cache.get_json(key)
     if data is not None:
         return data
     # maybe it's a frame
-    raw = cache.get_frame(key)
+    raw = await cache.get_frame(key)
     if raw:
         return Response(content=raw, media_type="image/jpeg")
     raise HTTPException(status_code=404, detail="not found")
@@ -48,7 +85,16 @@ async def cache_get(key: str, _: bool = Depends(check_auth)):
 
 @app.get("/streams/{name}/frame.jpg")
 async def get_stream_frame(name: str, _: bool = Depends(check_auth)):
-    raw = cache.get_frame(f"frame:{name}") or cache.get_frame(name)
+    if not _known_stream(name):
+        raise HTTPException(status_code=404, detail="unknown stream")
+    # Tell on-demand ingestors someone is watching; they start encoding within ~1s
+    await cache.touch_viewer(name, CONFIG.api.viewer_lease_seconds)
+    raw = await cache.get_frame(name) or await cache.get_frame(f"frame:{name}")
+    for _ in range(15):
+        if raw:
+            break
+        await asyncio.sleep(0.1)
+        raw = await cache.get_frame(name)
     if raw:
         return Response(content=raw, media_type="image/jpeg")
     raise HTTPException(status_code=404, detail="no frame")
@@ -56,21 +102,113 @@ async def get_stream_frame(name: str, _: bool = Depends(check_auth)):
 
 @app.get("/streams/{name}/annotated.jpg")
 async def get_stream_ann(name: str, _: bool = Depends(check_auth)):
-    raw = cache.get_frame(f"frame:annotated:{name}") or cache.get_frame(f"annotated:{name}")
+    raw = await cache.get_frame(f"annotated:{name}") or await cache.get_frame(f"frame:annotated:{name}")
     if raw:
         return Response(content=raw, media_type="image/jpeg")
     raise HTTPException(status_code=404, detail="no annotated frame")
 
 
+@app.get("/streams/{name}/annotated.mjpg")
+async def stream_annotated_mjpeg(name: str, _: bool = Depends(check_auth)):
+    """Annotated frames pushed as they are produced (multipart/x-mixed-replace, usable as an <img> src)."""
+    if not _known_stream(name):
+        raise HTTPException(status_code=404, detail="unknown stream")
+    sub = hub.subscribe(name)
+
+    async def parts():
+        try:
+            while True:
+                result = await sub.get()
+                if result.part is not None:
+                    yield result.part
+        finally:
+            hub.unsubscribe(sub)
+
+    return StreamingResponse(
+        parts(),
+        media_type=f"multipart/x-mixed-replace; boundary={BOUNDARY}",
+        headers={"Cache-Control": "no-store", "X-Accel-Buffering": "no"},
+    )
+
+
+@app.websocket("/streams/{name}/ws")
+async def stream_results_ws(websocket: WebSocket, name: str, frames: bool = True):
+    """Each result as a JSON text message ({"seq", "ts", "tracks"}), followed by the annotated JPEG as a binary message unless `frames=false`."""
+    if not _ws_authorized(websocket) or not _known_stream(name):
+        await websocket.close(code=1008)
+        return
+    await websocket.accept()
+    sub = hub.subscribe(name)
+
+    async def until_closed():
+        # Client messages are ignored; this only notices a disconnect while no results arrive
+        while (await websocket.receive())["type"] != "websocket.disconnect":
+            pass
+
+    closed = asyncio.create_task(until_closed())
+    try:
+        while True:
+            nxt = asyncio.create_task(sub.get())
+            await asyncio.wait({nxt, closed}, return_when=asyncio.FIRST_COMPLETED)
+            if not nxt.done():
+                nxt.cancel()
+                break
+            result = nxt.result()
+            await websocket.send_text(result.message)
+            if frames and result.jpeg is not None:
+                await websocket.send_bytes(result.jpeg)
+    except WebSocketDisconnect:
+        pass
+    finally:
+        closed.cancel()
+        hub.unsubscribe(sub)
+
+
+@app.get("/streams/viewers")
+async def get_stream_viewers(_: bool = Depends(check_auth)):
+    """Open MJPEG / WebSocket subscriptions per stream in this API process."""
+    return hub.viewers()
+
+
+@app.get("/streams/{name}/control")
+async def get_stream_control(name: str, _: bool = Depends(check_auth)):
+    """Current AdaptiveController decision (fps, infer_every_n, JPEG quality offset, measured latency)."""
+    stream = next((s for s in CONFIG.rtsp_streams if s.name == name), None)
+    if stream is None:
+        raise HTTPException(status_code=404, detail="unknown stream")
+    decision = await cache.get_json(f"control:{name}")
+    if decision is None:
+        return {"adaptive": stream.adaptive, "fps": stream.fps, "infer_every_n": stream.infer_every_n_frames, "jpeg_quality_offset": 0, "reason": "static"}
+    return {"adaptive": True, **decision}
+
+
+@app.get("/streams/{name}/status")
+async def get_stream_status(name: str, _: bool = Depends(check_auth)):
+    """Per-stream status hash: last published seq / ts / size and the pipeline's processed counters."""
+    if not _known_stream(name):
+        raise HTTPException(status_code=404, detail="unknown stream")
+    return await cache.get_status(name)
+
+
 @app.get("/logs/{logger}")
 async def get_logs(logger: str, n: int = 100, _: bool = Depends(check_auth)):
-    return {"logs": cache.read_logs(f"logs:{logger}")[:n]}
+    return {"logs": await cache.read_logs(f"logs:{logger}", n)}
 
 
 @app.get("/probes")
 async def get_probes(_: bool = Depends(check_auth)):
-    keys = cache.list_keys("probe:*")
-    return cache.get_many(keys)
+    probes = await cache.get_indexed_json("probe")
+    out = {f"{cache.prefix}:probe:{name}": value for name, value in sorted(probes.items())}
+    # Per-frame counters live in the status hashes, not in probe ticks
+    out.update({f"{cache.prefix}:status:{name}": value for name, value in (await cache.get_statuses()).items()})
+    return out
+
+
+@app.get("/metrics")
+async def get_metrics(_: bool = Depends(check_auth)):
+    """Prometheus text exposition of the stage histograms and counters pushed by every process."""
+    snapshots = await cache.get_indexed_json("metrics", max_age=METRICS.ttl)
+    return Response(content=render_prometheus(snapshots.values()), media_type="text/plain; version=0.0.4")
 
 
 @app.get("/")
@@ -0,0 +1,141 @@
+from __future__ import annotations
+import asyncio
+import json
+from typing import Dict, NamedTuple, Optional, Set
+
+from app.core.redis_client import AsyncRedisCache
+from app.utils.logging_setup import setup_logging
+from app.utils.metrics import METRICS
+
+BOUNDARY = "frame"
+
+
+class Result(NamedTuple):
+    """One pipeline result, pre-rendered once for every viewer."""
+
+    seq: int
+    ts: float
+    part: Optional[bytes]  # multipart/x-mixed-replace chunk with the annotated JPEG
+    jpeg: Optional[bytes]
+    message: str  # WebSocket text message: {"seq", "ts", "tracks"}
+
+
+def _part(jpeg: bytes) -> bytes:
+    head = f"--{BOUNDARY}\r\nContent-Type: image/jpeg\r\nContent-Length: {len(jpeg)}\r\n\r\n".encode()
+    return head + jpeg + b"\r\n"
+
+
+def _render(seq: int, ts: float, jpeg: Optional[bytes], tracks: Optional[bytes]) -> Result:
+    try:
+        data = json.loads(tracks) if tracks else {}
+    except ValueError:
+        data = {}
+    message = json.dumps({"seq": seq, "ts": ts, "tracks": data.get("tracks", [])})
+    return Result(seq, ts, _part(jpeg) if jpeg else None, jpeg, message)
+
+
+class Subscription:
+    """A viewer's single-slot mailbox: a slow viewer skips to the newest result instead of queueing."""
+
+    def __init__(self, channel: "_Channel") -> None:
+        self.channel = channel
+        self.queue: asyncio.Queue[Result] = asyncio.Queue(maxsize=1)
+
+    def offer(self, result: Result) -> None:
+        if self.queue.full():
+            self.queue.get_nowait()
+            METRICS.inc(self.channel.name, "viewer_dropped")
+        self.queue.put_nowait(result)
+
+    async def get(self) -> Result:
+        return await self.queue.get()
+
+
+class _Channel:
+    """Reads one stream's results from Redis once and fans them out to every subscriber."""
+
+    def __init__(self, name: str, cache: AsyncRedisCache) -> None:
+        self.name = name
+        self.cache = cache
+        self.subscribers: Set[Subscription] = set()
+        self.last: Optional[Result] = None
+        self.task: Optional[asyncio.Task] = None
+        self.log = setup_logging(f"api.stream.{name}")
+
+    async def _fetch(self) -> Optional[Result]:
+        seq, ts, jpeg, tracks = await self.cache.get_result(self.name)
+        if jpeg is None and tracks is None:
+            return None
+        return _render(seq, ts, jpeg, tracks)
+
+    async def run(self) -> None:
+        last_id = "$"
+        try:
+            # Current frame first, so a new viewer does not wait for the next result
+            self.last = await self._fetch()
+            if self.last is not None:
+                self._fan_out(self.last)
+        except Exception as e:
+            self.log.warning("Initial result read failed: %s", e)
+        while self.subscribers:
+            try:
+                event = await self.cache.wait_result_event(self.name, last_id, 1000)
+                if event is None:
+                    continue
+                last_id = event[0]
+                result = await self._fetch()
+            except asyncio.CancelledError:
+                raise
+            except Exception as e:
+                self.log.warning("Result read failed: %s", e)
+                await asyncio.sleep(1.0)
+                continue
+            if result is not None:
+                self.last = result
+                self._fan_out(result)
+                METRICS.inc(self.name, "fanned_out", len(self.subscribers))
+                await METRICS.maybe_flush_async(self.cache)
+
+    def _fan_out(self, result: Result) -> None:
+        for sub in self.subscribers:
+            sub.offer(result)
+
+
+class StreamHub:
+    """Per-stream fan-out of annotated frames and tracks to MJPEG / WebSocket viewers.
+
+    The first subscriber of a stream starts one reader task that blocks on the
+    stream's `results:<name>` announcements; every result is fetched from Redis
+    once and pre-rendered once, however many viewers there are. The task ends
+    when the last subscriber leaves.
+    """
+
+    def __init__(self, cache: AsyncRedisCache) -> None:
+        self.cache = cache
+        self.channels: Dict[str, _Channel] = {}
+
+    def subscribe(self, name: str) -> Subscription:
+        channel = self.channels.get(name)
+        if channel is None:
+            channel = self.channels[name] = _Channel(name, self.cache)
+        sub = Subscription(channel)
+        channel.subscribers.add(sub)
+        if channel.last is not None:
+            sub.offer(channel.last)
+        if channel.task is None or channel.task.done():
+            channel.task = asyncio.get_running_loop().create_task(channel.run())
+        return sub
+
+    def unsubscribe(self, sub: Subscription) -> None:
+        channel = sub.channel
+        channel.subscribers.discard(sub)
+        if not channel.subscribers:
+            # Nobody is watching: stop reading this stream
+            if channel.task is not None:
+                channel.task.cancel()
+            channel.task = None
+            channel.last = None
+            self.channels.pop(channel.name, None)
+
+    def viewers(self) -> Dict[str, int]:
+        return {name: len(c.subscribers) for name, c in self.channels.items()}
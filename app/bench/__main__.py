@@ -0,0 +1,323 @@
+"""End-to-end replay benchmark: recorded video or synthetic frames through the whole pipeline.
+
+Runs the real RTSPIngestor encode/publish path, RedisCache (in-process fake via
+the optional `fakeredis` package, or the configured server), the detector
+(deterministic FakeDetector or HailoYoloV8 with its ONNX fallback) and the
+DetectionPipeline with its MultiObjectTracker, all in one process. Prints fps,
+per-stage latency percentiles (from app.utils.metrics, bucket-interpolated),
+Redis round trips and commands per frame for the ingestor and the pipeline,
+CPU% and RSS as JSON; with --baseline it exits non-zero on a regression.
+
+    python -m app.bench --frames 300 --fps 30
+    python -m app.bench --video clip.mp4 --detector real --out run.json
+    python -m app.bench --baseline run.json --tolerance 0.1
+"""
+from __future__ import annotations
+import argparse
+import json
+import logging
+import os
+import resource
+import sys
+import threading
+import time
+from typing import Any, Dict, List, Optional, Tuple
+
+import cv2
+import numpy as np
+
+from app.core.config import CONFIG, RTSPConfig
+from app.core.pipeline import DetectionPipeline
+from app.core.redis_client import RedisCache
+from app.infer.fake_device import FakeDetector
+from app.infer.hailo_infer import HailoYoloV8
+from app.infer.pipelined import PipelinedInference
+from app.ingest.capture import CaptureBackend, CapturedFrame
+from app.ingest.rtsp_ingestor import RTSPIngestor
+from app.utils.metrics import METRICS, QUANTILES, quantile
+
+
+STREAM = "bench"
+
+
+class _SyntheticSource:
+    """cv2.VideoCapture look-alike yielding deterministic frames: a noisy gradient with moving boxes."""
+
+    def __init__(self, width: int, height: int, objects: int = 8, seed: int = 0) -> None:
+        rng = np.random.default_rng(seed)
+        ramp = np.linspace(40, 200, width, dtype=np.float32)[None, :, None]
+        noise = rng.normal(0, 6, size=(height, width, 3)).astype(np.float32)
+        self.background = np.clip(ramp + noise, 0, 255).astype(np.uint8)
+        self.start = rng.uniform([0, 0], [width - 120, height - 120], size=(objects, 2))
+        self.vel = rng.uniform(-8, 8, size=(objects, 2))
+        self.size = rng.uniform(30, 120, size=(objects, 2))
+        self.colors = rng.integers(0, 255, size=(objects, 3)).tolist()
+        self.width, self.height = width, height
+        self.index = 0
+
+    def read(self) -> Tuple[bool, Optional[np.ndarray]]:
+        frame = self.background.copy()
+        span = np.array([self.width, self.height], dtype=np.float64)
+        pos = np.abs((self.start + self.vel * self.index) % (2 * span) - span)  # bounce off the edges
+        for (x, y), (w, h), color in zip(pos, self.size, self.colors):
+            cv2.rectangle(frame, (int(x), int(y)), (int(x + w), int(y + h)), color, -1)
+        self.index += 1
+        return True, frame
+
+    def isOpened(self) -> bool:
+        return True
+
+    def release(self) -> None:
+        pass
+
+
+class _Replay(CaptureBackend):
+    """Capture backend that stops the source after `frames` reads (or at end of file) and signals `done`."""
+
+    name = "replay"
+
+    def __init__(self, cfg: RTSPConfig, source: Any, frames: int, fps: float) -> None:
+        super().__init__(cfg, logging.getLogger("bench"))
+        self.loop_file = True  # pace like a camera
+        self.source = source
+        self.frames = frames
+        self.fps = fps
+        self.count = 0
+        self.done = threading.Event()
+
+    def open(self) -> bool:
+        return self.source.isOpened()
+
+    def read(self) -> Optional[CapturedFrame]:
+        if self.count >= self.frames:
+            self.done.set()
+            return None
+        self._pace(self.fps)
+        ok, frame = self.source.read()
+        if not ok or frame is None:
+            self.done.set()
+            return None
+        self.count += 1
+        return CapturedFrame(image=frame)
+
+    def release(self) -> None:
+        pass  # the replay ends when `done` is set, not when the ingestor reopens
+
+
+class _ReplayIngestor(RTSPIngestor):
+    def __init__(self, cfg: RTSPConfig, cache: RedisCache, replay: _Replay) -> None:
+        super().__init__(cfg, cache)
+        self.replay = replay
+
+    def open(self) -> bool:
+        self.cap = self.replay
+        return self.cap.open()
+
+    def _reopen(self) -> None:
+        time.sleep(0.05)
+
+
+# Redis traffic by role: one round trip per packed command or pipeline
+_TRAFFIC: Dict[str, Dict[str, int]] = {}
+
+
+def _role() -> str:
+    t = threading.current_thread()
+    return "ingest" if isinstance(t, RTSPIngestor) else "pipeline" if isinstance(t, DetectionPipeline) else "other"
+
+
+def _counting(base: type) -> type:
+    class CountingConnection(base):  # type: ignore[misc, valid-type]
+        def _count(self, commands: int) -> None:
+            row = _TRAFFIC.setdefault(_role(), {"round_trips": 0, "commands": 0})
+            row["round_trips"] += 1
+            row["commands"] += commands
+
+        def send_command(self, *args: Any, **kwargs: Any) -> None:
+            self._count(1)
+            super().send_command(*args, **kwargs)
+
+        def pack_commands(self, commands: Any) -> Any:
+            commands = list(commands)
+            self._count(len(commands))
+            return super().pack_commands(commands)
+
+    return CountingConnection
+
+
+def _make_cache(kind: str) -> RedisCache:
+    import redis
+
+    if kind == "real":
+        cfg = CONFIG.redis
+        if cfg.unix_socket_path:
+            pool = redis.ConnectionPool(connection_class=_counting(redis.UnixDomainSocketConnection), path=cfg.unix_socket_path, db=cfg.db, password=cfg.password)
+        else:
+            pool = redis.ConnectionPool(connection_class=_counting(redis.Connection), host=cfg.host, port=cfg.port, db=cfg.db, password=cfg.password)
+        return RedisCache(pool=pool)
+    try:
+        import fakeredis
+    except ImportError:
+        raise SystemExit("--redis fake needs the optional 'fakeredis' package (pip install fakeredis); or use --redis real")
+    pool = redis.ConnectionPool(connection_class=_counting(fakeredis.FakeRedisConnection), server=fakeredis.FakeServer())
+    return RedisCache(pool=pool)
+
+
+def _rss_mb() -> Optional[float]:
+    try:
+        with open("/proc/self/statm") as f:
+            return int(f.read().split()[1]) * os.sysconf("SC_PAGE_SIZE") / 2**20
+    except (OSError, ValueError):
+        return None
+
+
+def _cpu_s() -> float:
+    ru = resource.getrusage(resource.RUSAGE_SELF)
+    return ru.ru_utime + ru.ru_stime
+
+
+def _latency_ms() -> Dict[str, Dict[str, float]]:
+    out: Dict[str, Dict[str, float]] = {}
+    for (stream, stage), h in sorted(METRICS._hists.items()):
+        if h.count == 0:
+            continue
+        row = {f"p{int(q * 100)}": round(quantile(h, q) * 1000.0, 3) for q in QUANTILES}
+        row["mean"] = round(h.sum / h.count * 1000.0, 3)
+        row["n"] = h.count
+        out[stage if stream == STREAM else f"{stage}[{stream}]"] = row
+    return out
+
+
+def run(args: argparse.Namespace) -> Dict[str, Any]:
+    if args.video:
+        source: Any = cv2.VideoCapture(args.video)
+        if not source.isOpened():
+            raise SystemExit(f"cannot open video {args.video}")
+        width = int(source.get(cv2.CAP_PROP_FRAME_WIDTH))
+        height = int(source.get(cv2.CAP_PROP_FRAME_HEIGHT))
+    else:
+        width, height = args.width, args.height
+        source = _SyntheticSource(width, height)
+    cfg = RTSPConfig(
+        name=STREAM,
+        url=args.video or "synthetic",
+        fps=args.fps,
+        width=width,
+        height=height,
+        frame_transport=args.transport,
+        infer_every_n_frames=args.every,
+        preview_on_demand=True,
+    )
+    cache = _make_cache(args.redis)
+    detector: Any = HailoYoloV8(CONFIG.hailo) if args.detector == "real" else FakeDetector(args.pre_ms, args.device_ms, args.post_ms)
+    if args.depth > 0:
+        detector = PipelinedInference(detector, depth=args.depth)
+
+    replay = _Replay(cfg, source, args.frames, args.source_fps)
+    ingestor = _ReplayIngestor(cfg, cache, replay)
+    pipeline = DetectionPipeline(cfg, cache, detector)
+
+    METRICS.reset()
+    _TRAFFIC.clear()
+    cpu0, t0 = _cpu_s(), time.perf_counter()
+    pipeline.start()
+    ingestor.start()
+    replay.done.wait()
+    ingestor.stop_event.set()
+    ingestor.join(timeout=5)
+    # Let the pipeline finish the last published frame
+    deadline = time.monotonic() + 10.0
+    while time.monotonic() < deadline and (pipeline.last_seq != ingestor.seq or pipeline.pending):
+        time.sleep(0.01)
+    wall = time.perf_counter() - t0
+    cpu = _cpu_s() - cpu0
+    pipeline.stop_event.set()
+    pipeline.join(timeout=5)
+    if isinstance(detector, PipelinedInference):
+        detector.stop()
+
+    counters = {name: v for (stream, name), v in METRICS._counters.items() if stream == STREAM}
+    return {
+        "config": {
+            "source": args.video or f"synthetic {width}x{height}",
+            "frames": args.frames,
+            "source_fps": args.source_fps,
+            "fps_limit": args.fps,
+            "transport": args.transport,
+            "redis": args.redis,
+            "detector": args.detector,
+            "depth": args.depth,
+            "infer_every_n": args.every,
+        },
+        "wall_s": round(wall, 3),
+        "frames": counters,
+        "fps": {
+            "captured": round(counters.get("captured", 0) / wall, 2),
+            "published": round(counters.get("published", 0) / wall, 2),
+            "processed": round(counters.get("processed", 0) / wall, 2),
+            "inferred": round(counters.get("inferred", 0) / wall, 2),
+        },
+        "latency_ms": _latency_ms(),
+        "redis_per_frame": {
+            role: {k: round(v / max(1, counters.get("published" if role == "ingest" else "processed", 0)), 2) for k, v in row.items()}
+            for role, row in sorted(_TRAFFIC.items())
+            if role != "other"
+        },
+        "cpu_percent": round(cpu / wall * 100.0, 1),
+        "rss_mb": round(_rss_mb() or 0.0, 1),
+        "peak_rss_mb": round(resource.getrusage(resource.RUSAGE_SELF).ru_maxrss / 1024.0, 1),
+    }
+
+
+def compare(result: Dict[str, Any], baseline: Dict[str, Any], tolerance: float) -> List[str]:
+    """Regressions beyond `tolerance` (fraction): lower processed fps, higher p95 latency, more CPU."""
+    problems = []
+    fps, base_fps = result["fps"]["processed"], baseline.get("fps", {}).get("processed", 0)
+    if base_fps and fps < base_fps * (1 - tolerance):
+        problems.append(f"processed fps {fps} < baseline {base_fps}")
+    for stage, row in result["latency_ms"].items():
+        base = baseline.get("latency_ms", {}).get(stage)
+        if base and row["p95"] > base["p95"] * (1 + tolerance) and row["p95"] - base["p95"] > 0.5:
+            problems.append(f"{stage} p95 {row['p95']} ms > baseline {base['p95']} ms")
+    base_cpu = baseline.get("cpu_percent")
+    if base_cpu and result["cpu_percent"] > base_cpu * (1 + tolerance):
+        problems.append(f"cpu {result['cpu_percent']}% > baseline {base_cpu}%")
+    return problems
+
+
+def main() -> None:
+    ap = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    ap.add_argument("--video", help="replay this file instead of synthetic frames")
+    ap.add_argument("--frames", type=int, default=300)
+    ap.add_argument("--source-fps", type=float, default=30.0, help="rate the replayed source delivers frames at (camera stand-in)")
+    ap.add_argument("--fps", type=int, default=15, help="ingest publish rate (RTSPConfig.fps)")
+    ap.add_argument("--width", type=int, default=1280)
+    ap.add_argument("--height", type=int, default=720)
+    ap.add_argument("--transport", choices=("redis", "shm"), default="redis")
+    ap.add_argument("--redis", choices=("fake", "real"), default="fake")
+    ap.add_argument("--detector", choices=("fake", "real"), default="fake", help="real = HailoYoloV8 (Hailo or ONNX fallback)")
+    ap.add_argument("--depth", type=int, default=0, help="PipelinedInference depth (0 = synchronous)")
+    ap.add_argument("--every", type=int, default=1, help="infer every n-th frame")
+    ap.add_argument("--pre-ms", type=float, default=4.0)
+    ap.add_argument("--device-ms", type=float, default=12.0)
+    ap.add_argument("--post-ms", type=float, default=4.0)
+    ap.add_argument("--out", help="also write the JSON result here")
+    ap.add_argument("--baseline", help="JSON result of an earlier run to compare against")
+    ap.add_argument("--tolerance", type=float, default=0.1)
+    args = ap.parse_args()
+
+    result = run(args)
+    if args.baseline:
+        with open(args.baseline, "r", encoding="utf-8") as f:
+            result["regressions"] = compare(result, json.load(f), args.tolerance)
+    text = json.dumps(result, indent=2)
+    print(text)
+    if args.out:
+        with open(args.out, "w", encoding="utf-8") as f:
+            f.write(text + "\n")
+    if result.get("regressions"):
+        sys.exit(1)
+
+
+if __name__ == "__main__":
+    main()
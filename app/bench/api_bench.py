@@ -0,0 +1,189 @@
+"""Load test: concurrent API requests against a live Redis, blocking vs asyncio Redis access.
+
+Drives the real FastAPI app in-process over ASGI (no HTTP parsing, so the
+numbers isolate the event loop): `--concurrency` clients fetch
+/streams/<name>/annotated.jpg in a loop while `--scanners` clients SCAN a
+keyspace padded with `--keys` filler entries (/admin/cache/scan, what
+/cache/keys used to do). Runs twice, once with the previous blocking access
+(the synchronous RedisCache called on the event loop) and once with
+AsyncRedisCache, and prints frame-fetch throughput and latency percentiles
+for both. It also reports the cost of /probes and /cache/keys, served from the
+key indexes, next to the equivalent SCAN. Usage:
+
+    python -m app.bench.api_bench --concurrency 32 --duration 5 --keys 20000
+"""
+from __future__ import annotations
+import argparse
+import asyncio
+import base64
+import json
+import os
+import time
+from typing import Any, Dict, List, Tuple
+
+import numpy as np
+
+from app.api import server
+from app.core.config import CONFIG
+from app.core.redis_client import AsyncRedisCache, RedisCache
+
+
+STREAM = "bench"
+FILLER = "bench-filler"
+
+
+class _Blocking:
+    """Awaitable facade over the synchronous RedisCache: each call blocks the loop, as the handlers used to."""
+
+    def __init__(self, cache: RedisCache) -> None:
+        self.cache = cache
+
+    def __getattr__(self, name: str) -> Any:
+        fn = getattr(self.cache, name)
+
+        async def call(*args: Any, **kwargs: Any) -> Any:
+            return fn(*args, **kwargs)
+
+        return call
+
+
+async def _get(path: str, auth: bytes) -> Tuple[int, int]:
+    """One GET through the ASGI app; returns (status, body bytes)."""
+    path, _, query = path.partition("?")
+    status, size = 0, 0
+    sent = False
+
+    async def receive() -> Dict[str, Any]:
+        nonlocal sent
+        if not sent:
+            sent = True
+            return {"type": "http.request", "body": b"", "more_body": False}
+        await asyncio.sleep(3600)
+        return {"type": "http.disconnect"}
+
+    async def send(message: Dict[str, Any]) -> None:
+        nonlocal status, size
+        if message["type"] == "http.response.start":
+            status = message["status"]
+        elif message["type"] == "http.response.body":
+            size += len(message.get("body", b""))
+
+    scope = {
+        "type": "http", "asgi": {"version": "3.0"}, "http_version": "1.1", "method": "GET", "scheme": "http",
+        "path": path, "raw_path": path.encode(), "query_string": query.encode(), "root_path": "",
+        "headers": [(b"authorization", auth)], "server": ("bench", 80), "client": ("bench", 1),
+    }
+    await server.app(scope, receive, send)
+    return status, size
+
+
+async def _load(mode: str, concurrency: int, scanners: int, duration: float, auth: bytes) -> Dict[str, Any]:
+    server.cache = _Blocking(RedisCache()) if mode == "blocking" else AsyncRedisCache()
+    # Warm-up: open the pooled connections outside the measurement
+    await asyncio.gather(*[_get(f"/streams/{STREAM}/annotated.jpg", auth) for _ in range(concurrency)])
+    latencies: List[float] = []
+    scans: List[float] = []
+    errors = 0
+    deadline = time.perf_counter() + duration
+
+    async def fetcher() -> None:
+        nonlocal errors
+        while time.perf_counter() < deadline:
+            t0 = time.perf_counter()
+            status, _ = await _get(f"/streams/{STREAM}/annotated.jpg", auth)
+            latencies.append(time.perf_counter() - t0)
+            errors += status != 200
+
+    async def scanner() -> None:
+        while time.perf_counter() < deadline:
+            t0 = time.perf_counter()
+            await _get("/admin/cache/scan?pattern=*&limit=1000000", auth)
+            scans.append(time.perf_counter() - t0)
+
+    t0 = time.perf_counter()
+    await asyncio.gather(*[fetcher() for _ in range(concurrency)], *[scanner() for _ in range(scanners)])
+    wall = time.perf_counter() - t0
+    if isinstance(server.cache, AsyncRedisCache):
+        await server.cache.close()
+    ms = np.array(latencies) * 1000.0
+    return {
+        "requests": len(latencies),
+        "errors": errors,
+        "rps": round(len(latencies) / wall, 1),
+        "p50_ms": round(float(np.percentile(ms, 50)), 2) if len(ms) else None,
+        "p95_ms": round(float(np.percentile(ms, 95)), 2) if len(ms) else None,
+        "p99_ms": round(float(np.percentile(ms, 99)), 2) if len(ms) else None,
+        "max_ms": round(float(ms.max()), 2) if len(ms) else None,
+        "scan_calls": len(scans),
+        "scan_mean_ms": round(float(np.mean(scans)) * 1000.0, 1) if scans else None,
+    }
+
+
+async def _lookups(auth: bytes, repeat: int = 10) -> Dict[str, float]:
+    """Mean ms of the index-backed endpoints vs the SCAN they replaced (no concurrent load)."""
+    server.cache = AsyncRedisCache()
+    paths = {
+        "probes_index": "/probes",
+        "probes_scan": "/admin/cache/scan?pattern=probe:*&limit=1000000",
+        "keys_index": "/cache/keys",
+        "keys_scan": "/admin/cache/scan?pattern=*&limit=1000000",
+    }
+    out = {}
+    for name, path in paths.items():
+        t0 = time.perf_counter()
+        for _ in range(repeat):
+            await _get(path, auth)
+        out[name] = round((time.perf_counter() - t0) / repeat * 1000.0, 2)
+    await server.cache.close()
+    return out
+
+
+def _seed(cache: RedisCache, keys: int, size: int) -> None:
+    cache.r.setex(cache._k("frame", "annotated", STREAM), 300, os.urandom(size))
+    cache.publish_probe(STREAM, "ok", {"event": "bench"})
+    pipe = cache.r.pipeline(transaction=False)
+    for i in range(keys):
+        pipe.setex(cache._k(FILLER, str(i)), 300, b"x")
+        if i % 1000 == 999:
+            pipe.execute()
+    pipe.execute()
+
+
+def _cleanup(cache: RedisCache) -> None:
+    cache.r.delete(cache._k("frame", "annotated", STREAM), cache._k("probe", STREAM))
+    cache.r.hdel(cache._k("index", "probe"), STREAM)
+    batch = list(cache.r.scan_iter(cache._k(FILLER, "*"), count=1000))
+    for i in range(0, len(batch), 1000):
+        cache.r.delete(*batch[i:i + 1000])
+
+
+def run(concurrency: int, scanners: int, duration: float, keys: int, size: int) -> Dict[str, Any]:
+    sync = RedisCache()
+    _seed(sync, keys, size)
+    auth = b"Basic " + base64.b64encode(f"{CONFIG.api.username}:{CONFIG.api.password}".encode())
+    original = server.cache
+    try:
+        result: Dict[str, Any] = {
+            mode: asyncio.run(_load(mode, concurrency, scanners, duration, auth))
+            for mode in ("blocking", "async")
+        }
+        result["lookup_ms"] = asyncio.run(_lookups(auth))
+        return result
+    finally:
+        server.cache = original
+        _cleanup(sync)
+
+
+def main() -> None:
+    ap = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    ap.add_argument("--concurrency", type=int, default=32, help="concurrent frame-fetch clients")
+    ap.add_argument("--scanners", type=int, default=1, help="concurrent full-keyspace SCAN clients")
+    ap.add_argument("--duration", type=float, default=5.0, help="seconds per mode")
+    ap.add_argument("--keys", type=int, default=20_000, help="filler keys for the SCAN clients")
+    ap.add_argument("--size", type=int, default=150_000, help="annotated JPEG bytes (~1280x720)")
+    args = ap.parse_args()
+    print(json.dumps(run(args.concurrency, args.scanners, args.duration, args.keys, args.size), indent=2))
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,57 @@
+"""Benchmark: synchronous vs pipelined (pre | device | post) inference.
+
+Uses the hardware-free FakeDetector by default, so the overlap can be
+measured anywhere; pass --real to use HailoYoloV8 (Hailo or ONNX fallback).
+
+    python -m app.bench.pipelined_bench --frames 200 --pre-ms 4 --device-ms 12 --post-ms 4
+"""
+from __future__ import annotations
+import argparse
+import json
+import time
+from typing import Dict
+
+import numpy as np
+
+from app.core.config import CONFIG
+from app.infer.fake_device import FakeDetector
+from app.infer.hailo_infer import HailoYoloV8
+from app.infer.pipelined import PipelinedInference
+
+
+def run(detector, frames: int, depth: int) -> Dict[str, float]:
+    img = np.zeros((720, 1280, 3), dtype=np.uint8)
+    t0 = time.perf_counter()
+    for _ in range(frames):
+        detector.infer(img)
+    sync_s = time.perf_counter() - t0
+
+    pipe = PipelinedInference(detector, depth=depth)
+    t0 = time.perf_counter()
+    futs = [pipe.submit(img) for _ in range(frames)]
+    for f in futs:
+        f.result()
+    piped_s = time.perf_counter() - t0
+    pipe.stop()
+    return {
+        "sync_fps": round(frames / sync_s, 1),
+        "pipelined_fps": round(frames / piped_s, 1),
+        "speedup": round(sync_s / piped_s, 2),
+    }
+
+
+def main() -> None:
+    ap = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    ap.add_argument("--frames", type=int, default=200)
+    ap.add_argument("--depth", type=int, default=2)
+    ap.add_argument("--pre-ms", type=float, default=4.0)
+    ap.add_argument("--device-ms", type=float, default=12.0)
+    ap.add_argument("--post-ms", type=float, default=4.0)
+    ap.add_argument("--real", action="store_true", help="use HailoYoloV8 instead of the fake device")
+    args = ap.parse_args()
+    detector = HailoYoloV8(CONFIG.hailo) if args.real else FakeDetector(args.pre_ms, args.device_ms, args.post_ms)
+    print(json.dumps(run(detector, args.frames, args.depth), indent=2))
+
+
+if __name__ == "__main__":
+    main()
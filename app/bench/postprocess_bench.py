@@ -0,0 +1,98 @@
+"""Micro-benchmark: YOLO head decode + NMS, list-based vs vectorized.
+
+Compares the previous ONNX postprocess (full transpose, Python-list round trip
+into cv2.dnn.NMSBoxes, one dict per detection) with app.infer.postprocess on a
+synthetic (1, 84, 8400) output. A low --score-thresh (the model.yaml default is
+0.001) lets thousands of candidates through.
+
+    python -m app.bench.postprocess_bench --score-thresh 0.001 0.25
+"""
+from __future__ import annotations
+import argparse
+import json
+import time
+from typing import Any, Dict, List
+
+import cv2
+import numpy as np
+
+from app.infer.postprocess import build_detections, select_candidates
+
+
+def legacy_postprocess(out: np.ndarray, shape: tuple, size: int, score_thresh: float, iou_thresh: float) -> List[Dict[str, Any]]:
+    """Reference: the original _infer_onnx decode."""
+    H, W = shape[:2]
+    out = np.transpose(out, (0, 2, 1))[0]
+    scores = out[:, 4:]
+    class_ids = np.argmax(scores, axis=1)
+    confidences = np.max(scores, axis=1)
+    mask = confidences >= score_thresh
+    b, confidences, class_ids = out[mask, :4], confidences[mask], class_ids[mask]
+    x1 = np.clip((b[:, 0] - b[:, 2] / 2) * W / size, 0, W - 1)
+    y1 = np.clip((b[:, 1] - b[:, 3] / 2) * H / size, 0, H - 1)
+    x2 = np.clip((b[:, 0] + b[:, 2] / 2) * W / size, 0, W - 1)
+    y2 = np.clip((b[:, 1] + b[:, 3] / 2) * H / size, 0, H - 1)
+    boxes = np.stack([x1, y1, np.maximum(1.0, x2 - x1), np.maximum(1.0, y2 - y1)], axis=1).astype(np.float32)
+    idxs = cv2.dnn.NMSBoxes(boxes.tolist(), confidences.astype(np.float32).tolist(), score_thresh, iou_thresh)
+    dets = []
+    for i in np.array(idxs).reshape(-1).tolist():
+        x, y, w, h = boxes[i]
+        dets.append({"cls": int(class_ids[i]), "conf": float(confidences[i]), "x1": float(x), "y1": float(y), "x2": float(x + w), "y2": float(y + h)})
+    return dets
+
+
+def synthetic_output(n_objects: int = 30, anchors: int = 8400, classes: int = 80, size: int = 640, seed: int = 0) -> np.ndarray:
+    """(1, 4 + classes, anchors) head output: clusters of jittered boxes around a few objects plus low-score noise."""
+    rng = np.random.default_rng(seed)
+    out = np.zeros((1, 4 + classes, anchors), dtype=np.float32)
+    out[0, :2] = rng.uniform(0, size, (2, anchors))
+    out[0, 2:4] = rng.uniform(8, 64, (2, anchors))
+    out[0, 4:] = rng.uniform(0, 0.01, (classes, anchors))
+    centers = rng.uniform(60, size - 60, (n_objects, 2))
+    wh = rng.uniform(20, 120, (n_objects, 2))
+    cls = rng.integers(0, classes, n_objects)
+    per = anchors // (4 * n_objects)
+    for k in range(n_objects):
+        sl = slice(k * per, (k + 1) * per)
+        out[0, 0:2, sl] = (centers[k][:, None] + rng.normal(0, 2, (2, per)))
+        out[0, 2:4, sl] = (wh[k][:, None] + rng.normal(0, 2, (2, per)))
+        out[0, 4 + cls[k], sl] = rng.uniform(0.3, 0.95, per)
+    return out
+
+
+def _time(fn, repeat: int) -> float:
+    fn()
+    t0 = time.perf_counter()
+    for _ in range(repeat):
+        fn()
+    return (time.perf_counter() - t0) / repeat * 1000.0
+
+
+def main() -> None:
+    ap = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    ap.add_argument("--score-thresh", type=float, nargs="+", default=[0.001, 0.25])
+    ap.add_argument("--iou-thresh", type=float, default=0.45)
+    ap.add_argument("--repeat", type=int, default=20)
+    args = ap.parse_args()
+    out = synthetic_output()
+    shape, size = (720, 1280, 3), 640
+    res: Dict[str, Dict[str, float]] = {}
+    for th in args.score_thresh:
+        def vectorized():
+            boxes, cls, conf = select_candidates(out[0], th, channels_first=True)
+            return build_detections(boxes, cls, conf, shape, args.iou_thresh, gain=(shape[1] / size, shape[0] / size))
+        n_cand = int((out[0, 4:].max(axis=0) >= th).sum())
+        row = {
+            "candidates": n_cand,
+            "legacy_ms": _time(lambda: legacy_postprocess(out, shape, size, th, args.iou_thresh), args.repeat),
+            "vectorized_ms": _time(vectorized, args.repeat),
+            "legacy_dets": len(legacy_postprocess(out, shape, size, th, args.iou_thresh)),
+            "vectorized_dets": int(vectorized().size),
+        }
+        row["speedup"] = row["legacy_ms"] / max(row["vectorized_ms"], 1e-9)
+        res[str(th)] = {k: round(v, 3) for k, v in row.items()}
+    print(json.dumps(res, indent=2))
+
+
+if __name__ == "__main__":
+    main()
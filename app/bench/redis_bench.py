@@ -0,0 +1,72 @@
+"""Micro-benchmark: frame push/get throughput against a live Redis.
+
+Compares the legacy pattern (a new `redis.Redis` client per call) with the
+pooled `RedisCache`. Usage:
+
+    python -m app.bench.redis_bench --frames 500 --size 150000
+"""
+from __future__ import annotations
+import argparse
+import json
+import os
+import time
+from typing import Callable, Dict
+
+import redis
+
+from app.core.config import CONFIG
+from app.core.redis_client import RedisCache
+
+
+def _legacy_client() -> redis.Redis:
+    return redis.Redis(
+        host=CONFIG.redis.host,
+        port=CONFIG.redis.port,
+        db=CONFIG.redis.db,
+        password=CONFIG.redis.password,
+        unix_socket_path=CONFIG.redis.unix_socket_path,
+        decode_responses=False,
+    )
+
+
+def _rate(n: int, fn: Callable[[], None]) -> float:
+    t0 = time.perf_counter()
+    for _ in range(n):
+        fn()
+    dt = time.perf_counter() - t0
+    return n / dt if dt > 0 else float("inf")
+
+
+def run(frames: int, size: int, stream: str = "bench") -> Dict[str, float]:
+    payload = os.urandom(size)
+    cache = RedisCache()
+    key = cache._k("frame", stream)
+    ttl = CONFIG.redis.ttl_seconds
+
+    def legacy_push() -> None:
+        _legacy_client().setex(key, ttl, payload)
+
+    def legacy_get() -> None:
+        _legacy_client().get(key)
+
+    results = {
+        "legacy_push_fps": _rate(frames, legacy_push),
+        "legacy_get_fps": _rate(frames, legacy_get),
+        "pooled_push_fps": _rate(frames, lambda: cache.push_frame(stream, payload)),
+        "pooled_get_fps": _rate(frames, lambda: cache.get_frame(stream)),
+    }
+    cache.r.delete(key)
+    return results
+
+
+def main() -> None:
+    ap = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    ap.add_argument("--frames", type=int, default=500)
+    ap.add_argument("--size", type=int, default=150_000, help="payload bytes (~1280x720 JPEG)")
+    args = ap.parse_args()
+    res = run(args.frames, args.size)
+    print(json.dumps({k: round(v, 1) for k, v in res.items()}, indent=2))
+
+
+if __name__ == "__main__":
+    main()
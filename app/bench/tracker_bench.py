@@ -0,0 +1,203 @@
+"""Micro-benchmark: tracker matching cost and ID stability.
+
+Compares the previous per-track greedy loop (scalar IoU per pair) with the
+vectorized IoU matrix + assignment used by MultiObjectTracker. Usage:
+
+    python -m app.bench.tracker_bench --sizes 10 100 500
+"""
+from __future__ import annotations
+import argparse
+import json
+import time
+from typing import Dict, List
+
+import numpy as np
+
+from app.track.tracker import MultiObjectTracker, _assign, _iou_matrix
+
+
+def _iou_scalar(a: np.ndarray, b: np.ndarray) -> float:
+    ix = max(0.0, min(a[2], b[2]) - max(a[0], b[0]))
+    iy = max(0.0, min(a[3], b[3]) - max(a[1], b[1]))
+    inter = ix * iy
+    if inter <= 0:
+        return 0.0
+    denom = (a[2] - a[0]) * (a[3] - a[1]) + (b[2] - b[0]) * (b[3] - b[1]) - inter
+    return float(inter / denom) if denom > 0 else 0.0
+
+
+def legacy_match(tracks: np.ndarray, dets: np.ndarray, thresh: float) -> List[tuple[int, int]]:
+    """Reference: the original track-order-dependent greedy loop."""
+    unmatched = set(range(len(dets)))
+    pairs = []
+    for i, t in enumerate(tracks):
+        best_iou, best_j = 0.0, None
+        for j in list(unmatched):
+            iou = _iou_scalar(t, dets[j])
+            if iou > best_iou:
+                best_iou, best_j = iou, j
+        if best_j is not None and best_iou >= thresh:
+            pairs.append((i, best_j))
+            unmatched.remove(best_j)
+    return pairs
+
+
+def _boxes(rng: np.random.Generator, n: int, w: int = 1280, h: int = 720) -> np.ndarray:
+    xy = rng.uniform(0, [w - 80, h - 80], size=(n, 2))
+    wh = rng.uniform(20, 80, size=(n, 2))
+    return np.hstack([xy, xy + wh])
+
+
+def _time(fn, repeat: int) -> float:
+    t0 = time.perf_counter()
+    for _ in range(repeat):
+        fn()
+    return (time.perf_counter() - t0) / repeat * 1000.0
+
+
+def bench_matching(sizes: List[int], thresh: float = 0.3) -> Dict[str, Dict[str, float]]:
+    rng = np.random.default_rng(0)
+    out: Dict[str, Dict[str, float]] = {}
+    for n in sizes:
+        tracks = _boxes(rng, n)
+        dets = tracks + rng.normal(0, 3, size=tracks.shape)
+        dets = dets[rng.permutation(n)]
+        repeat = max(1, 2000 // (n * n) + 1)
+        row = {
+            "legacy_ms": _time(lambda: legacy_match(tracks, dets, thresh), repeat),
+            "greedy_ms": _time(lambda: _assign(_iou_matrix(tracks, dets), thresh, "greedy"), repeat),
+            "hungarian_ms": _time(lambda: _assign(_iou_matrix(tracks, dets), thresh, "hungarian"), repeat),
+        }
+        row["speedup_greedy"] = row["legacy_ms"] / max(row["greedy_ms"], 1e-9)
+        row["speedup_hungarian"] = row["legacy_ms"] / max(row["hungarian_ms"], 1e-9)
+        out[str(n)] = {k: round(v, 3) for k, v in row.items()}
+    return out
+
+
+def bench_update(sizes: List[int], frames: int = 50) -> Dict[str, float]:
+    """Steady-state MultiObjectTracker.update() cost (ms/frame) with n moving objects."""
+    out: Dict[str, float] = {}
+    for n in sizes:
+        det_frames = [d for _, d in _scenario(n, frames)]
+        trk = MultiObjectTracker()
+        trk.update(det_frames[0], ts=0.0)
+        t0 = time.perf_counter()
+        for f, d in enumerate(det_frames[1:], start=1):
+            trk.update(d, ts=f / 15.0)
+        out[str(n)] = round((time.perf_counter() - t0) / (frames - 1) * 1000.0, 3)
+    return out
+
+
+class _LegacyTracker:
+    def __init__(self, max_age: int = 30, iou_thresh: float = 0.3) -> None:
+        self.max_age, self.iou_thresh = max_age, iou_thresh
+        self.boxes: List[np.ndarray] = []
+        self.ids: List[int] = []
+        self.missed: List[int] = []
+        self.next_id = 1
+
+    def update(self, dets: np.ndarray) -> List[tuple[int, np.ndarray]]:
+        self.missed = [m + 1 for m in self.missed]
+        pairs = legacy_match(np.array(self.boxes).reshape(-1, 4), dets, self.iou_thresh)
+        used = set()
+        for i, j in pairs:
+            self.boxes[i], self.missed[i] = dets[j], 0
+            used.add(j)
+        for j in range(len(dets)):
+            if j not in used:
+                self.boxes.append(dets[j])
+                self.ids.append(self.next_id)
+                self.missed.append(0)
+                self.next_id += 1
+        keep = [k for k, m in enumerate(self.missed) if m <= self.max_age]
+        self.boxes = [self.boxes[k] for k in keep]
+        self.ids = [self.ids[k] for k in keep]
+        self.missed = [self.missed[k] for k in keep]
+        return list(zip(self.ids, self.boxes))
+
+
+def _scenario(n_objects: int, frames: int, seed: int = 1):
+    """Objects moving on straight lines through a shared area, with detection jitter and dropouts."""
+    rng = np.random.default_rng(seed)
+    start = rng.uniform([100, 100], [1100, 600], size=(n_objects, 2))
+    vel = rng.uniform(-6, 6, size=(n_objects, 2))
+    size = rng.uniform(40, 90, size=(n_objects, 2))
+    for f in range(frames):
+        c = start + vel * f
+        gt = np.hstack([c - size / 2, c + size / 2])
+        noisy = gt + rng.normal(0, 2.0, size=gt.shape)
+        visible = rng.random(n_objects) > 0.05
+        order = rng.permutation(int(visible.sum()))
+        yield gt, noisy[visible][order]
+
+
+def _id_switches(outputs, gts) -> int:
+    switches = 0
+    last: Dict[int, int] = {}
+    for tracks, gt in zip(outputs, gts):
+        if not tracks:
+            continue
+        ids = np.array([t for t, _ in tracks])
+        boxes = np.stack([b for _, b in tracks])
+        iou = _iou_matrix(gt, boxes)
+        for g in range(len(gt)):
+            k = int(np.argmax(iou[g]))
+            if iou[g, k] < 0.5:
+                continue
+            tid = int(ids[k])
+            if g in last and last[g] != tid:
+                switches += 1
+            last[g] = tid
+    return switches
+
+
+def bench_id_stability(n_objects: int = 40, frames: int = 150) -> Dict[str, int]:
+    gts, det_frames = zip(*_scenario(n_objects, frames))
+    legacy = _LegacyTracker()
+    legacy_out = [legacy.update(d) for d in det_frames]
+    res = {"legacy": _id_switches(legacy_out, gts)}
+    for matcher in ("greedy", "hungarian"):
+        trk = MultiObjectTracker(matcher=matcher)
+        outs = []
+        for f, d in enumerate(det_frames):
+            tr = trk.update(d, ts=f / 15.0)
+            boxes = np.stack([tr["x1"], tr["y1"], tr["x2"], tr["y2"]], axis=1)
+            outs.append(list(zip(tr["track_id"].tolist(), boxes)))
+        res[matcher] = _id_switches(outs, gts)
+    return res
+
+
+def bench_prediction(every: int = 3, n_objects: int = 20, frames: int = 150, fps: float = 15.0) -> Dict[str, float]:
+    """Mean IoU of each object's track box vs ground truth when inferring every `every` frames."""
+    gts, det_frames = zip(*_scenario(n_objects, frames, seed=2))
+    res: Dict[str, float] = {}
+    for motion in (False, True):
+        trk = MultiObjectTracker(motion=motion)
+        ious: List[float] = []
+        for f, (gt, d) in enumerate(zip(gts, det_frames)):
+            ts = f / fps
+            tr = trk.update(d, ts=ts) if f % every == 0 else trk.predict(ts)
+            if f < every or not len(tr):
+                continue
+            boxes = np.stack([tr["x1"], tr["y1"], tr["x2"], tr["y2"]], axis=1)
+            ious.extend(_iou_matrix(gt, boxes).max(axis=1).tolist())
+        res["motion" if motion else "static"] = round(float(np.mean(ious)), 3)
+    return res
+
+
+def main() -> None:
+    ap = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    ap.add_argument("--sizes", type=int, nargs="+", default=[10, 100, 500])
+    args = ap.parse_args()
+    res = {
+        "matching": bench_matching(args.sizes),
+        "update_ms": bench_update(args.sizes),
+        "id_switches": bench_id_stability(),
+        "mean_iou_infer_every_3": bench_prediction(3),
+        "mean_iou_infer_every_4": bench_prediction(4),
+    }
+    print(json.dumps(res, indent=2))
+
+
+if __name__ == "__main__":
+    main()
@@ -1,6 +1,6 @@
 import os
 from pydantic import BaseModel, Field
-from typing import List, Optional
+from typing import List, Optional, Tuple, Union
 
 
 class RTSPConfig(BaseModel):
@@ -11,6 +11,44 @@ class RTSPConfig(BaseModel):
     height: int = 720
     infer_every_n_frames: int = 1
     transport: Optional[str] = Field(default=None, description="udp or tcp; None = auto (start udp then fallback)")
+    frame_transport: str = Field(
+        default=os.getenv("FRAME_TRANSPORT", "redis"),
+        description="ingest->pipeline path: redis (JPEG in Redis) or shm (raw BGR ring under /dev/shm, same host only)",
+    )
+    ring_slots: int = int(os.getenv("FRAME_RING_SLOTS", 4))
+    # Capture: opencv (FFmpeg, software decode) | mjpeg (forward camera JPEGs, decode only when pixels are needed)
+    # | gstreamer / pyav (H.264 via the V4L2 hardware decoder)
+    capture_backend: str = Field(default=os.getenv("CAPTURE_BACKEND", "opencv"))
+    hw_decode: bool = Field(default=(os.getenv("CAPTURE_HW_DECODE", "1") == "1"))
+    # Dashboard JPEGs (shm transport): only encoded while a viewer lease is held
+    preview_on_demand: bool = Field(default=(os.getenv("PREVIEW_ON_DEMAND", "1") == "1"))
+    preview_width: Optional[int] = Field(default=int(os.getenv("PREVIEW_WIDTH", "0")) or None, description="None = capture width")
+    preview_quality: int = int(os.getenv("PREVIEW_QUALITY", 80))
+    # Debug: log one line about every N-th captured frame (0 = off); never scans pixel data
+    frame_log_every: int = int(os.getenv("FRAME_LOG_EVERY", 0))
+    # Detection filters, applied in postprocessing before NMS and tracking
+    roi: List[List[Tuple[float, float]]] = Field(
+        default_factory=list,
+        description="polygons in normalized (x, y) frame coordinates; detections whose centre is outside all of them are dropped",
+    )
+    classes: Optional[List[Union[int, str]]] = Field(default=None, description="allowed class ids or names from config/classes.txt; None = all")
+    roi_crop: bool = Field(default=False, description="infer on the ROI bounding rectangle only (higher effective resolution)")
+    # Sliced inference for small objects: whole frame + overlapping model-sized tiles, merged by NMS
+    tiling: str = Field(default="off", description="off | on | adaptive (tile only around small tracks)")
+    tile_size: int = int(os.getenv("TILE_SIZE", 640))
+    tile_overlap: float = float(os.getenv("TILE_OVERLAP", 0.2))
+    tile_small_px: int = int(os.getenv("TILE_SMALL_PX", 48))
+    tile_refresh_every: int = int(os.getenv("TILE_REFRESH_EVERY", 15))
+    # Motion gate: skip inference while the scene is static (checked on infer_every_n_frames frames)
+    motion_gate: bool = Field(default=(os.getenv("MOTION_GATE", "0") == "1"))
+    motion_threshold: float = Field(default=float(os.getenv("MOTION_THRESHOLD", 0.002)), description="moving fraction of the (ROI) area that opens the gate")
+    motion_keepalive_s: float = Field(default=float(os.getenv("MOTION_KEEPALIVE_S", 10)), description="infer at least this often even without motion")
+    # Closed-loop control (AdaptiveController): trade fps / inference cadence / JPEG quality for latency
+    adaptive: bool = Field(default=(os.getenv("ADAPTIVE_CONTROL", "0") == "1"))
+    target_latency_ms: float = float(os.getenv("TARGET_LATENCY_MS", 250))
+    min_fps: int = int(os.getenv("ADAPTIVE_MIN_FPS", 5))
+    max_infer_every_n: int = int(os.getenv("ADAPTIVE_MAX_INFER_EVERY_N", 4))
+    max_quality_drop: int = int(os.getenv("ADAPTIVE_MAX_QUALITY_DROP", 30))
 
 
 class HailoConfig(BaseModel):
@@ -19,6 +57,11 @@ class HailoConfig(BaseModel):
     device_id: Optional[int] = None  # None = auto-select
     score_threshold: float = float(os.getenv("HAILO_SCORE_THRESH", 0.3))
     nms_iou_threshold: float = float(os.getenv("HAILO_NMS_IOU", 0.45))
+    # Multi-stream batching (InferenceScheduler): frames arriving within the window share one forward pass
+    max_batch: int = int(os.getenv("HAILO_MAX_BATCH", 4))
+    batch_window_ms: float = float(os.getenv("HAILO_BATCH_WINDOW_MS", 5))
+    # Frames in flight per stage of PipelinedInference (pre | device | post); 0 = synchronous
+    pipeline_depth: int = int(os.getenv("HAILO_PIPELINE_DEPTH", 0))
 
 
 class RedisConfig(BaseModel):
@@ -27,6 +70,14 @@ class RedisConfig(BaseModel):
     db: int = 0
     password: Optional[str] = None
     ttl_seconds: int = 30  # rolling window per entry
+    # Unix socket is cheaper than loopback TCP when Redis runs on the same Pi
+    unix_socket_path: Optional[str] = Field(default=os.getenv("REDIS_SOCKET") or None)
+    max_connections: int = int(os.getenv("REDIS_MAX_CONNECTIONS", 32))
+    # Also write deprecated pi-live:frame:frame:<name> style aliases
+    legacy_frame_aliases: bool = Field(default=(os.getenv("LEGACY_FRAME_ALIASES", "0") == "1"))
+    # Redis log handler: records are queued and written by a background thread in batches
+    log_queue_size: int = int(os.getenv("REDIS_LOG_QUEUE", 2000))
+    log_batch_size: int = int(os.getenv("REDIS_LOG_BATCH", 200))
 
 
 class APIConfig(BaseModel):
@@ -34,17 +85,57 @@ class APIConfig(BaseModel):
     port: int = 8000
     username: str = Field(default=os.getenv("API_USER", "admin"))
     password: str = Field(default=os.getenv("API_PASS", "changeme"))
+    viewer_lease_seconds: int = int(os.getenv("VIEWER_LEASE_SECONDS", 10))
+
+
+class SupervisorConfig(BaseModel):
+    """Process layout for app.entrypoints.supervisor (streams are spread round-robin over the processes)."""
+
+    ingest_processes: int = int(os.getenv("SUPERVISOR_INGEST_PROCS", 1))
+    post_workers: int = int(os.getenv("SUPERVISOR_POST_WORKERS", 2))
+    request_slots: int = int(os.getenv("SUPERVISOR_REQUEST_SLOTS", 8))
+    infer_timeout_s: float = float(os.getenv("SUPERVISOR_INFER_TIMEOUT_S", 5))
+    heartbeat_timeout_s: float = float(os.getenv("SUPERVISOR_HEARTBEAT_TIMEOUT_S", 20))
+    # Allowed until a child's first heartbeat: building the detector can mean an ONNX download or HEF configure
+    startup_timeout_s: float = float(os.getenv("SUPERVISOR_STARTUP_TIMEOUT_S", 300))
+    max_restart_backoff_s: float = float(os.getenv("SUPERVISOR_MAX_BACKOFF_S", 60))
+
+
+def _parse_roi(value: Optional[str]) -> List[List[Tuple[float, float]]]:
+    """"x,y;x,y;x,y|x,y;..." -> list of polygons (normalized coordinates)."""
+    polys: List[List[Tuple[float, float]]] = []
+    for poly in (value or "").split("|"):
+        pts = [p.split(",") for p in poly.split(";") if p.strip()]
+        if len(pts) >= 3:
+            polys.append([(float(x), float(y)) for x, y in pts])
+    return polys
+
+
+def _parse_classes(value: Optional[str]) -> Optional[List[Union[int, str]]]:
+    if not value:
+        return None
+    return [int(c) if c.strip().isdigit() else c.strip() for c in value.split(",") if c.strip()]
+
+
+def _stream_options(i: int) -> dict:
+    return {
+        "roi": _parse_roi(os.getenv(f"ROI_{i}")),
+        "classes": _parse_classes(os.getenv(f"CLASSES_{i}")),
+        "roi_crop": os.getenv(f"ROI_CROP_{i}", "0") == "1",
+        "tiling": os.getenv(f"TILING_{i}", "off"),
+        "capture_backend": os.getenv(f"CAPTURE_BACKEND_{i}", os.getenv("CAPTURE_BACKEND", "opencv")),
+    }
 
 
 def _default_streams() -> List[RTSPConfig]:
     # Default to a single MJPEG RTSP stream known to work on the LAN.
     url1 = os.getenv("RTSP_URL_1", "rtsp://192.168.100.4:8554/stream")
     t1 = os.getenv("RTSP_TRANSPORT_1")
-    streams: List[RTSPConfig] = [RTSPConfig(name="cam1", url=url1, transport=t1)]
+    streams: List[RTSPConfig] = [RTSPConfig(name="cam1", url=url1, transport=t1, **_stream_options(1))]
     url2 = os.getenv("RTSP_URL_2")
     if url2:
         t2 = os.getenv("RTSP_TRANSPORT_2")
-        streams.append(RTSPConfig(name="cam2", url=url2, transport=t2))
+        streams.append(RTSPConfig(name="cam2", url=url2, transport=t2, **_stream_options(2)))
     return streams
 
 
@@ -53,6 +144,7 @@ class AppConfig(BaseModel):
     hailo: HailoConfig = HailoConfig()
     redis: RedisConfig = RedisConfig()
     api: APIConfig = APIConfig()
+    supervisor: SupervisorConfig = SupervisorConfig()
 
 
 CONFIG = AppConfig()
@@ -0,0 +1,115 @@
+from __future__ import annotations
+import time
+from typing import Any, Dict, Optional
+
+from app.core.config import RTSPConfig
+
+
+_ALPHA = 0.2  # EWMA weight of the newest sample
+_HIGH = 1.1  # degrade above target * _HIGH
+_LOW = 0.6  # upgrade below target * _LOW
+_QUALITY_STEP = 10
+
+
+class AdaptiveController:
+    """Closed-loop quality/rate control for one stream.
+
+    The pipeline reports, per processed frame, the time from capture to the start
+    of processing ("queue"), inference ("infer") and tracking/drawing/publishing
+    ("publish"), plus how many frames it had to skip. Every `interval_s` the
+    controller compares the smoothed end-to-end latency (and skip rate) with the
+    target and moves one knob by one step, picking the knob of the slowest stage:
+
+    - infer   -> run inference on fewer frames (infer_every_n up to max)
+    - publish -> lower JPEG quality (offset down to -max_quality_drop)
+    - queue   -> lower the ingest frame rate (down to min_fps)
+
+    When latency is comfortably under target the knobs are restored in reverse.
+    The current decision is published to Redis (`control:<stream>`), where the
+    ingestor and the API read it.
+    """
+
+    def __init__(self, cfg: RTSPConfig, interval_s: float = 2.0) -> None:
+        self.target_s = cfg.target_latency_ms / 1000.0
+        self.interval_s = interval_s
+        self.base_fps = max(1, cfg.fps)
+        self.min_fps = max(1, min(cfg.min_fps, self.base_fps))
+        self.base_every = max(1, cfg.infer_every_n_frames)
+        self.max_every = max(self.base_every, cfg.max_infer_every_n)
+        self.max_drop = max(0, cfg.max_quality_drop)
+        self.fps = self.base_fps
+        self.infer_every_n = self.base_every
+        self.jpeg_quality_offset = 0
+        self.latency: Optional[float] = None
+        self.stages: Dict[str, float] = {}
+        self.reason = "init"
+        self._frames = 0
+        self._skipped = 0
+        self._last_step = time.monotonic()
+
+    def observe(self, stages: Dict[str, float], skipped: int = 0) -> None:
+        """Record one processed frame: per-stage seconds and frames skipped before it."""
+        total = sum(stages.values())
+        self.latency = total if self.latency is None else self.latency + _ALPHA * (total - self.latency)
+        for k, v in stages.items():
+            prev = self.stages.get(k)
+            self.stages[k] = v if prev is None else prev + _ALPHA * (v - prev)
+        self._frames += 1
+        self._skipped += skipped
+
+    def step(self, now: Optional[float] = None) -> bool:
+        """Re-evaluate if the interval has elapsed; True if a new decision is ready to publish."""
+        now = time.monotonic() if now is None else now
+        if now - self._last_step < self.interval_s or self.latency is None:
+            return False
+        self._last_step = now
+        skip_rate = self._skipped / max(1, self._frames + self._skipped)
+        self._frames = self._skipped = 0
+        if self.latency > self.target_s * _HIGH or skip_rate > 0.25:
+            self.reason = self._degrade()
+        elif self.latency < self.target_s * _LOW and skip_rate < 0.05:
+            self.reason = self._upgrade()
+        else:
+            self.reason = "hold"
+        return True
+
+    def _degrade(self) -> str:
+        for stage in sorted(self.stages, key=self.stages.get, reverse=True):
+            if stage == "infer" and self.infer_every_n < self.max_every:
+                self.infer_every_n += 1
+                return "degrade:infer_every_n"
+            if stage == "publish" and self.jpeg_quality_offset > -self.max_drop:
+                self.jpeg_quality_offset = max(-self.max_drop, self.jpeg_quality_offset - _QUALITY_STEP)
+                return "degrade:jpeg_quality"
+            if stage == "queue" and self.fps > self.min_fps:
+                self.fps = max(self.min_fps, int(self.fps * 0.8))
+                return "degrade:fps"
+        return "saturated"
+
+    def _upgrade(self) -> str:
+        if self.fps < self.base_fps:
+            self.fps = min(self.base_fps, self.fps + 1)
+            return "upgrade:fps"
+        if self.jpeg_quality_offset < 0:
+            self.jpeg_quality_offset = min(0, self.jpeg_quality_offset + _QUALITY_STEP // 2)
+            return "upgrade:jpeg_quality"
+        if self.infer_every_n > self.base_every:
+            self.infer_every_n -= 1
+            return "upgrade:infer_every_n"
+        return "nominal"
+
+    def decision(self) -> Dict[str, Any]:
+        return {
+            "ts": int(time.time()),
+            "fps": self.fps,
+            "infer_every_n": self.infer_every_n,
+            "jpeg_quality_offset": self.jpeg_quality_offset,
+            "target_ms": round(self.target_s * 1000.0, 1),
+            "latency_ms": round((self.latency or 0.0) * 1000.0, 1),
+            "stages_ms": {k: round(v * 1000.0, 1) for k, v in self.stages.items()},
+            "reason": self.reason,
+        }
+
+
+def apply_quality_offset(base: int, offset: int) -> int:
+    return max(10, min(100, int(base) + int(offset)))
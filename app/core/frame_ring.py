@@ -0,0 +1,185 @@
+from __future__ import annotations
+import mmap
+import os
+import tempfile
+from pathlib import Path
+from typing import Optional, Tuple
+
+import numpy as np
+
+
+RING_DIR = Path(os.getenv("FRAME_RING_DIR", "/dev/shm" if os.path.isdir("/dev/shm") else tempfile.gettempdir()))
+
+_MAGIC = b"PLRING01"
+_HEADER = np.dtype([
+    ("magic", "S8"),
+    ("slots", "<u4"),
+    ("slot_bytes", "<u4"),
+    ("closed", "<u4"),
+    ("_pad", "<u4"),
+    ("latest_seq", "<u8"),
+    ("_reserved", "u1", 32),
+])  # 64 bytes
+_SLOT = np.dtype([
+    ("seq", "<u8"),
+    ("ts", "<f8"),
+    ("h", "<u4"),
+    ("w", "<u4"),
+    ("c", "<u4"),
+    ("_pad", "<u4"),
+])  # 32 bytes
+
+
+def ring_path(stream: str) -> Path:
+    return RING_DIR / f"pi-live-{stream}.ring"
+
+
+def _align(n: int, a: int = 64) -> int:
+    return (n + a - 1) // a * a
+
+
+class FrameRing:
+    """Fixed-size ring of raw BGR frames in a memory-mapped file (default under /dev/shm).
+
+    Layout: a 64-byte header (magic, slot count, slot size, closed flag, latest seq)
+    followed by `slots` entries of [32-byte slot header | frame bytes]. A single
+    writer (the ingestor) fills slot `seq % slots`, zeroes the slot seq while the
+    copy is in progress and publishes `latest_seq` last. Readers get numpy views
+    straight into the mapping (no copy) and can re-check `is_valid(seq)` after use
+    to detect that the writer has lapped the ring in the meantime.
+    """
+
+    def __init__(self, path: Path, mm: mmap.mmap, writer: bool) -> None:
+        self.path = path
+        self.writer = writer
+        self._mm = mm
+        try:
+            self._ino = os.stat(path).st_ino
+        except FileNotFoundError:
+            self._ino = -1
+        self._hdr = np.ndarray((), dtype=_HEADER, buffer=mm, offset=0)
+        self.slots = int(self._hdr["slots"])
+        self.slot_bytes = int(self._hdr["slot_bytes"])
+        self._stride = _align(_SLOT.itemsize + self.slot_bytes)
+        self._slot_hdrs = [
+            np.ndarray((), dtype=_SLOT, buffer=mm, offset=self._slot_offset(i)) for i in range(self.slots)
+        ]
+
+    # ---------------------------- open / close ----------------------------
+    @classmethod
+    def create(cls, stream: str, slot_bytes: int, slots: int = 4) -> "FrameRing":
+        path = ring_path(stream)
+        size = _HEADER.itemsize + slots * _align(_SLOT.itemsize + slot_bytes)
+        tmp = path.with_suffix(".tmp")
+        fd = os.open(tmp, os.O_RDWR | os.O_CREAT | os.O_TRUNC, 0o600)
+        try:
+            os.ftruncate(fd, size)
+            mm = mmap.mmap(fd, size)
+        finally:
+            os.close(fd)
+        hdr = np.ndarray((), dtype=_HEADER, buffer=mm, offset=0)
+        hdr["magic"] = _MAGIC
+        hdr["slots"] = slots
+        hdr["slot_bytes"] = slot_bytes
+        # Atomic rename so readers never map a half-initialized file
+        os.replace(tmp, path)
+        return cls(path, mm, writer=True)
+
+    @classmethod
+    def attach(cls, stream: str) -> Optional["FrameRing"]:
+        path = ring_path(stream)
+        try:
+            fd = os.open(path, os.O_RDONLY)
+        except FileNotFoundError:
+            return None
+        try:
+            size = os.fstat(fd).st_size
+            if size < _HEADER.itemsize:
+                return None
+            mm = mmap.mmap(fd, size, access=mmap.ACCESS_READ)
+        finally:
+            os.close(fd)
+        if bytes(mm[:8]) != _MAGIC:
+            mm.close()
+            return None
+        return cls(path, mm, writer=False)
+
+    def close(self, unlink: bool = False) -> None:
+        """Release the mapping (the writer also marks the ring closed); safe to call twice."""
+        if self.writer and unlink:
+            try:
+                if os.stat(self.path).st_ino == self._ino:  # never remove a successor's file
+                    self.path.unlink()
+            except FileNotFoundError:
+                pass
+        if self._hdr is None:
+            return
+        if self.writer:
+            self._hdr["closed"] = 1
+        self._slot_hdrs = []
+        self._hdr = None  # type: ignore[assignment]
+        try:
+            self._mm.close()
+        except BufferError:
+            # Outstanding numpy views keep the mapping alive until they are released
+            pass
+
+    @property
+    def closed(self) -> bool:
+        return self._hdr is None or bool(self._hdr["closed"])
+
+    def replaced(self) -> bool:
+        """True if the writer closed this ring or a new one was created at the same path."""
+        if self.closed:
+            return True
+        try:
+            return os.stat(self.path).st_ino != self._ino
+        except FileNotFoundError:
+            return True
+
+    # ---------------------------- data path ----------------------------
+    def _slot_offset(self, i: int) -> int:
+        return _HEADER.itemsize + i * self._stride
+
+    def write(self, frame: np.ndarray, seq: int, ts: float) -> None:
+        """Copy `frame` (HxWxC uint8) into slot `seq % slots` and publish it as latest."""
+        if frame.nbytes > self.slot_bytes:
+            raise ValueError(f"frame of {frame.nbytes} bytes exceeds ring slot of {self.slot_bytes}")
+        i = seq % self.slots
+        sh = self._slot_hdrs[i]
+        sh["seq"] = 0
+        h, w = frame.shape[:2]
+        c = frame.shape[2] if frame.ndim == 3 else 1
+        dst = np.ndarray((h, w, c), dtype=np.uint8, buffer=self._mm, offset=self._slot_offset(i) + _SLOT.itemsize)
+        np.copyto(dst, frame.reshape(h, w, c))
+        sh["ts"] = ts
+        sh["h"] = h
+        sh["w"] = w
+        sh["c"] = c
+        sh["seq"] = seq
+        self._hdr["latest_seq"] = seq
+
+    def latest_seq(self) -> int:
+        return int(self._hdr["latest_seq"])
+
+    def read_latest(self) -> Optional[Tuple[int, float, np.ndarray]]:
+        """Return (seq, ts, frame view) for the newest frame, or None if nothing is published yet."""
+        seq = int(self._hdr["latest_seq"])
+        if seq == 0:
+            return None
+        got = self.read(seq)
+        return None if got is None else (seq, got[0], got[1])
+
+    def read(self, seq: int) -> Optional[Tuple[float, np.ndarray]]:
+        """(ts, frame view) for a specific `seq`, or None once its slot has been reused."""
+        i = seq % self.slots
+        sh = self._slot_hdrs[i]
+        if int(sh["seq"]) != seq:
+            return None  # writer is already reusing this slot
+        h, w, c = int(sh["h"]), int(sh["w"]), int(sh["c"])
+        view = np.ndarray((h, w, c), dtype=np.uint8, buffer=self._mm, offset=self._slot_offset(i) + _SLOT.itemsize)
+        return float(sh["ts"]), (view if c > 1 else view[:, :, 0])
+
+    def is_valid(self, seq: int) -> bool:
+        """True while the slot holding `seq` has not been overwritten."""
+        return not self.closed and int(self._slot_hdrs[seq % self.slots]["seq"]) == seq
@@ -0,0 +1,109 @@
+from __future__ import annotations
+from typing import Optional, Tuple
+
+import cv2
+import numpy as np
+
+
+class MotionMask:
+    """Binary motion mask of a downscaled frame, queried in full-frame coordinates."""
+
+    def __init__(self, mask: np.ndarray, scale: float) -> None:
+        self.mask = mask
+        self.scale = scale
+        self._integral: Optional[np.ndarray] = None
+
+    def activity(self, boxes: np.ndarray) -> np.ndarray:
+        """Fraction of moving pixels inside each (N, 4) xyxy box, via an integral image."""
+        if boxes.shape[0] == 0:
+            return np.empty(0, dtype=float)
+        if self._integral is None:
+            self._integral = cv2.integral(self.mask, sdepth=cv2.CV_32S)
+        ii = self._integral
+        h, w = self.mask.shape
+        b = np.round(boxes * self.scale).astype(np.int64)
+        x1 = np.clip(b[:, 0], 0, w)
+        y1 = np.clip(b[:, 1], 0, h)
+        x2 = np.clip(np.maximum(b[:, 2], b[:, 0] + 1), 0, w)
+        y2 = np.clip(np.maximum(b[:, 3], b[:, 1] + 1), 0, h)
+        area = np.maximum((x2 - x1) * (y2 - y1), 1)
+        moving = ii[y2, x2] - ii[y1, x2] - ii[y2, x1] + ii[y1, x1]
+        return moving / area
+
+
+class MotionGate:
+    """Cheap scene-change detector in front of inference.
+
+    Each frame is shrunk to `width` pixels wide, converted to grayscale and
+    compared with a running-average background (cv2.accumulateWeighted). The
+    gate opens when the moving fraction of the (ROI) area reaches `threshold`
+    or when `keepalive_s` has passed since the last inference, so tracks are
+    still refreshed during quiet hours.
+    """
+
+    def __init__(
+        self,
+        threshold: float = 0.002,
+        keepalive_s: float = 10.0,
+        width: int = 160,
+        pixel_thresh: int = 25,
+        learn_rate: float = 0.05,
+        roi_mask: Optional[np.ndarray] = None,
+    ) -> None:
+        self.threshold = threshold
+        self.keepalive_s = keepalive_s
+        self.width = width
+        self.pixel_thresh = pixel_thresh
+        self.learn_rate = learn_rate
+        self._roi_full = roi_mask
+        self._roi: Optional[np.ndarray] = None
+        self._roi_px = 0
+        self._bg: Optional[np.ndarray] = None
+        self._size: Optional[Tuple[int, int]] = None
+        self.last_open_ts: Optional[float] = None
+        self.motion_ratio = 0.0
+        self.mask: Optional[MotionMask] = None
+        self.gated = 0  # frames on which the gate stayed closed
+
+    def _prepare(self, frame: np.ndarray) -> np.ndarray:
+        h, w = frame.shape[:2]
+        sw = min(self.width, w)
+        size = (sw, max(1, round(h * sw / w)))
+        if size != self._size:
+            self._size, self._bg = size, None
+            self._roi = None
+            if self._roi_full is not None:
+                self._roi = cv2.resize(self._roi_full, size, interpolation=cv2.INTER_NEAREST)
+                self._roi_px = max(1, int(np.count_nonzero(self._roi)))
+        # Cheap bilinear pass to twice the target size, then a 2x area average:
+        # about 5x faster than a single INTER_AREA resize from full resolution
+        if w >= 4 * size[0]:
+            frame = cv2.resize(frame, (size[0] * 2, size[1] * 2), interpolation=cv2.INTER_LINEAR)
+        small = cv2.resize(frame, size, interpolation=cv2.INTER_AREA)
+        gray = cv2.cvtColor(small, cv2.COLOR_BGR2GRAY) if small.ndim == 3 else small
+        return cv2.GaussianBlur(gray, (5, 5), 0)
+
+    def update(self, frame: np.ndarray, ts: float) -> bool:
+        """Feed a frame; True if inference should run on it."""
+        gray = self._prepare(frame)
+        scale = gray.shape[1] / frame.shape[1]
+        if self._bg is None:
+            self._bg = gray.astype(np.float32)
+            self.mask = MotionMask(np.ones_like(gray), scale)
+            self.motion_ratio = 1.0
+        else:
+            diff = cv2.absdiff(gray, cv2.convertScaleAbs(self._bg))
+            _, m = cv2.threshold(diff, self.pixel_thresh, 1, cv2.THRESH_BINARY)
+            if self._roi is not None:
+                m &= self._roi
+                self.motion_ratio = np.count_nonzero(m) / self._roi_px
+            else:
+                self.motion_ratio = np.count_nonzero(m) / m.size
+            self.mask = MotionMask(m, scale)
+            cv2.accumulateWeighted(gray, self._bg, self.learn_rate)
+        expired = self.last_open_ts is None or ts - self.last_open_ts >= self.keepalive_s
+        if self.motion_ratio >= self.threshold or expired:
+            self.last_open_ts = ts
+            return True
+        self.gated += 1
+        return False
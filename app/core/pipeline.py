@@ -3,19 +3,43 @@ import cv2
 import time
 import threading
 import numpy as np
-from typing import Dict, Any, List
+from collections import deque
+from concurrent.futures import Future
+from typing import Deque, List, NamedTuple, Optional
 
 from app.utils.logging_setup import setup_logging
+from app.utils.metrics import METRICS
 from app.core.config import RTSPConfig, CONFIG
 from app.core.redis_client import RedisCache
+from app.core.frame_ring import FrameRing
+from app.core.motion import MotionGate, MotionMask
+from app.core.controller import AdaptiveController, apply_quality_offset
 from app.infer.hailo_infer import HailoYoloV8
-from app.track.tracker import MultiObjectTracker
+from app.infer.scheduler import InferenceScheduler
+from app.infer.pipelined import PipelinedInference
+from app.infer.remote import RemoteDetector
+from app.infer.postprocess import empty_dets
+from app.infer.roi import DetectionFilter
+from app.infer.tiling import TilePlanner, merge_tiles
+from app.track.tracker import MultiObjectTracker, tracks_to_dicts
+
+
+class _InFlight(NamedTuple):
+    """A frame submitted for inference but not yet tracked/published."""
+
+    seq: int
+    ts: float  # capture time
+    canvas: np.ndarray
+    futs: Optional[List[Future]]  # one detections future per crop; None = predict-only frame
+    mask: Optional[MotionMask]
+    admitted: float  # wall time processing started
+    skipped: int  # frames superseded right before this one
 
 
 class DetectionPipeline(threading.Thread):
-    """End-to-end pipeline for one stream: ingest from Redis, infer on Hailo, track, annotate, republish."""
+    """End-to-end pipeline for one stream: ingest from Redis (or the shared-memory ring), infer on Hailo, track, annotate, republish."""
 
-    def __init__(self, cfg: RTSPConfig, cache: RedisCache, hailo: HailoYoloV8) -> None:
+    def __init__(self, cfg: RTSPConfig, cache: RedisCache, hailo: HailoYoloV8 | InferenceScheduler | PipelinedInference | RemoteDetector) -> None:
         super().__init__(daemon=True)
         self.cfg = cfg
         self.cache = cache
@@ -23,42 +47,218 @@ class DetectionPipeline(threading.Thread):
         self.log = setup_logging(f"pipeline.{cfg.name}")
         self.stop_event = threading.Event()
         self.tracker = MultiObjectTracker()
+        # ROI / class allow-list, applied by the detector before NMS (None = keep everything)
+        self.det_filter = DetectionFilter.from_stream(cfg)
+        self.tiler = TilePlanner(cfg, self.det_filter)
+        self.last_tracks: Optional[np.ndarray] = None  # drives adaptive tiling
+        self.gate: Optional[MotionGate] = None
+        if cfg.motion_gate:
+            roi = self.det_filter.mask((cfg.height, cfg.width)) if self.det_filter is not None else None
+            self.gate = MotionGate(cfg.motion_threshold, cfg.motion_keepalive_s, roi_mask=roi)
         self.frame_count = 0
+        self.last_seq: Optional[int] = None
+        self.skipped_frames = 0
+        self.torn_frames = 0
+        self.ring: Optional[FrameRing] = None
+        self.frame_ts = 0.0  # capture time of the most recently fetched frame
+        # In-flight frames, oldest first
+        self.max_in_flight = max(1, int(getattr(hailo, "depth", 1)))
+        self.pending: Deque[_InFlight] = deque()
+        self.controller: Optional[AdaptiveController] = AdaptiveController(cfg) if cfg.adaptive else None
+
+    @property
+    def infer_every_n(self) -> int:
+        return self.controller.infer_every_n if self.controller is not None else max(1, self.cfg.infer_every_n_frames)
+
+    def _latest(self) -> tuple[Optional[int], Optional[np.ndarray]]:
+        """Latest published (seq, frame), decoding only when the sequence number is new."""
+        if self.cfg.frame_transport == "shm":
+            if self.ring is None or self.ring.replaced():
+                if self.ring is not None:
+                    self.ring.close()
+                self.ring = FrameRing.attach(self.cfg.name)
+                if self.ring is None:
+                    return None, None
+            latest = self.ring.read_latest()
+            if latest is None or latest[0] == self.last_seq:
+                return None, None
+            self.frame_ts = latest[1]
+            return latest[0], latest[2]  # zero-copy view into the ring
+        # Sequence number first (one small HGET): the JPEG is only fetched when it is new
+        with METRICS.time(self.cfg.name, "redis_seq"):
+            seq = self.cache.get_frame_seq(self.cfg.name)
+        if not seq or seq == self.last_seq:
+            return None, None
+        return self._fetch()
+
+    def _fetch(self) -> tuple[Optional[int], Optional[np.ndarray]]:
+        """Fetch and decode the latest Redis frame; the caller already knows its seq is new."""
+        name = self.cfg.name
+        with METRICS.time(name, "redis_get"):
+            seq, ts, raw = self.cache.get_latest_frame(name)
+        if not raw or seq is None or seq == self.last_seq:
+            return None, None
+        self.frame_ts = ts if ts is not None else time.time()
+        with METRICS.time(name, "decode"):
+            frame = cv2.imdecode(np.frombuffer(raw, dtype=np.uint8), cv2.IMREAD_COLOR)
+        if frame is None:
+            # Corrupt JPEG: consume its seq so the next call waits for a newer frame
+            # instead of fetching and failing on the same one again
+            self.log.warning("Could not decode frame seq %d (%d bytes), dropping it", seq, len(raw))
+            self.last_seq = seq
+            self.torn_frames += 1
+            METRICS.inc(name, "torn")
+            return None, None
+        return seq, frame
+
+    def _next_frame(self, last_id: str) -> tuple[str, Optional[int], Optional[np.ndarray]]:
+        """Return the latest frame if it has not been processed yet, else block for the next one."""
+        if self.cfg.frame_transport == "shm" or last_id == "$":
+            # Ring reads cost no round trip, and without a stream position there is
+            # nothing to wait from yet: look at the latest frame first
+            seq, frame = self._latest()
+            if seq is not None:
+                return last_id, seq, frame
+        ev = self.cache.wait_frame_event(self.cfg.name, last_id, timeout_ms=1000)
+        if ev is None:
+            return last_id, None, None
+        if ev[1] == self.last_seq:
+            return ev[0], None, None
+        # The announcement carries the seq: only fetch pixels for a frame not processed yet
+        seq, frame = self._latest() if self.cfg.frame_transport == "shm" else self._fetch()
+        return ev[0], seq, frame
+
+    def _submit_one(self, frame: np.ndarray, filt: Optional[DetectionFilter]) -> Future:
+        if hasattr(self.hailo, "submit"):
+            return self.hailo.submit(frame, filt)
+        fut: Future = Future()
+        try:
+            fut.set_result(self.hailo.infer(frame, filt))
+        except Exception as e:
+            fut.set_exception(e)
+        return fut
+
+    def _submit(self, frame: np.ndarray) -> List[Future]:
+        """Submit the whole frame and, when tiling, each planned tile (all land in the same device batch)."""
+        futs = []
+        for rect in self.tiler.plan(frame.shape, self.last_tracks):
+            filt = self.det_filter if rect is None else (self.det_filter or DetectionFilter()).for_rect(rect)
+            futs.append(self._submit_one(frame, filt))
+        return futs
+
+    def _admit(self, seq: int, frame: np.ndarray) -> None:
+        """Account for the new sequence number, snapshot the frame and start its inference."""
+        skipped = 0
+        if self.last_seq is not None and seq > self.last_seq + 1:
+            # Frames published while we were busy are superseded by the newest one
+            skipped = seq - self.last_seq - 1
+            self.skipped_frames += skipped
+            METRICS.inc(self.cfg.name, "skipped", skipped)
+        self.last_seq = seq
+        admitted = time.time()
+        self.frame_count += 1
+        # The copy is both the drawing canvas and the inference input, so the ring
+        # slot may be reused as soon as it is taken
+        canvas = frame.copy()
+        if self.ring is not None and not self.ring.is_valid(seq):
+            # Ingestor lapped the ring during the copy; the snapshot may mix two frames
+            self.torn_frames += 1
+            METRICS.inc(self.cfg.name, "torn")
+            return
+        futs: Optional[List[Future]] = None
+        if (self.frame_count % self.infer_every_n) == 0:
+            # The gate only runs on cadence frames; in between the last mask is reused
+            if self.gate is None or self.gate.update(canvas, self.frame_ts):
+                futs = self._submit(canvas)
+            else:
+                METRICS.inc(self.cfg.name, "gated")
+        mask = self.gate.mask if self.gate is not None else None
+        self.pending.append(_InFlight(seq, self.frame_ts, canvas, futs, mask, admitted, skipped))
+
+    def _finish(self) -> None:
+        """Wait for the oldest in-flight frame, then track, annotate and publish it."""
+        seq, frame_ts, canvas, futs, mask, admitted, skipped = self.pending.popleft()
+        dets: Optional[np.ndarray] = None
+        try:
+            if futs is not None:
+                parts = [f.result() for f in futs]
+                # Tiles overlap each other and the full view: drop cross-tile duplicates
+                dets = parts[0] if len(parts) == 1 else merge_tiles(parts, float(CONFIG.hailo.nms_iou_threshold))
+        except Exception as e:
+            self.log.warning("Inference failed for seq %d: %s", seq, e)
+            dets = empty_dets()
+        inferred = time.time()
+        name = self.cfg.name
+        with METRICS.time(name, "track"):
+            if dets is None:
+                # Skipped inference: move tracks along their predicted motion
+                tracks = self.tracker.predict(frame_ts, motion_mask=mask)
+            else:
+                tracks = self.tracker.update(dets, canvas, ts=frame_ts, motion_mask=mask)
+        self.last_tracks = tracks
+        with METRICS.time(name, "draw"):
+            annotated = self._draw(canvas, tracks)
+
+        # Store outputs in Redis with TTL
+        quality = apply_quality_offset(80, self.controller.jpeg_quality_offset) if self.controller is not None else 80
+        with METRICS.time(name, "annotate_encode"):
+            ok, buf = cv2.imencode(".jpg", annotated, [int(cv2.IMWRITE_JPEG_QUALITY), quality])
+        with METRICS.time(name, "redis_push"):
+            aliases = (f"frame:annotated:{name}",) if CONFIG.redis.legacy_frame_aliases else ()
+            result = {"ts": int(time.time()), "tracks": tracks_to_dicts(tracks)}
+            # Result, tracks, announcement and counters in one transaction (the counters
+            # used to be a separate probe write per frame)
+            self.cache.batch(name).result(buf.tobytes() if ok else None, result, seq, frame_ts, aliases=aliases).status(
+                processed_seq=seq, processed_at=repr(time.time()), frames=self.frame_count, skipped=self.skipped_frames,
+                torn=self.torn_frames, gated=self.gate.gated if self.gate is not None else 0,
+            ).execute()
+        METRICS.inc(name, "processed")
+        METRICS.inc(name, "inferred" if futs is not None else "predicted")
+        METRICS.observe(name, "end_to_end", max(0.0, time.time() - frame_ts))
+        METRICS.maybe_flush(self.cache)
+        if self.controller is not None:
+            done = time.time()
+            self.controller.observe({"queue": max(0.0, admitted - frame_ts), "infer": inferred - admitted, "publish": done - inferred}, skipped)
+            if self.controller.step():
+                decision = self.controller.decision()
+                if decision["reason"].startswith(("degrade", "upgrade")):
+                    self.log.info("Adaptive control: %s (latency %.0f ms)", decision["reason"], decision["latency_ms"])
+                self.cache.set_json(f"control:{name}", decision)
 
     def run(self) -> None:
-        self.log.info("Starting pipeline for %s", self.cfg.name)
+        self.log.info("Starting pipeline for %s (max %d frames in flight)", self.cfg.name, self.max_in_flight)
+        last_id = "$"
         while not self.stop_event.is_set():
-            raw = self.cache.get_frame(self.cfg.name)
-            if not raw:
-                time.sleep(0.05)
-                continue
-            frame = cv2.imdecode(np.frombuffer(raw, dtype=np.uint8), cv2.IMREAD_COLOR)
-            if frame is None:
-                time.sleep(0.01)
-                continue
-            self.frame_count += 1
-
-            dets: List[Dict[str, Any]] = []
-            if (self.frame_count % max(1, self.cfg.infer_every_n_frames)) == 0:
-                dets = self.hailo.infer(frame)
-
-            tracks = self.tracker.update(dets, frame)
-            annotated = self._draw(frame.copy(), tracks)
-
-            # Store outputs in Redis with TTL
-            ok, buf = cv2.imencode(".jpg", annotated, [int(cv2.IMWRITE_JPEG_QUALITY), 80])
-            if ok:
-                self.cache.push_frame(f"annotated:{self.cfg.name}", buf.tobytes())
-                self.cache.push_frame(f"frame:annotated:{self.cfg.name}", buf.tobytes())
-            self.cache.set_json(f"tracks:{self.cfg.name}", {"ts": int(time.time()), "tracks": tracks})
-            self.cache.publish_probe(self.cfg.name, "ok", {"event": "tick", "frames": self.frame_count})
+            if len(self.pending) < self.max_in_flight:
+                try:
+                    if self.pending:
+                        # Work is in flight: only take a frame that is already there
+                        seq, frame = self._latest()
+                    else:
+                        last_id, seq, frame = self._next_frame(last_id)
+                except Exception as e:
+                    self.log.warning("Frame wait failed: %s", e)
+                    time.sleep(0.5)
+                    continue
+                if seq is not None and frame is not None:
+                    self._admit(seq, frame)
+                    continue
+                if not self.pending:
+                    continue
+            self._finish()
 
+        while self.pending:
+            self._finish()
+        if self.ring is not None:
+            self.ring.close()
         self.log.info("Stopping pipeline for %s", self.cfg.name)
 
-    def _draw(self, img, tracks: List[Dict[str, Any]]):
-        for t in tracks:
-            x1, y1, x2, y2 = map(int, (t["x1"], t["y1"], t["x2"], t["y2"]))
+    def _draw(self, img, tracks: np.ndarray):
+        if self.det_filter is not None and self.det_filter.roi:
+            cv2.polylines(img, self.det_filter.polygons(img.shape), True, (255, 128, 0), 1, cv2.LINE_AA)
+        boxes = np.stack([tracks["x1"], tracks["y1"], tracks["x2"], tracks["y2"]], axis=1).astype(int).tolist()
+        for (x1, y1, x2, y2), uid, cls, conf in zip(boxes, tracks["class_uid"].tolist(), tracks["cls"].tolist(), tracks["conf"].tolist()):
             cv2.rectangle(img, (x1, y1), (x2, y2), (0, 255, 0), 2)
-            label = f"id:{t['class_uid']} cls:{t['cls']} conf:{t['conf']:.2f}"
+            label = f"id:{uid} cls:{cls} conf:{conf:.2f}"
             cv2.putText(img, label, (x1, max(0, y1 - 5)), cv2.FONT_HERSHEY_SIMPLEX, 0.5, (0, 200, 255), 1, cv2.LINE_AA)
         return img
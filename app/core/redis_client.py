@@ -1,24 +1,109 @@
 from __future__ import annotations
 import json
+import threading
 import time
-from typing import Any, Dict, Optional, List
+from typing import Any, Dict, Optional, List, Tuple
 import redis
+import redis.asyncio as aioredis
 
-from .config import CONFIG
+from .config import CONFIG, RedisConfig
 
 
-class RedisCache:
-    """Simple wrapper around Redis with TTL per entry."""
+_POOLS: Dict[tuple, redis.ConnectionPool] = {}
+_POOLS_LOCK = threading.Lock()
 
-    def __init__(self, prefix: str = "pi-live") -> None:
-        self.prefix = prefix
-        self.r = redis.Redis(
-            host=CONFIG.redis.host,
-            port=CONFIG.redis.port,
-            db=CONFIG.redis.db,
-            password=CONFIG.redis.password,
-            decode_responses=True,
+
+def get_pool(cfg: Optional[RedisConfig] = None) -> redis.ConnectionPool:
+    """Return the process-wide binary connection pool for `cfg`.
+
+    Every RedisCache (including the one behind each Redis log handler) shares
+    the same pool, so frames and JSON reuse already-open sockets. Responses are
+    never decoded at the connection level; text helpers decode explicitly.
+    """
+    cfg = cfg or CONFIG.redis
+    key = (cfg.unix_socket_path, cfg.host, cfg.port, cfg.db, cfg.password, cfg.max_connections)
+    with _POOLS_LOCK:
+        pool = _POOLS.get(key)
+        if pool is None:
+            if cfg.unix_socket_path:
+                pool = redis.ConnectionPool(
+                    connection_class=redis.UnixDomainSocketConnection,
+                    path=cfg.unix_socket_path,
+                    db=cfg.db,
+                    password=cfg.password,
+                    max_connections=cfg.max_connections,
+                    decode_responses=False,
+                )
+            else:
+                pool = redis.ConnectionPool(
+                    host=cfg.host,
+                    port=cfg.port,
+                    db=cfg.db,
+                    password=cfg.password,
+                    max_connections=cfg.max_connections,
+                    decode_responses=False,
+                )
+            _POOLS[key] = pool
+        return pool
+
+
+def get_async_pool(cfg: Optional[RedisConfig] = None) -> aioredis.BlockingConnectionPool:
+    """Binary-safe asyncio connection pool with the same settings as `get_pool()`.
+
+    Blocking pool: when all `max_connections` are busy, callers wait for a
+    free connection instead of failing with "Too many connections". Connections
+    bind to the event loop that first uses them, so use one pool per loop.
+    """
+    cfg = cfg or CONFIG.redis
+    if cfg.unix_socket_path:
+        return aioredis.BlockingConnectionPool(
+            connection_class=aioredis.UnixDomainSocketConnection,
+            path=cfg.unix_socket_path,
+            db=cfg.db,
+            password=cfg.password,
+            max_connections=cfg.max_connections,
+            decode_responses=False,
         )
+    return aioredis.BlockingConnectionPool(
+        host=cfg.host,
+        port=cfg.port,
+        db=cfg.db,
+        password=cfg.password,
+        max_connections=cfg.max_connections,
+        decode_responses=False,
+    )
+
+
+def _text(v: Any) -> Any:
+    return v.decode("utf-8", errors="replace") if isinstance(v, bytes) else v
+
+
+def _json_or_text(v: Any) -> Any:
+    try:
+        return json.loads(v) if v else None
+    except Exception:
+        return _text(v)
+
+
+# Per-stream keys, as written by the ingestor / pipeline; with the stream index
+# they let the API list live keys without SCANning the whole keyspace
+STREAM_KEYS: Tuple[str, ...] = (
+    "frame:{}", "frame:annotated:{}", "frame:frame:{}", "frame:frame:annotated:{}",
+    "status:{}", "frames:{}", "results:{}", "tracks:{}", "control:{}", "viewer:{}",
+)
+
+
+class _KeySpace:
+    """Key layout shared by RedisCache and AsyncRedisCache.
+
+    Besides the plain keys, writers maintain small indexes so readers never SCAN:
+      index:streams       set of stream names that published frames or results
+      index:logs          set of log list keys (`logs`, `logs:<logger>`)
+      index:<kind>        hash field -> JSON for `<kind>:<field>` values (probe, metrics);
+                          values carry a unix `ts`, entries older than their TTL are dropped on read
+    """
+
+    prefix: str
 
     def _k(self, *parts: str) -> str:
         return ":".join([self.prefix, *parts])
@@ -29,56 +114,266 @@ class RedisCache:
         key = key_or_parts
         return key if key.startswith(self.prefix + ":") else self._k(key)
 
+    def _frame_key(self, stream: str) -> str:
+        return stream if stream.startswith(self.prefix + ":") else self._k("frame", stream)
+
+    def _index_value(self, pipe: Any, kind: str, field: str, payload: str, ttl: int) -> None:
+        pipe.setex(self._k(kind, field), ttl, payload)
+        pipe.hset(self._k("index", kind), field, payload)
+        pipe.expire(self._k("index", kind), ttl)
+
+    def _index_member(self, pipe: Any, kind: str, member: str, ttl: int) -> None:
+        pipe.sadd(self._k("index", kind), member)
+        pipe.expire(self._k("index", kind), ttl)
+
+    @staticmethod
+    def _split_live(entries: Dict[Any, Any], max_age: float) -> Tuple[Dict[str, Any], List[Any]]:
+        """(live field -> decoded value, stale fields) of an index hash."""
+        live: Dict[str, Any] = {}
+        stale: List[Any] = []
+        cutoff = time.time() - max_age
+        for field, raw in entries.items():
+            value = _json_or_text(raw)
+            if isinstance(value, dict) and value.get("ts", 0) >= cutoff:
+                live[_text(field)] = value
+            else:
+                stale.append(field)
+        return live, stale
+
+    def _indexed_key_candidates(self, streams: List[Any], logs: List[Any], probes: List[Any], metrics: List[Any]) -> List[str]:
+        keys = [self._k("index", kind) for kind in ("streams", "logs", "probe", "metrics")]
+        keys += [self._k(t.format(_text(s))) for s in streams for t in STREAM_KEYS]
+        keys += [self._k(_text(k)) for k in logs]
+        keys += [self._k("probe", _text(f)) for f in probes]
+        keys += [self._k("metrics", _text(f)) for f in metrics]
+        return sorted(set(keys))
+
+
+def _number(v: Any) -> Any:
+    v = _text(v)
+    for cast in (int, float):
+        try:
+            return cast(v)
+        except (TypeError, ValueError):
+            pass
+    return v
+
+
+class FrameBatch:
+    """All Redis writes of one frame, sent as one MULTI/EXEC round trip.
+
+    Usage: `cache.batch(stream).frame(jpeg).announce(seq, ts).status(w=..).execute()`.
+    `status()` fields land in the compact `status:<stream>` hash, which replaces
+    the separate frame_seq / frame_ts / last_frame_meta keys and the per-frame
+    probe tick. Hashes and Redis Streams cannot carry a TTL per write, so their
+    EXPIRE (and the stream index) is refreshed at most every ttl/3 seconds
+    instead of on every frame.
+    """
+
+    def __init__(self, cache: "RedisCache", stream: str, ttl: Optional[int] = None) -> None:
+        self.cache = cache
+        self.stream = stream
+        self.ttl = ttl or CONFIG.redis.ttl_seconds
+        self.pipe = cache.r.pipeline(transaction=True)
+        self._fields: Dict[str, Any] = {}
+        self._notify: List[str] = []
+
+    def frame(self, data: bytes, aliases: tuple[str, ...] = ()) -> "FrameBatch":
+        """Raw frame JPEG (`frame:<stream>`, plus `frame:<alias>` keys)."""
+        for name in (self.stream, *aliases):
+            self.pipe.setex(self.cache._k("frame", name), self.ttl, data)
+        return self
+
+    def announce(self, seq: int, ts: float) -> "FrameBatch":
+        """New raw frame `seq` captured at `ts`: status fields plus an entry on `frames:<stream>`."""
+        self._fields.update(seq=seq, ts=repr(ts))
+        self._xadd("frames", seq, ts)
+        return self
+
+    def result(self, jpeg: Optional[bytes], tracks: Dict[str, Any], seq: int, ts: float, aliases: tuple[str, ...] = ()) -> "FrameBatch":
+        """Pipeline output for frame `seq`: annotated JPEG, tracks and an entry on `results:<stream>`."""
+        if jpeg is not None:
+            self.pipe.setex(self.cache._k("frame", "annotated", self.stream), self.ttl, jpeg)
+            for alias in aliases:
+                self.pipe.setex(self.cache._k("frame", alias), self.ttl, jpeg)
+        self.pipe.setex(self.cache._k("tracks", self.stream), self.ttl, json.dumps(tracks))
+        self._xadd("results", seq, ts)
+        return self
+
+    def status(self, **fields: Any) -> "FrameBatch":
+        self._fields.update(fields)
+        return self
+
+    def _xadd(self, kind: str, seq: int, ts: float) -> None:
+        key = self.cache._k(kind, self.stream)
+        self.pipe.xadd(key, {"seq": seq, "ts": ts}, maxlen=32, approximate=True)
+        self._notify.append(key)
+
+    def execute(self) -> None:
+        status_key = self.cache._k("status", self.stream)
+        if self._fields:
+            self.pipe.hset(status_key, mapping=self._fields)
+        expiring = (status_key, *self._notify)
+        if self.cache._refresh_due(expiring, self.ttl / 3.0):
+            for key in expiring:
+                self.pipe.expire(key, self.ttl)
+            self.cache._index_member(self.pipe, "streams", self.stream, self.ttl)
+        self.pipe.execute()
+
+
+class RedisCache(_KeySpace):
+    """Simple wrapper around Redis with TTL per entry.
+
+    All commands go through one shared, binary-safe connection pool
+    (TCP or unix socket, see RedisConfig).
+    """
+
+    def __init__(self, prefix: str = "pi-live", pool: Optional[redis.ConnectionPool] = None) -> None:
+        self.prefix = prefix
+        self.r = redis.Redis(connection_pool=pool or get_pool())
+        self._refreshed: Dict[Tuple[str, ...], float] = {}  # keys -> last TTL refresh (FrameBatch)
+
+    def _refresh_due(self, keys: Tuple[str, ...], interval: float) -> bool:
+        now = time.monotonic()
+        last = self._refreshed.get(keys)
+        if last is not None and now - last < interval:
+            return False
+        self._refreshed[keys] = now
+        return True
+
+    def batch(self, stream: str, ttl: Optional[int] = None) -> FrameBatch:
+        """Collect one frame's writes for `stream`; nothing is sent until `execute()`."""
+        return FrameBatch(self, stream, ttl)
+
     def set_json(self, key: str, value: Dict[str, Any], ttl: Optional[int] = None) -> None:
         ttl = ttl or CONFIG.redis.ttl_seconds
         self.r.setex(self._normalize_key(key), ttl, json.dumps(value))
 
     def get_json(self, key: str) -> Optional[Dict[str, Any]]:
         v = self.r.get(self._normalize_key(key))
-        return json.loads(v) if v else None
+        if not v:
+            return None
+        try:
+            return json.loads(v)
+        except ValueError:
+            # Binary value (e.g. a JPEG frame) stored under this key
+            return None
 
     def push_frame(self, stream: str, frame_bytes: bytes, ttl: Optional[int] = None) -> None:
         ttl = ttl or CONFIG.redis.ttl_seconds
         key = self._k("frame", stream)
-        rb = redis.Redis(
-            host=CONFIG.redis.host,
-            port=CONFIG.redis.port,
-            db=CONFIG.redis.db,
-            password=CONFIG.redis.password,
-            decode_responses=False,
-        )
-        rb.setex(key, ttl, frame_bytes)
+        self.r.setex(key, ttl, frame_bytes)
 
     def get_frame(self, stream: str) -> Optional[bytes]:
-        key = stream if stream.startswith(self.prefix + ":") else self._k("frame", stream)
-        rb = redis.Redis(
-            host=CONFIG.redis.host,
-            port=CONFIG.redis.port,
-            db=CONFIG.redis.db,
-            password=CONFIG.redis.password,
-            decode_responses=False,
-        )
-        return rb.get(key)
+        return self.r.get(self._frame_key(stream))
+
+    # Frame handoff: each published frame bumps a per-stream sequence number and
+    # appends {seq, ts} to a capped Redis Stream that consumers can block on.
+    def publish_frame(
+        self,
+        stream: str,
+        frame_bytes: Optional[bytes],
+        seq: int,
+        ts: Optional[float] = None,
+        ttl: Optional[int] = None,
+        aliases: tuple[str, ...] = (),
+    ) -> None:
+        batch = self.batch(stream, ttl)
+        if frame_bytes is not None:
+            # None = pixels travel out of band (shared-memory ring); only announce
+            batch.frame(frame_bytes, aliases)
+        batch.announce(seq, ts if ts is not None else time.time()).execute()
+
+    def get_frame_seq(self, stream: str) -> int:
+        v = self.r.hget(self._k("status", stream), "seq")
+        return int(v) if v else 0
+
+    def get_latest_frame(self, stream: str) -> Tuple[Optional[int], Optional[float], Optional[bytes]]:
+        """Atomically read the latest frame with the sequence number and capture time it was published with."""
+        pipe = self.r.pipeline(transaction=True)
+        pipe.hmget(self._k("status", stream), "seq", "ts")
+        pipe.get(self._k("frame", stream))
+        (seq, ts), raw = pipe.execute()
+        return (int(seq) if seq else None), (float(ts) if ts else None), raw
+
+    def get_status(self, stream: str) -> Dict[str, Any]:
+        return {_text(k): _number(v) for k, v in self.r.hgetall(self._k("status", stream)).items()}
+
+    def wait_frame_event(self, stream: str, last_id: str = "$", timeout_ms: int = 1000) -> Optional[Tuple[str, int]]:
+        """Block until a frame newer than stream entry `last_id` is announced.
+
+        Returns (entry_id, seq) of the newest announcement, or None on timeout.
+        """
+        res = self.r.xread({self._k("frames", stream): last_id}, block=timeout_ms)
+        if not res:
+            return None
+        entry_id, fields = res[0][1][-1]
+        return _text(entry_id), int(fields.get(b"seq", 0))
+
+    # Pipeline results: annotated JPEG + tracks written together and announced on
+    # `results:<stream>`, so the API can push them to viewers instead of being polled
+    def publish_result(
+        self,
+        stream: str,
+        frame_bytes: Optional[bytes],
+        tracks: Dict[str, Any],
+        seq: int,
+        ts: float,
+        ttl: Optional[int] = None,
+        aliases: tuple[str, ...] = (),
+    ) -> None:
+        self.batch(stream, ttl).result(frame_bytes, tracks, seq, ts, aliases).execute()
+
+    def wait_result_event(self, stream: str, last_id: str = "$", timeout_ms: int = 1000) -> Optional[Tuple[str, int, float]]:
+        """Block until a result newer than `last_id` is announced; (entry_id, seq, ts) of the newest, or None."""
+        res = self.r.xread({self._k("results", stream): last_id}, block=timeout_ms)
+        if not res:
+            return None
+        entry_id, fields = res[0][1][-1]
+        return _text(entry_id), int(fields.get(b"seq", 0)), float(fields.get(b"ts", 0.0))
+
+    def get_result(self, stream: str) -> Tuple[int, float, Optional[bytes], Optional[bytes]]:
+        """Latest (seq, ts, annotated JPEG, raw tracks JSON) of a stream in one round trip."""
+        pipe = self.r.pipeline(transaction=True)
+        pipe.xrevrange(self._k("results", stream), count=1)
+        pipe.get(self._k("frame", "annotated", stream))
+        pipe.get(self._k("tracks", stream))
+        last, jpeg, tracks = pipe.execute()
+        fields = last[0][1] if last else {}
+        return int(fields.get(b"seq", 0)), float(fields.get(b"ts", 0.0)), jpeg, tracks
+
+    # Viewer interest: the API holds a short lease while someone looks at a stream
+    def touch_viewer(self, stream: str, ttl: int) -> None:
+        self.r.setex(self._k("viewer", stream), ttl, 1)
+
+    def has_viewer(self, stream: str) -> bool:
+        return bool(self.r.exists(self._k("viewer", stream)))
 
     def publish_probe(self, stream: str, status: str, details: Optional[Dict[str, Any]] = None) -> None:
         data = {"ts": int(time.time()), "status": status, "details": details or {}}
-        self.set_json(f"probe:{stream}", data)
+        self.set_indexed_json("probe", stream, data)
 
-    def list_keys(self, pattern: str = "*") -> list[str]:
-        return [k for k in self.r.scan_iter(self._k(pattern))]
+    def set_indexed_json(self, kind: str, field: str, value: Dict[str, Any], ttl: Optional[int] = None) -> None:
+        """Write `<kind>:<field>` and its entry in the `index:<kind>` hash in one round trip."""
+        pipe = self.r.pipeline(transaction=False)
+        self._index_value(pipe, kind, field, json.dumps(value), ttl or CONFIG.redis.ttl_seconds)
+        pipe.execute()
+
+    def list_keys(self, pattern: str = "*", limit: Optional[int] = None) -> list[str]:
+        """SCAN the keyspace (O(keyspace); debugging only, request paths use the indexes)."""
+        keys: list[str] = []
+        for k in self.r.scan_iter(self._k(pattern), count=1000):
+            keys.append(_text(k))
+            if limit is not None and len(keys) >= limit:
+                break
+        return keys
 
     def get_many(self, keys: list[str]) -> Dict[str, Any]:
         pipe = self.r.pipeline()
         for k in keys:
             pipe.get(k if k.startswith(self.prefix + ":") else self._k(k))
         vals = pipe.execute()
-        out = {}
-        for k, v in zip(keys, vals):
-            try:
-                out[k] = json.loads(v) if v else None
-            except Exception:
-                out[k] = v
-        return out
+        return {k: _json_or_text(v) for k, v in zip(keys, vals)}
 
     # Log helpers
     def push_log_json(self, key: str, value: Dict[str, Any], ttl: Optional[int] = None, capacity: int = 500) -> None:
@@ -88,6 +383,19 @@ class RedisCache:
         pipe.lpush(k, json.dumps(value))
         pipe.ltrim(k, 0, capacity - 1)
         pipe.expire(k, ttl)
+        self._index_member(pipe, "logs", k[len(self.prefix) + 1:], ttl)
+        pipe.execute()
+
+    def push_logs_json(self, batches: Dict[str, List[Dict[str, Any]]], ttl: Optional[int] = None, capacity: int = 500) -> None:
+        """Append several entries to several log lists in one round trip (entries oldest first)."""
+        ttl = ttl or CONFIG.redis.ttl_seconds
+        pipe = self.r.pipeline(transaction=False)
+        for key, values in batches.items():
+            k = self._normalize_key(key)
+            pipe.lpush(k, *[json.dumps(v) for v in values[-capacity:]])
+            pipe.ltrim(k, 0, capacity - 1)
+            pipe.expire(k, ttl)
+            self._index_member(pipe, "logs", k[len(self.prefix) + 1:], ttl)
         pipe.execute()
 
     def read_logs(self, key: str, n: int = 100) -> list[Dict[str, Any]]:
@@ -100,3 +408,121 @@ class RedisCache:
             except Exception:
                 pass
         return out
+
+
+class AsyncRedisCache(_KeySpace):
+    """asyncio counterpart of RedisCache for the API server (read side plus the few writes it does).
+
+    Same key layout and value encoding as RedisCache; every call awaits its own
+    pooled connection, so a slow command (e.g. a SCAN over a large keyspace)
+    never holds up other requests on the event loop.
+    """
+
+    def __init__(self, prefix: str = "pi-live", pool: Optional[aioredis.ConnectionPool] = None) -> None:
+        self.prefix = prefix
+        self.r = aioredis.Redis(connection_pool=pool or get_async_pool())
+
+    async def set_json(self, key: str, value: Dict[str, Any], ttl: Optional[int] = None) -> None:
+        ttl = ttl or CONFIG.redis.ttl_seconds
+        await self.r.setex(self._normalize_key(key), ttl, json.dumps(value))
+
+    async def get_json(self, key: str) -> Optional[Dict[str, Any]]:
+        v = await self.r.get(self._normalize_key(key))
+        if not v:
+            return None
+        try:
+            return json.loads(v)
+        except ValueError:
+            return None
+
+    async def get_frame(self, stream: str) -> Optional[bytes]:
+        return await self.r.get(self._frame_key(stream))
+
+    async def get_result(self, stream: str) -> Tuple[int, float, Optional[bytes], Optional[bytes]]:
+        """Latest (seq, ts, annotated JPEG, raw tracks JSON) of a stream in one round trip."""
+        pipe = self.r.pipeline(transaction=True)
+        pipe.xrevrange(self._k("results", stream), count=1)
+        pipe.get(self._k("frame", "annotated", stream))
+        pipe.get(self._k("tracks", stream))
+        last, jpeg, tracks = await pipe.execute()
+        fields = last[0][1] if last else {}
+        return int(fields.get(b"seq", 0)), float(fields.get(b"ts", 0.0)), jpeg, tracks
+
+    async def wait_result_event(self, stream: str, last_id: str = "$", timeout_ms: int = 1000) -> Optional[Tuple[str, int, float]]:
+        """Block until a result newer than `last_id` is announced; (entry_id, seq, ts) of the newest, or None."""
+        res = await self.r.xread({self._k("results", stream): last_id}, block=timeout_ms)
+        if not res:
+            return None
+        entry_id, fields = res[0][1][-1]
+        return _text(entry_id), int(fields.get(b"seq", 0)), float(fields.get(b"ts", 0.0))
+
+    async def get_status(self, stream: str) -> Dict[str, Any]:
+        return {_text(k): _number(v) for k, v in (await self.r.hgetall(self._k("status", stream))).items()}
+
+    async def get_statuses(self) -> Dict[str, Dict[str, Any]]:
+        """`status:<stream>` hashes of every indexed stream (one SMEMBERS plus one pipeline)."""
+        streams = sorted(_text(s) for s in await self.r.smembers(self._k("index", "streams")))
+        pipe = self.r.pipeline(transaction=False)
+        for name in streams:
+            pipe.hgetall(self._k("status", name))
+        rows = await pipe.execute() if streams else []
+        return {name: {_text(k): _number(v) for k, v in row.items()} for name, row in zip(streams, rows) if row}
+
+    async def touch_viewer(self, stream: str, ttl: int) -> None:
+        await self.r.setex(self._k("viewer", stream), ttl, 1)
+
+    async def set_indexed_json(self, kind: str, field: str, value: Dict[str, Any], ttl: Optional[int] = None) -> None:
+        pipe = self.r.pipeline(transaction=False)
+        self._index_value(pipe, kind, field, json.dumps(value), ttl or CONFIG.redis.ttl_seconds)
+        await pipe.execute()
+
+    async def get_indexed_json(self, kind: str, max_age: Optional[float] = None) -> Dict[str, Any]:
+        """Live entries of `index:<kind>` (one HGETALL); entries older than `max_age` are dropped from the index."""
+        index = self._k("index", kind)
+        live, stale = self._split_live(await self.r.hgetall(index), max_age or CONFIG.redis.ttl_seconds)
+        if stale:
+            await self.r.hdel(index, *stale)
+        return live
+
+    async def indexed_keys(self) -> list[str]:
+        """Existing keys known to the indexes: O(streams + loggers + processes), no SCAN."""
+        pipe = self.r.pipeline(transaction=False)
+        for kind in ("streams", "logs"):
+            pipe.smembers(self._k("index", kind))
+        for kind in ("probe", "metrics"):
+            pipe.hkeys(self._k("index", kind))
+        candidates = self._indexed_key_candidates(*await pipe.execute())
+        pipe = self.r.pipeline(transaction=False)
+        for k in candidates:
+            pipe.exists(k)
+        return [k for k, n in zip(candidates, await pipe.execute()) if n]
+
+    async def list_keys(self, pattern: str = "*", limit: Optional[int] = None) -> list[str]:
+        """SCAN the keyspace (O(keyspace); debugging only, request paths use the indexes)."""
+        keys: list[str] = []
+        async for k in self.r.scan_iter(self._k(pattern), count=1000):
+            keys.append(_text(k))
+            if limit is not None and len(keys) >= limit:
+                break
+        return keys
+
+    async def get_many(self, keys: list[str]) -> Dict[str, Any]:
+        pipe = self.r.pipeline()
+        for k in keys:
+            pipe.get(k if k.startswith(self.prefix + ":") else self._k(k))
+        vals = await pipe.execute()
+        return {k: _json_or_text(v) for k, v in zip(keys, vals)}
+
+    async def read_logs(self, key: str, n: int = 100) -> list[Dict[str, Any]]:
+        entries = await self.r.lrange(self._normalize_key(key), 0, max(0, n - 1))
+        out: list[Dict[str, Any]] = []
+        for e in entries:
+            try:
+                out.append(json.loads(e))
+            except Exception:
+                pass
+        return out
+
+    async def close(self) -> None:
+        await self.r.aclose()
+        await self.r.connection_pool.disconnect()
@@ -6,6 +6,7 @@ from app.core.config import CONFIG
 from app.core.redis_client import RedisCache
 from app.core.pipeline import DetectionPipeline
 from app.infer.hailo_infer import HailoYoloV8
+from app.infer.pipelined import PipelinedInference
 from app.utils.logging_setup import setup_logging
 
 
@@ -23,6 +24,8 @@ def main():
         sys.exit(1)
     cache = RedisCache()
     hailo = HailoYoloV8(CONFIG.hailo)
+    if CONFIG.hailo.pipeline_depth > 0:
+        hailo = PipelinedInference(hailo, depth=CONFIG.hailo.pipeline_depth)
     pipe = DetectionPipeline(stream, cache, hailo)
     pipe.start()
     try:
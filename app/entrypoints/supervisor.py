@@ -0,0 +1,253 @@
+"""Single-entry supervisor: all streams on one host without one interpreter per stream and stage.
+
+Process layout (CONFIG.supervisor):
+  - ingest-<i>:    SUPERVISOR_INGEST_PROCS processes, each running RTSPIngestor threads for its share of streams
+  - inference:     the only process that opens the Hailo device (HailoYoloV8 + scheduler / pipelined stages)
+  - post-<i>:      SUPERVISOR_POST_WORKERS processes running DetectionPipeline (track / annotate / publish) threads
+                   whose detector is a RemoteDetector talking to the inference process
+
+Frames reach the post workers through the configured frame transport (Redis or
+the shm ring); inference inputs go from post workers to the inference process
+through per-stream shared-memory request rings, with only (stream, seq, tile)
+tuples on a pipe per post worker. Children send heartbeats; dead or stalled
+children are restarted with exponential backoff.
+
+    python -m app.entrypoints.supervisor
+"""
+from __future__ import annotations
+import multiprocessing as mp
+import os
+import signal
+import threading
+import time
+from typing import Any, Callable, Dict, List, Optional, Sequence
+
+from app.core.config import CONFIG, RTSPConfig
+from app.utils.logging_setup import setup_logging
+
+
+log = setup_logging("svc.supervisor")
+
+
+def _partition(streams: Sequence[RTSPConfig], n: int) -> List[List[str]]:
+    groups: List[List[str]] = [[] for _ in range(max(1, min(n, len(streams))))]
+    for i, s in enumerate(streams):
+        groups[i % len(groups)].append(s.name)
+    return groups
+
+
+def _streams(names: Sequence[str]) -> List[RTSPConfig]:
+    return [s for s in CONFIG.rtsp_streams if s.name in names]
+
+
+# ---------------------------- child processes ----------------------------
+def _serve(role: str, heartbeat: Any, threads: Sequence[threading.Thread], stop: Callable[[], None]) -> None:
+    """Heartbeat while every worker thread is alive; exit non-zero (-> restart) as soon as one dies."""
+    from app.core.redis_client import RedisCache
+    from app.utils.metrics import METRICS
+
+    clog = setup_logging(f"svc.{role}")
+    done = threading.Event()
+    signal.signal(signal.SIGTERM, lambda *_: done.set())
+    signal.signal(signal.SIGINT, lambda *_: done.set())
+    cache = RedisCache()
+    while not done.is_set():
+        dead = [t.name for t in threads if not t.is_alive()]
+        if dead:
+            clog.error("%s: worker thread(s) %s exited; restarting process", role, ", ".join(dead))
+            os._exit(1)
+        heartbeat.value = time.time()
+        METRICS.maybe_flush(cache)
+        done.wait(1.0)
+    stop()
+    for t in threads:
+        t.join(timeout=3.0)
+
+
+def _ingest_main(role: str, names: List[str], heartbeat: Any) -> None:
+    from app.core.redis_client import RedisCache
+    from app.ingest.rtsp_ingestor import RTSPIngestor
+
+    cache = RedisCache()
+    ingestors = [RTSPIngestor(s, cache) for s in _streams(names)]
+    for ing in ingestors:
+        ing.start()
+
+    def stop() -> None:
+        for ing in ingestors:
+            ing.stop_event.set()
+
+    _serve(role, heartbeat, ingestors, stop)
+
+
+def _inference_main(role: str, requests: Any, responses: Dict[int, Any], heartbeat: Any) -> None:
+    from app.infer.hailo_infer import HailoYoloV8
+    from app.infer.remote import InferenceServer
+    from app.infer.scheduler import InferenceScheduler, create_frontend
+
+    frontend = create_frontend(HailoYoloV8(CONFIG.hailo), CONFIG.rtsp_streams)
+    server = InferenceServer(frontend, CONFIG.rtsp_streams, requests, responses)
+    server.start()
+    threads: List[threading.Thread] = [server]
+    if isinstance(frontend, InferenceScheduler):
+        threads.append(frontend)
+
+    def stop() -> None:
+        server.stop_event.set()
+        frontend.stop()
+
+    _serve(role, heartbeat, threads, stop)
+
+
+def _post_main(role: str, worker_id: int, names: List[str], requests: Any, responses: Any, heartbeat: Any) -> None:
+    from app.core.pipeline import DetectionPipeline
+    from app.core.redis_client import RedisCache
+    from app.infer.remote import RemoteClient
+
+    cache = RedisCache()
+    sup = CONFIG.supervisor
+    client = RemoteClient(worker_id, requests, responses, timeout_s=sup.infer_timeout_s)
+    depth = max(1, CONFIG.hailo.pipeline_depth)
+    detectors = [client.detector(s, slots=sup.request_slots, depth=depth) for s in _streams(names)]
+    pipelines = [DetectionPipeline(d.cfg, cache, d) for d in detectors]
+    for p in pipelines:
+        p.start()
+
+    def stop() -> None:
+        for p in pipelines:
+            p.stop_event.set()
+        for p in pipelines:
+            p.join(timeout=3.0)
+        client.stop()
+        for d in detectors:
+            d.close()
+
+    _serve(role, heartbeat, pipelines, stop)
+
+
+# ---------------------------- supervisor ----------------------------
+class _Child:
+    def __init__(self, role: str, target: Callable[..., None], args: tuple, ctx: Any) -> None:
+        self.role = role
+        self.target = target
+        self.args = args
+        self.ctx = ctx
+        self.heartbeat = ctx.RawValue("d", 0.0)
+        self.proc: Optional[Any] = None
+        self.started_at = 0.0
+        self.launched = 0.0  # wall clock, comparable with the child's heartbeats
+        self.restarts = 0
+        self.next_start = 0.0
+
+    def start(self) -> None:
+        self.launched = time.time()
+        self.heartbeat.value = self.launched
+        self.proc = self.ctx.Process(target=self.target, args=(self.role, *self.args, self.heartbeat), name=f"pi-live-{self.role}", daemon=False)
+        self.proc.start()
+        self.started_at = time.monotonic()
+
+    def ready(self) -> bool:
+        """True once the child has sent a heartbeat of its own, i.e. finished starting up."""
+        return self.heartbeat.value > self.launched
+
+    def stop(self, timeout: float = 5.0) -> None:
+        if self.proc is None or not self.proc.is_alive():
+            return
+        self.proc.terminate()
+        self.proc.join(timeout)
+        if self.proc.is_alive():
+            self.proc.kill()
+            self.proc.join(1.0)
+
+    def status(self) -> Dict[str, Any]:
+        proc = self.proc
+        alive = proc is not None and proc.is_alive()
+        return {
+            "alive": alive,
+            "pid": proc.pid if proc is not None and alive else None,
+            "starting": alive and not self.ready(),
+            "restarts": self.restarts,
+            "heartbeat_age_s": round(time.time() - self.heartbeat.value, 1),
+        }
+
+
+class Supervisor:
+    """Starts the ingest, inference and post-processing children and keeps them running."""
+
+    def __init__(self) -> None:
+        self.cfg = CONFIG.supervisor
+        self.ctx = mp.get_context("spawn")  # no forked copies of cv2 / HailoRT state
+        self.stop_event = threading.Event()
+        streams = CONFIG.rtsp_streams
+        post_groups = _partition(streams, self.cfg.post_workers)
+        # One request and one reply pipe per post worker; the supervisor keeps both ends
+        # open, so they outlive restarts of either side
+        requests, responses = {}, {}
+        for i in range(len(post_groups)):
+            requests[i] = self.ctx.Pipe(duplex=False)  # (inference reads, worker writes)
+            responses[i] = self.ctx.Pipe(duplex=False)  # (worker reads, inference writes)
+        self.children: List[_Child] = [
+            _Child(f"ingest-{i}", _ingest_main, (names,), self.ctx) for i, names in enumerate(_partition(streams, self.cfg.ingest_processes))
+        ]
+        self.children.append(_Child(
+            "inference", _inference_main, ({i: r for i, (r, _) in requests.items()}, {i: w for i, (_, w) in responses.items()}), self.ctx,
+        ))
+        self.children += [
+            _Child(f"post-{i}", _post_main, (i, names, requests[i][1], responses[i][0]), self.ctx) for i, names in enumerate(post_groups)
+        ]
+
+    def _check(self, child: _Child, now: float) -> None:
+        proc = child.proc
+        if proc is not None and proc.is_alive():
+            ready = child.ready()
+            # Children only beat once they are serving; until then they get the startup timeout
+            limit = self.cfg.heartbeat_timeout_s if ready else self.cfg.startup_timeout_s
+            if time.time() - child.heartbeat.value <= limit:
+                if ready and now - child.started_at > 60.0:
+                    child.restarts = 0  # stable again
+                return
+            log.error("%s (pid %d) %s for %.0fs; restarting", child.role, proc.pid, "missed heartbeats" if ready else "did not finish starting", limit)
+            child.stop()
+        if child.next_start == 0.0:
+            code = proc.exitcode if proc is not None else None
+            delay = min(self.cfg.max_restart_backoff_s, 2.0 ** child.restarts)
+            log.warning("%s exited (code %s); restarting in %.0fs", child.role, code, delay)
+            child.next_start = now + delay
+        if now >= child.next_start:
+            child.restarts += 1
+            child.next_start = 0.0
+            child.start()
+
+    def run(self) -> None:
+        from app.core.redis_client import RedisCache
+
+        cache = RedisCache()
+        log.info("Starting %d children for %d streams", len(self.children), len(CONFIG.rtsp_streams))
+        for child in self.children:
+            child.start()
+        while not self.stop_event.wait(1.0):
+            now = time.monotonic()
+            for child in self.children:
+                self._check(child, now)
+            try:
+                cache.publish_probe("supervisor", "ok", {c.role: c.status() for c in self.children})
+            except Exception:
+                pass
+        log.info("Stopping children")
+        # Consumers first, so nothing waits on a process that is already gone
+        for child in reversed(self.children):
+            child.stop()
+
+    def stop(self) -> None:
+        self.stop_event.set()
+
+
+def main() -> None:
+    sup = Supervisor()
+    signal.signal(signal.SIGTERM, lambda *_: sup.stop())
+    signal.signal(signal.SIGINT, lambda *_: sup.stop())
+    sup.run()
+
+
+if __name__ == "__main__":
+    main()
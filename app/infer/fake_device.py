@@ -0,0 +1,50 @@
+from __future__ import annotations
+import time
+from typing import Any, List, Optional, Tuple
+
+import numpy as np
+
+from app.infer.postprocess import DET_DTYPE
+from app.infer.roi import DetectionFilter
+
+
+class FakeDetector:
+    """Deterministic hardware-free stand-in for HailoYoloV8.
+
+    Implements the same stage API (preprocess / run_device / postprocess /
+    infer_batch / infer). Each stage sleeps for a configurable time, which, like
+    real device I/O and most cv2/NumPy work, releases the GIL, so stage overlap
+    can be measured without a Hailo device. The single detection returned per
+    frame is derived from the frame size, so results are reproducible; detection
+    filters are accepted and ignored.
+    """
+
+    def __init__(self, pre_ms: float = 4.0, device_ms: float = 12.0, post_ms: float = 4.0, input_size: int = 640) -> None:
+        self.pre_s = pre_ms / 1000.0
+        self.device_s = device_ms / 1000.0
+        self.post_s = post_ms / 1000.0
+        self.input_size = input_size
+        self.device_calls = 0
+
+    def preprocess(self, image_bgr: np.ndarray, filt: Optional[DetectionFilter] = None) -> Tuple[Optional[np.ndarray], Tuple[Any, ...]]:
+        time.sleep(self.pre_s)
+        return np.zeros((1,), dtype=np.uint8), ("fake", image_bgr.shape)
+
+    def run_device(self, inputs: List[Optional[np.ndarray]]) -> List[Any]:
+        # Batched calls amortize a fixed per-call overhead (modelled as half the frame time)
+        time.sleep(self.device_s * (0.5 + 0.5 * len(inputs)))
+        self.device_calls += 1
+        return [True for _ in inputs]
+
+    def postprocess(self, raw: Any, meta: Tuple[Any, ...]) -> np.ndarray:
+        time.sleep(self.post_s)
+        h, w = meta[1][:2]
+        return np.array([(w * 0.25, h * 0.25, w * 0.75, h * 0.75, 0, 0.9)], dtype=DET_DTYPE)
+
+    def infer_batch(self, images: List[np.ndarray], filters: Optional[List[Optional[DetectionFilter]]] = None) -> List[np.ndarray]:
+        staged = [self.preprocess(img) for img in images]
+        raws = self.run_device([inp for inp, _ in staged])
+        return [self.postprocess(raw, meta) for raw, (_, meta) in zip(raws, staged)]
+
+    def infer(self, image_bgr: np.ndarray, filt: Optional[DetectionFilter] = None) -> np.ndarray:
+        return self.infer_batch([image_bgr])[0]
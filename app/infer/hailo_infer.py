@@ -1,6 +1,7 @@
 from __future__ import annotations
 import importlib
 import os
+import threading
 import tempfile
 import urllib.request
 from pathlib import Path
@@ -10,7 +11,11 @@ import cv2
 import numpy as np
 
 from app.utils.logging_setup import setup_logging
+from app.utils.metrics import METRICS, SHARED
 from app.core.config import HailoConfig
+from app.infer.letterbox import LetterboxCache
+from app.infer.postprocess import build_detections, empty_dets, select_candidates
+from app.infer.roi import DetectionFilter
 
 
 # Prefer user-writable cache path by default; can be overridden via YOLO_ONNX_PATH
@@ -50,6 +55,11 @@ class HailoYoloV8:
         self._output_vstreams = None
         self._hailo_input_shape: Optional[Tuple[int, int]] = None  # (H, W)
         self._logged_shapes = False
+        # One device / one cv2.dnn net: serialize access from concurrent pipelines
+        self._lock = threading.Lock()
+        self._onnx_batch_ok = True  # cleared if the ONNX graph has a fixed batch of 1
+        # Per-(camera shape, model shape) letterbox plans with reusable input canvases
+        self._letterbox_cache = LetterboxCache()
         self._init_hailo_or_cpu()
 
     # ---------------------------- Hailo path ----------------------------
@@ -147,131 +157,159 @@ class HailoYoloV8:
             self.log.error("Failed to initialize OpenCV DNN ONNX: %s", e)
 
     # ---------------------------- Inference ----------------------------
-    def infer(self, image_bgr: np.ndarray) -> List[Dict[str, Any]]:
-        """Run inference; return list of detections with keys: [cls, conf, x1,y1,x2,y2].
+    def infer(self, image_bgr: np.ndarray, filt: Optional[DetectionFilter] = None) -> np.ndarray:
+        """Run inference; return a DET_DTYPE array (fields x1, y1, x2, y2, cls, conf).
         - If Hailo is not available or disabled, uses CPU ONNX fallback.
-        - Returns empty list if neither path is available.
+        - Returns an empty array if neither path is available.
+        - Use app.infer.postprocess.dets_to_dicts() where dicts are needed.
+        - `filt` (per-stream ROI / class allow-list) is applied before NMS.
         """
+        return self.infer_batch([image_bgr], [filt])[0]
+
+    def infer_batch(self, images: List[np.ndarray], filters: Optional[List[Optional[DetectionFilter]]] = None) -> List[np.ndarray]:
+        """Run inference on several frames (typically one per stream) in one device pass.
+
+        `filters` optionally gives a DetectionFilter per image. Returns one
+        DET_DTYPE array per input image, in order. Thread-safe: letterbox canvases
+        are pooled per thread, so concurrent callers never share one.
+        """
+        if not images:
+            return []
+        # Every frame of the batch needs its own input canvas until run_device() returns
+        self.reserve_buffers(len(images))
+        filters = filters or [None] * len(images)
+        staged = [self.preprocess(img, filt) for img, filt in zip(images, filters)]
+        raws = self.run_device([inp for inp, _ in staged])
+        return [self.postprocess(raw, meta) for raw, (_, meta) in zip(raws, staged)]
+
+    # ------------- Stages (used separately by app.infer.pipelined) -------------
+    # preprocess() and postprocess() are pure CPU work and may run on any thread;
+    # run_device() is the only stage touching the accelerator / DNN net.
+    def _backend(self) -> Optional[str]:
         if self.cfg.enabled and self.available and self._configured:
-            return self._infer_hailo(image_bgr)
+            return "hailo"
         if CPU_FALLBACK and self._dnn_net is not None:
-            return self._infer_onnx(image_bgr)
-        return []
+            return "onnx"
+        return None
+
+    def reserve_buffers(self, n: int) -> None:
+        """Keep at least `n` preprocessed inputs per thread alive at once (frames queued before the device)."""
+        self._letterbox_cache.reserve(n)
+
+    def preprocess(self, image_bgr: np.ndarray, filt: Optional[DetectionFilter] = None) -> Tuple[Optional[np.ndarray], Tuple[Any, ...]]:
+        """Model input tensor for one frame plus the metadata postprocess() needs.
+
+        The Hailo input is a buffer from the calling thread's pool that is reused
+        after reserve_buffers() further frames of that thread; callers must hand it
+        to run_device() before then. With a cropping `filt`, only the ROI bounding
+        rectangle is fed to the model.
+        """
+        with METRICS.time(SHARED, "preprocess"):
+            backend = self._backend()
+            src, origin = image_bgr, (0.0, 0.0)
+            rect = filt.crop_rect(image_bgr.shape) if filt is not None else None
+            if rect is not None:
+                x0, y0, x1, y1 = rect
+                src, origin = image_bgr[y0:y1, x0:x1], (float(x0), float(y0))
+            if backend == "hailo":
+                pre_img, plan = self._letterbox_cache.apply(src, self._hailo_input_shape or (640, 640))
+                return pre_img, (backend, image_bgr.shape, plan.scale, plan.left, plan.top, origin, filt)
+            if backend == "onnx":
+                blob, _, _ = self._preprocess(src, YOLO_ONNX_IMG_SIZE)
+                return blob, (backend, image_bgr.shape, YOLO_ONNX_IMG_SIZE, src.shape, origin, filt)
+            return None, (None,)
+
+    def run_device(self, inputs: List[Optional[np.ndarray]]) -> List[Any]:
+        """Execute preprocessed inputs on the accelerator (or DNN net); one raw output per input."""
+        with METRICS.time(SHARED, "device"):
+            if not inputs:
+                return []
+            with self._lock:
+                backend = self._backend()
+                if backend == "hailo":
+                    return self._run_hailo(inputs)
+                if backend == "onnx":
+                    return self._run_onnx(inputs)
+            return [None for _ in inputs]
+
+    def postprocess(self, raw: Any, meta: Tuple[Any, ...]) -> np.ndarray:
+        with METRICS.time(SHARED, "postprocess"):
+            if raw is None:
+                return empty_dets()
+            if meta[0] == "hailo":
+                return self._postprocess_hailo(raw, *meta[1:])
+            if meta[0] == "onnx":
+                return self._postprocess_onnx(raw, *meta[1:])
+            return empty_dets()
 
     # ---------------------------- Hailo inference ----------------------------
-    def _letterbox(self, img: np.ndarray, new_shape: Tuple[int, int]) -> Tuple[np.ndarray, float, float, Tuple[int, int]]:
-        h, w = img.shape[:2]
-        new_h, new_w = new_shape
-        scale = min(new_w / w, new_h / h)
-        resized = cv2.resize(img, (int(w * scale), int(h * scale)), interpolation=cv2.INTER_LINEAR)
-        canvas = np.zeros((new_h, new_w, 3), dtype=np.uint8)
-        top = (new_h - resized.shape[0]) // 2
-        left = (new_w - resized.shape[1]) // 2
-        canvas[top:top + resized.shape[0], left:left + resized.shape[1]] = resized
-        return canvas, scale, left, top
+    def _run_hailo(self, inputs: List[Optional[np.ndarray]]) -> List[Any]:
+        if not self._configured or self._input_vstreams is None or self._output_vstreams is None:
+            return [None for _ in inputs]
+        try:
+            # Queue every frame on the device before reading any result so the
+            # accelerator processes the batch back to back.
+            for inp in inputs:
+                for _, vs in self._input_vstreams.items():  # type: ignore[attr-defined]
+                    vs.write(inp)
+            results = []
+            for _ in inputs:
+                outputs: Dict[str, Any] = {}
+                for name, vs in self._output_vstreams.items():  # type: ignore[attr-defined]
+                    outputs[name] = vs.read()
+                results.append(outputs)
+            return results
+        except Exception as e:
+            self.log.error("Hailo inference error: %s", e)
+            return [None for _ in inputs]
 
-    def _infer_hailo(self, image_bgr: np.ndarray) -> List[Dict[str, Any]]:
+    def _postprocess_hailo(
+        self,
+        outputs: Dict[str, Any],
+        image_shape: Tuple[int, ...],
+        scale: float,
+        pad_left: float,
+        pad_top: float,
+        origin: Tuple[float, float] = (0.0, 0.0),
+        filt: Optional[DetectionFilter] = None,
+    ) -> np.ndarray:
         try:
-            if not self._configured or self._input_vstreams is None or self._output_vstreams is None:
-                return []
-            target_shape = self._hailo_input_shape or (640, 640)
-            hb, wb = target_shape
-            pre_img, scale, pad_left, pad_top = self._letterbox(image_bgr, (hb, wb))
-            inp = pre_img.astype(np.uint8)
-            for _, vs in self._input_vstreams.items():  # type: ignore[attr-defined]
-                vs.write(inp)
-            outputs: Dict[str, Any] = {}
-            for name, vs in self._output_vstreams.items():  # type: ignore[attr-defined]
-                outputs[name] = vs.read()
             if not self._logged_shapes:
                 shape_map = {k: (v.shape if hasattr(v, 'shape') else type(v)) for k, v in outputs.items()}
                 self.log.info("Hailo outputs shapes: %s", shape_map)
                 self._logged_shapes = True
-            det_arrays = []
+            thresh = float(self.cfg.score_threshold)
+            class_ids = filt.class_ids if filt is not None else None
+            parts = []
             for arr in outputs.values():
                 if not hasattr(arr, 'shape'):
                     continue
-                a = np.array(arr)
-                # Normalize to (N, C)
-                if a.ndim == 3:  # (1, N, C) or (1, C, N)
-                    if a.shape[0] == 1:
-                        a = a[0]
+                a = np.asarray(arr)
+                # Normalize to 2-D without copying; 85 channels are trimmed to 84
+                if a.ndim == 3 and a.shape[0] == 1:  # (1, N, C) or (1, C, N)
+                    a = a[0]
                 if a.ndim == 2:
                     if a.shape[1] in (84, 85):
-                        det_arrays.append(a[:, :84])  # trim 85 -> 84 if needed
+                        parts.append(select_candidates(a, thresh, num_channels=84, class_ids=class_ids))
                     elif a.shape[0] in (84, 85):
-                        det_arrays.append(a[:84, :].T)
+                        parts.append(select_candidates(a, thresh, channels_first=True, num_channels=84, class_ids=class_ids))
                 elif a.ndim == 1 and a.size % 84 == 0:
-                    det_arrays.append(a.reshape(-1, 84))
-            if not det_arrays:
-                return []
-            det_mat = np.concatenate(det_arrays, axis=0)
-            if det_mat.shape[1] < 6:
-                return []
-            boxes_xywh = det_mat[:, :4]
-            scores = det_mat[:, 4:]
-            class_ids = np.argmax(scores, axis=1)
-            confidences = np.max(scores, axis=1)
-            mask = confidences >= float(self.cfg.score_threshold)
-            if not np.any(mask):
-                return []
-            boxes_xywh = boxes_xywh[mask]
-            confidences = confidences[mask]
-            class_ids = class_ids[mask]
-            # Reverse letterbox scaling: boxes are in letterboxed space (640x640)
-            # YOLOv8 format cx,cy,w,h relative to letterbox dims
-            cx = boxes_xywh[:, 0]
-            cy = boxes_xywh[:, 1]
-            bw = boxes_xywh[:, 2]
-            bh = boxes_xywh[:, 3]
-            # Convert to top-left in letterbox image
-            x1_l = cx - bw / 2
-            y1_l = cy - bh / 2
-            x2_l = cx + bw / 2
-            y2_l = cy + bh / 2
-            # Remove padding and divide by scale to map back to original image
-            x1 = (x1_l - pad_left) / scale
-            y1 = (y1_l - pad_top) / scale
-            x2 = (x2_l - pad_left) / scale
-            y2 = (y2_l - pad_top) / scale
-            H, W = image_bgr.shape[:2]
-            def clamp(v, lo, hi):
-                return np.maximum(lo, np.minimum(hi, v))
-            x1p = clamp(x1, 0, W - 1)
-            y1p = clamp(y1, 0, H - 1)
-            x2p = clamp(x2, 0, W - 1)
-            y2p = clamp(y2, 0, H - 1)
-            widths = np.maximum(1.0, x2p - x1p)
-            heights = np.maximum(1.0, y2p - y1p)
-            boxes_for_nms = np.stack([x1p, y1p, widths, heights], axis=1).astype(np.float32)
-            confidences_f32 = confidences.astype(np.float32).tolist()
-            idxs = cv2.dnn.NMSBoxes(boxes_for_nms.tolist(), confidences_f32, float(self.cfg.score_threshold), float(self.cfg.nms_iou_threshold))
-            if isinstance(idxs, (list, tuple, np.ndarray)):
-                try:
-                    flat = np.array(idxs).reshape(-1).tolist()
-                except Exception:
-                    flat = [int(i[0]) if isinstance(i, (list, tuple, np.ndarray)) else int(i) for i in idxs]
-            else:
-                flat = [int(idxs)] if idxs is not None else []
-            dets: List[Dict[str, Any]] = []
-            for i in flat[:200]:
-                if i < 0 or i >= len(boxes_for_nms):
-                    continue
-                x, y, w, h = boxes_for_nms[i]
-                dets.append({
-                    "cls": int(class_ids[i]),
-                    "conf": float(confidences[i]),
-                    "x1": float(x),
-                    "y1": float(y),
-                    "x2": float(x + w),
-                    "y2": float(y + h),
-                })
+                    parts.append(select_candidates(a.reshape(-1, 84), thresh, class_ids=class_ids))
+            if not parts:
+                return empty_dets()
+            boxes, classes, conf = (np.concatenate(p) for p in zip(*parts))
+            # Boxes are cx,cy,w,h in letterboxed model space: remove padding, undo scale
+            dets = build_detections(
+                boxes, classes, conf, image_shape, float(self.cfg.nms_iou_threshold),
+                gain=(1.0 / scale, 1.0 / scale), pad=(pad_left, pad_top), max_det=200,
+                origin=origin, roi_mask=filt.mask(image_shape) if filt is not None else None,
+            )
             if os.getenv("HAILO_DEBUG", "0") == "1":
-                self.log.info("Hailo raw dets (pre-NMS=%d, post=%d)", det_mat.shape[0], len(dets))
+                self.log.info("Hailo raw dets (pre-NMS=%d, post=%d)", conf.size, dets.size)
             return dets
         except Exception as e:
-            self.log.error("Hailo inference/postprocess error: %s", e)
-            return []
+            self.log.error("Hailo postprocess error: %s", e)
+            return empty_dets()
 
     # ---------------------------- CPU ONNX postprocess helpers ----------------------------
     def _preprocess(self, img: np.ndarray, size: int) -> Tuple[np.ndarray, float, float]:
@@ -279,80 +317,50 @@ class HailoYoloV8:
         blob = cv2.dnn.blobFromImage(img, scalefactor=1/255.0, size=(size, size), mean=(0, 0, 0), swapRB=True, crop=False)
         return blob, w / float(size), h / float(size)
 
-    def _infer_onnx(self, image_bgr: np.ndarray) -> List[Dict[str, Any]]:
+    def _run_onnx(self, blobs: List[Optional[np.ndarray]]) -> List[Any]:
         net = self._dnn_net
         if net is None:
-            return []
-        size = YOLO_ONNX_IMG_SIZE
-        blob, scale_w, scale_h = self._preprocess(image_bgr, size)
-        net.setInput(blob)
-        out = net.forward()
-        # Normalize output shape to (N, C)
+            return [None for _ in blobs]
+        if len(blobs) > 1 and self._onnx_batch_ok:
+            try:
+                net.setInput(np.concatenate(blobs, axis=0))
+                out = net.forward()
+                if out.ndim == 3 and out.shape[0] == len(blobs):
+                    return [out[i:i + 1] for i in range(len(blobs))]
+            except cv2.error as e:
+                self.log.info("ONNX model does not accept batched input (%s); running frames one by one", e)
+            self._onnx_batch_ok = False
+        results = []
+        for blob in blobs:
+            net.setInput(blob)
+            results.append(net.forward())
+        return results
+
+    def _postprocess_onnx(
+        self,
+        out: np.ndarray,
+        image_shape: Tuple[int, ...],
+        size: int,
+        src_shape: Optional[Tuple[int, ...]] = None,
+        origin: Tuple[float, float] = (0.0, 0.0),
+        filt: Optional[DetectionFilter] = None,
+    ) -> np.ndarray:
+        H, W = (src_shape or image_shape)[:2]
+        # (1, C, N) or (1, N, C); score filtering happens before any transpose
+        channels_first = False
         if out.ndim == 3:
-            # (1, C, N) or (1, N, C)
-            if out.shape[1] < out.shape[2]:
-                # (1, C, N) -> (N, C)
-                out = np.transpose(out, (0, 2, 1))
+            channels_first = out.shape[1] < out.shape[2]
             out = out[0]
         elif out.ndim != 2:
             # Unknown format
-            return []
-        if out.shape[1] < 6:
-            return []
-        boxes_xywh = out[:, :4]
-        scores = out[:, 4:]
-        class_ids = np.argmax(scores, axis=1)
-        confidences = np.max(scores, axis=1)
-
-        # Threshold
-        mask = confidences >= float(self.cfg.score_threshold)
-        boxes_xywh = boxes_xywh[mask]
-        confidences = confidences[mask]
-        class_ids = class_ids[mask]
-        if boxes_xywh.size == 0:
-            return []
-
-        # Convert to original image coordinates
-        cx = boxes_xywh[:, 0]
-        cy = boxes_xywh[:, 1]
-        bw = boxes_xywh[:, 2]
-        bh = boxes_xywh[:, 3]
-        x1 = (cx - bw / 2) * scale_w
-        y1 = (cy - bh / 2) * scale_h
-        x2 = (cx + bw / 2) * scale_w
-        y2 = (cy + bh / 2) * scale_h
-
-        H, W = image_bgr.shape[:2]
-        def clamp(v, lo, hi):
-            return np.maximum(lo, np.minimum(hi, v))
-        x1p = clamp(x1, 0, W - 1)
-        y1p = clamp(y1, 0, H - 1)
-        x2p = clamp(x2, 0, W - 1)
-        y2p = clamp(y2, 0, H - 1)
-        widths = np.maximum(1.0, x2p - x1p)
-        heights = np.maximum(1.0, y2p - y1p)
-        boxes_for_nms = np.stack([x1p, y1p, widths, heights], axis=1).astype(np.float32)
-        confidences_f32 = confidences.astype(np.float32).tolist()
-        idxs = cv2.dnn.NMSBoxes(boxes_for_nms.tolist(), confidences_f32, float(self.cfg.score_threshold), float(self.cfg.nms_iou_threshold))
-        dets: List[Dict[str, Any]] = []
-        # Normalize indices to a flat list of ints
-        if isinstance(idxs, (list, tuple, np.ndarray)):
-            try:
-                flat = np.array(idxs).reshape(-1).tolist()
-            except Exception:
-                flat = [int(i[0]) if isinstance(i, (list, tuple, np.ndarray)) else int(i) for i in idxs]
-        else:
-            flat = [int(idxs)] if idxs is not None else []
-        for i in flat:
-            if i < 0 or i >= len(boxes_for_nms):
-                continue
-            x, y, w, h = boxes_for_nms[i]
-            dets.append({
-                "cls": int(class_ids[i]),
-                "conf": float(confidences[i]),
-                "x1": float(x),
-                "y1": float(y),
-                "x2": float(x + w),
-                "y2": float(y + h),
-            })
-        return dets
+            return empty_dets()
+        if (out.shape[0] if channels_first else out.shape[1]) < 6:
+            return empty_dets()
+        class_ids = filt.class_ids if filt is not None else None
+        boxes, classes, conf = select_candidates(out, float(self.cfg.score_threshold), channels_first=channels_first, class_ids=class_ids)
+        # Input (frame or ROI crop) was stretched to size x size: scale each axis back
+        return build_detections(
+            boxes, classes, conf, image_shape, float(self.cfg.nms_iou_threshold),
+            gain=(W / float(size), H / float(size)), origin=origin,
+            roi_mask=filt.mask(image_shape) if filt is not None else None,
+        )
@@ -0,0 +1,87 @@
+from __future__ import annotations
+import threading
+from typing import Dict, List, Optional, Tuple
+
+import cv2
+import numpy as np
+
+
+class LetterboxPlan:
+    """Precomputed letterbox for one (input shape, model shape) pair.
+
+    Scale, resized size and padding are computed once; the output canvases are
+    allocated once with the padding already filled, and each frame is resized
+    straight into the centre of the next canvas (cv2.resize with dst=view). Every
+    thread has its own pool, handed out round-robin, so a buffer is only reused
+    after `buffers` further frames of the same thread: size the pool for the
+    number of inputs one thread keeps in flight between preprocess and the device.
+    """
+
+    def __init__(self, src_shape: Tuple[int, ...], dst_shape: Tuple[int, int], buffers: int = 1, pad_value: int = 0) -> None:
+        h, w = src_shape[:2]
+        self.dst_h, self.dst_w = int(dst_shape[0]), int(dst_shape[1])
+        self.scale = min(self.dst_w / w, self.dst_h / h)
+        self.new_w, self.new_h = int(w * self.scale), int(h * self.scale)
+        self.top = (self.dst_h - self.new_h) // 2
+        self.left = (self.dst_w - self.new_w) // 2
+        self.pad_value = pad_value
+        self.buffers = max(1, buffers)
+        self._local = threading.local()  # per-thread pool: bufs, next
+        self._in_place = True  # cleared if this OpenCV build ignores strided dst views
+
+    def reserve(self, buffers: int) -> None:
+        """Grow every thread's pool to at least `buffers` canvases (lazily, on its next frame)."""
+        self.buffers = max(self.buffers, buffers)
+
+    def next_buffer(self) -> np.ndarray:
+        local = self._local
+        bufs: Optional[List[np.ndarray]] = getattr(local, "bufs", None)
+        if bufs is None:
+            bufs = local.bufs = []
+            local.next = 0
+        while len(bufs) < self.buffers:
+            bufs.append(np.full((self.dst_h, self.dst_w, 3), self.pad_value, dtype=np.uint8))
+        canvas = bufs[local.next]
+        local.next = (local.next + 1) % len(bufs)
+        return canvas
+
+    def fill(self, img: np.ndarray, canvas: np.ndarray) -> np.ndarray:
+        """Resize `img` into the centre of `canvas`; the padding is never touched."""
+        view = canvas[self.top:self.top + self.new_h, self.left:self.left + self.new_w]
+        if self._in_place:
+            out = cv2.resize(img, (self.new_w, self.new_h), dst=view, interpolation=cv2.INTER_LINEAR)
+            if out is view or np.shares_memory(out, canvas):
+                return canvas
+            self._in_place = False
+            view[...] = out
+            return canvas
+        view[...] = cv2.resize(img, (self.new_w, self.new_h), interpolation=cv2.INTER_LINEAR)
+        return canvas
+
+
+class LetterboxCache:
+    """Thread-safe LetterboxPlan lookup keyed by (input H, W, model H, W); canvases are pooled per thread."""
+
+    def __init__(self, buffers: int = 1) -> None:
+        self.buffers = max(1, buffers)
+        self._plans: Dict[Tuple[int, int, int, int], LetterboxPlan] = {}
+        self._lock = threading.Lock()
+
+    def reserve(self, buffers: int) -> None:
+        """Grow every pool (now and for future plans) to at least `buffers` canvases."""
+        with self._lock:
+            if buffers <= self.buffers:
+                return
+            self.buffers = buffers
+            for plan in self._plans.values():
+                plan.reserve(buffers)
+
+    def apply(self, img: np.ndarray, dst_shape: Tuple[int, int]) -> Tuple[np.ndarray, LetterboxPlan]:
+        """Letterbox `img` into the calling thread's next pooled canvas (valid until that pool wraps)."""
+        key = (img.shape[0], img.shape[1], int(dst_shape[0]), int(dst_shape[1]))
+        with self._lock:
+            plan = self._plans.get(key)
+            if plan is None:
+                plan = self._plans[key] = LetterboxPlan(img.shape, dst_shape, self.buffers)
+        # The pool is the caller's own, so only the plan lookup needs the lock
+        return plan.fill(img, plan.next_buffer()), plan
@@ -0,0 +1,128 @@
+from __future__ import annotations
+import queue
+import threading
+from concurrent.futures import Future
+from typing import Any, List, Optional, Tuple
+
+import numpy as np
+
+from app.utils.logging_setup import setup_logging
+from app.infer.hailo_infer import HailoYoloV8
+from app.infer.roi import DetectionFilter
+
+
+_STOP = object()
+
+
+class PipelinedInference:
+    """Overlap preprocessing, device execution and postprocessing on separate threads.
+
+    Stages are connected by bounded queues of `depth` entries (2 = double
+    buffering): while frame N is on the device, frame N+1 is letterboxed and
+    frame N-1 is decoded/NMS'd. The device stage drains up to `max_batch` ready
+    inputs per call. Works with any detector exposing preprocess(), run_device()
+    and postprocess() (HailoYoloV8 or app.infer.fake_device.FakeDetector).
+    """
+
+    def __init__(self, detector: HailoYoloV8, depth: int = 2, max_batch: int = 1) -> None:
+        self.detector = detector
+        self.depth = max(1, int(depth))
+        self.max_batch = max(1, int(max_batch))
+        self.log = setup_logging("infer.pipelined")
+        # Inputs alive at once: one being preprocessed, `depth` queued, `max_batch` on the device
+        reserve = getattr(detector, "reserve_buffers", None)
+        if reserve is not None:
+            reserve(self.depth + self.max_batch + 1)
+        self._q_pre: "queue.Queue[Any]" = queue.Queue(maxsize=self.depth)
+        self._q_dev: "queue.Queue[Any]" = queue.Queue(maxsize=self.depth)
+        self._q_post: "queue.Queue[Any]" = queue.Queue(maxsize=self.depth)
+        self._stopped = False
+        self._lock = threading.Lock()  # no frame may be queued behind the stop marker
+        self._threads = [
+            threading.Thread(target=self._pre_loop, name="infer-pre", daemon=True),
+            threading.Thread(target=self._dev_loop, name="infer-dev", daemon=True),
+            threading.Thread(target=self._post_loop, name="infer-post", daemon=True),
+        ]
+        for t in self._threads:
+            t.start()
+
+    def submit(self, image_bgr: np.ndarray, filt: Optional[DetectionFilter] = None) -> Future:
+        """Queue a frame; blocks only when `depth` frames are already waiting for preprocessing."""
+        fut: Future = Future()
+        with self._lock:
+            if self._stopped:
+                fut.set_exception(RuntimeError("pipelined inference stopped"))
+                return fut
+            self._q_pre.put((image_bgr, filt, fut))
+        return fut
+
+    def infer(self, image_bgr: np.ndarray, filt: Optional[DetectionFilter] = None) -> np.ndarray:
+        return self.submit(image_bgr, filt).result()
+
+    def infer_batch(self, images: List[np.ndarray], filters: Optional[List[Optional[DetectionFilter]]] = None) -> List[np.ndarray]:
+        futs = [self.submit(img, filt) for img, filt in zip(images, filters or [None] * len(images))]
+        return [f.result() for f in futs]
+
+    def stop(self) -> None:
+        """Finish the frames already submitted, then end the stage threads; later submits fail."""
+        with self._lock:
+            if self._stopped:
+                return
+            self._stopped = True
+            self._q_pre.put(_STOP)
+        for t in self._threads:
+            t.join(timeout=2.0)
+
+    # ---------------------------- stages ----------------------------
+    def _pre_loop(self) -> None:
+        while True:
+            item = self._q_pre.get()
+            if item is _STOP:
+                self._q_dev.put(_STOP)
+                return
+            image_bgr, filt, fut = item
+            try:
+                inp, meta = self.detector.preprocess(image_bgr, filt)
+            except Exception as e:
+                fut.set_exception(e)
+                continue
+            self._q_dev.put((inp, meta, fut))
+
+    def _dev_loop(self) -> None:
+        while True:
+            batch: List[Tuple[Optional[np.ndarray], Any, Future]] = []
+            item = self._q_dev.get()
+            stopping = item is _STOP
+            if not stopping:
+                batch.append(item)
+            while not stopping and len(batch) < self.max_batch:
+                try:
+                    item = self._q_dev.get_nowait()
+                except queue.Empty:
+                    break
+                if item is _STOP:
+                    stopping = True
+                    break
+                batch.append(item)
+            if batch:
+                try:
+                    raws = self.detector.run_device([inp for inp, _, _ in batch])
+                    for (_, meta, fut), raw in zip(batch, raws):
+                        self._q_post.put((raw, meta, fut))
+                except Exception as e:
+                    for _, _, fut in batch:
+                        fut.set_exception(e)
+            if stopping:
+                self._q_post.put(_STOP)
+                return
+
+    def _post_loop(self) -> None:
+        while True:
+            item = self._q_post.get()
+            if item is _STOP:
+                return
+            raw, meta, fut = item
+            try:
+                fut.set_result(self.detector.postprocess(raw, meta))
+            except Exception as e:
+                fut.set_exception(e)
@@ -0,0 +1,151 @@
+from __future__ import annotations
+from typing import Any, Dict, List, Optional, Tuple
+
+import numpy as np
+
+
+# Compact per-frame detector output; convert with dets_to_dicts() only when serializing
+DET_DTYPE = np.dtype([
+    ("x1", "<f4"),
+    ("y1", "<f4"),
+    ("x2", "<f4"),
+    ("y2", "<f4"),
+    ("cls", "<i4"),
+    ("conf", "<f4"),
+])
+
+# Upper bounds on boxes entering / leaving NMS (highest scores kept), as in the Ultralytics reference
+MAX_NMS_CANDIDATES = 30000
+MAX_DETECTIONS = 300
+
+
+def empty_dets() -> np.ndarray:
+    return np.empty(0, dtype=DET_DTYPE)
+
+
+def dets_to_dicts(dets: np.ndarray) -> List[Dict[str, Any]]:
+    """Serialize a DET_DTYPE array into the {cls, conf, x1, y1, x2, y2} dict schema."""
+    return [
+        {"cls": c, "conf": s, "x1": x1, "y1": y1, "x2": x2, "y2": y2}
+        for x1, y1, x2, y2, c, s in dets.tolist()
+    ]
+
+
+def select_candidates(
+    pred: np.ndarray,
+    score_thresh: float,
+    channels_first: bool = False,
+    num_channels: Optional[int] = None,
+    class_ids: Optional[np.ndarray] = None,
+) -> Tuple[np.ndarray, np.ndarray, np.ndarray]:
+    """Score-filter a raw YOLO head output before any transpose or copy.
+
+    `pred` is 2-D: (N, 4 + classes) rows, or (4 + classes, N) with channels_first.
+    `num_channels` trims trailing channels (e.g. 85 -> 84). `class_ids` restricts
+    scoring to those classes, so a box is labelled with its best allowed class.
+    Returns the surviving (M, 4) cx/cy/w/h boxes, class ids and confidences.
+    """
+    if channels_first:
+        pred = pred[:num_channels] if num_channels else pred
+        scores = pred[4:]
+        if class_ids is not None:
+            class_ids = class_ids[class_ids < scores.shape[0]]
+            scores = scores[class_ids]
+        conf = scores.max(axis=0) if scores.shape[0] else np.zeros(pred.shape[1], dtype=np.float32)
+        keep = np.flatnonzero(conf >= score_thresh)
+        cls = scores[:, keep].argmax(axis=0)
+        boxes = pred[:4, keep].T
+    else:
+        pred = pred[:, :num_channels] if num_channels else pred
+        scores = pred[:, 4:]
+        if class_ids is not None:
+            class_ids = class_ids[class_ids < scores.shape[1]]
+            scores = scores[:, class_ids]
+        conf = scores.max(axis=1) if scores.shape[1] else np.zeros(pred.shape[0], dtype=np.float32)
+        keep = np.flatnonzero(conf >= score_thresh)
+        cls = scores[keep].argmax(axis=1)
+        boxes = pred[keep, :4]
+    if class_ids is not None:
+        cls = class_ids[cls]
+    return boxes.astype(np.float32), cls.astype(np.int32), conf[keep].astype(np.float32)
+
+
+def batched_nms(boxes: np.ndarray, scores: np.ndarray, classes: np.ndarray, iou_thresh: float, max_det: Optional[int] = None) -> np.ndarray:
+    """Class-aware greedy NMS on (N, 4) xyxy boxes; returns kept indices, highest score first.
+
+    Boxes of different classes are shifted apart by a per-class offset so a single
+    pass never lets one class suppress another.
+    """
+    n = boxes.shape[0]
+    if n == 0:
+        return np.empty(0, dtype=np.int64)
+    offset = classes.astype(np.float32)[:, None] * (float(boxes.max()) + 1.0)
+    b = boxes + offset
+    order = np.argsort(-scores, kind="stable")
+    b = b[order]
+    x1, y1, x2, y2 = b[:, 0], b[:, 1], b[:, 2], b[:, 3]
+    areas = (x2 - x1) * (y2 - y1)
+    keep: List[int] = []
+    # Each iteration keeps the best remaining box and drops everything overlapping it,
+    # so the loop runs once per kept box, not once per candidate
+    remaining = np.arange(n)
+    while remaining.size:
+        i = int(remaining[0])
+        keep.append(i)
+        if max_det is not None and len(keep) >= max_det:
+            break
+        rest = remaining[1:]
+        iw = np.minimum(x2[i], x2[rest]) - np.maximum(x1[i], x1[rest])
+        ih = np.minimum(y2[i], y2[rest]) - np.maximum(y1[i], y1[rest])
+        inter = np.maximum(iw, 0.0) * np.maximum(ih, 0.0)
+        iou = inter / np.maximum(areas[i] + areas[rest] - inter, 1e-9)
+        remaining = rest[iou <= iou_thresh]
+    return order[np.asarray(keep, dtype=np.int64)]
+
+
+def build_detections(
+    boxes_cxcywh: np.ndarray,
+    classes: np.ndarray,
+    conf: np.ndarray,
+    image_shape: Tuple[int, ...],
+    iou_thresh: float,
+    gain: Tuple[float, float] = (1.0, 1.0),
+    pad: Tuple[float, float] = (0.0, 0.0),
+    max_det: Optional[int] = MAX_DETECTIONS,
+    origin: Tuple[float, float] = (0.0, 0.0),
+    roi_mask: Optional[np.ndarray] = None,
+) -> np.ndarray:
+    """Map model-space boxes to image pixels, clamp, apply the ROI, run NMS and pack a DET_DTYPE array.
+
+    Image coordinates are (model coordinate - pad) * gain + origin per axis:
+    pad/gain undo a letterbox (pad_left/top, 1/scale) or a plain stretch (0,
+    image/model size), origin is the top-left of the crop fed to the model.
+    `roi_mask` (H x W, nonzero = keep) drops boxes whose centre lies outside it.
+    """
+    if conf.size == 0:
+        return empty_dets()
+    if conf.size > MAX_NMS_CANDIDATES:
+        top = np.argpartition(-conf, MAX_NMS_CANDIDATES)[:MAX_NMS_CANDIDATES]
+        boxes_cxcywh, classes, conf = boxes_cxcywh[top], classes[top], conf[top]
+    H, W = image_shape[:2]
+    half = boxes_cxcywh[:, 2:4] / 2
+    xy = np.concatenate([boxes_cxcywh[:, :2] - half, boxes_cxcywh[:, :2] + half], axis=1)
+    xy -= np.array([pad[0], pad[1], pad[0], pad[1]], dtype=np.float32)
+    xy *= np.array([gain[0], gain[1], gain[0], gain[1]], dtype=np.float32)
+    if origin != (0.0, 0.0):
+        xy += np.array([origin[0], origin[1], origin[0], origin[1]], dtype=np.float32)
+    np.clip(xy, 0, np.array([W - 1, H - 1, W - 1, H - 1], dtype=np.float32), out=xy)
+    # Keep at least 1 px extent so degenerate boxes survive clamping at the border
+    xy[:, 2] = np.maximum(xy[:, 2], xy[:, 0] + 1.0)
+    xy[:, 3] = np.maximum(xy[:, 3], xy[:, 1] + 1.0)
+    if roi_mask is not None:
+        cx = ((xy[:, 0] + xy[:, 2]) * 0.5).astype(np.int64)
+        cy = ((xy[:, 1] + xy[:, 3]) * 0.5).astype(np.int64)
+        inside = roi_mask[np.clip(cy, 0, roi_mask.shape[0] - 1), np.clip(cx, 0, roi_mask.shape[1] - 1)] != 0
+        xy, classes, conf = xy[inside], classes[inside], conf[inside]
+    keep = batched_nms(xy, conf, classes, iou_thresh, max_det)
+    dets = np.empty(keep.size, dtype=DET_DTYPE)
+    dets["x1"], dets["y1"], dets["x2"], dets["y2"] = xy[keep].T
+    dets["cls"] = classes[keep]
+    dets["conf"] = conf[keep]
+    return dets
@@ -0,0 +1,243 @@
+from __future__ import annotations
+import itertools
+import threading
+import time
+from concurrent.futures import Future
+from multiprocessing.connection import Connection, wait
+from typing import Any, Dict, Optional, Sequence, Tuple
+
+import numpy as np
+
+from app.utils.logging_setup import setup_logging
+from app.utils.metrics import METRICS, SHARED
+from app.core.config import RTSPConfig
+from app.core.frame_ring import FrameRing
+from app.infer.roi import DetectionFilter
+
+
+def request_ring_name(stream: str) -> str:
+    """Shared-memory ring carrying a stream's inference inputs from its worker to the inference process."""
+    return f"infer-{stream}"
+
+
+class RemoteClient:
+    """Worker-process side of the inference service: sends requests, resolves Futures from replies.
+
+    Requests are (worker_id, req_id, stream, seq, rect) tuples sent over this
+    worker's request pipe; pixels travel through per-stream FrameRings, never
+    through the pipe. Plain pipes (one writer, one reader, no shared lock) keep
+    working when the process at the other end is killed and restarted. Requests
+    unanswered after `timeout_s` fail with TimeoutError so pipelines keep moving.
+    """
+
+    def __init__(self, worker_id: int, requests: Connection, responses: Connection, timeout_s: float = 5.0) -> None:
+        self.worker_id = worker_id
+        self.requests = requests
+        self.responses = responses
+        self.timeout_s = timeout_s
+        self.log = setup_logging(f"infer.remote.{worker_id}")
+        self._ids = itertools.count(1)
+        self._pending: Dict[int, Tuple[Future, float, Any]] = {}
+        self._lock = threading.Lock()
+        self._send_lock = threading.Lock()
+        self.stop_event = threading.Event()
+        self._thread = threading.Thread(target=self._receive, name=f"infer-replies-{worker_id}", daemon=True)
+        self._thread.start()
+
+    def detector(self, cfg: RTSPConfig, slots: int = 8, depth: int = 1) -> "RemoteDetector":
+        return RemoteDetector(self, cfg, slots=slots, depth=depth)
+
+    def request(self, stream: str, seq: int, rect: Optional[Tuple[int, int, int, int]], on_done: Any) -> Future:
+        fut: Future = Future()
+        req_id = next(self._ids)
+        with self._lock:
+            self._pending[req_id] = (fut, time.monotonic() + self.timeout_s, on_done)
+        try:
+            with self._send_lock:
+                self.requests.send((self.worker_id, req_id, stream, seq, rect))
+        except Exception as e:
+            self._resolve(req_id, error=f"inference queue unavailable: {e}")
+        return fut
+
+    def _resolve(self, req_id: int, dets: Optional[np.ndarray] = None, error: Optional[str] = None) -> None:
+        with self._lock:
+            entry = self._pending.pop(req_id, None)
+        if entry is None:
+            return  # already expired
+        fut, _, on_done = entry
+        on_done()
+        if error is not None:
+            fut.set_exception(RuntimeError(error))
+        else:
+            fut.set_result(dets)
+
+    def _expire(self) -> None:
+        now = time.monotonic()
+        with self._lock:
+            stale = [rid for rid, (_, deadline, _) in self._pending.items() if deadline < now]
+        for rid in stale:
+            with self._lock:
+                entry = self._pending.pop(rid, None)
+            if entry is not None:
+                fut, _, on_done = entry
+                on_done()
+                fut.set_exception(TimeoutError("no reply from the inference process"))
+                METRICS.inc(SHARED, "infer_timeouts")
+
+    def _receive(self) -> None:
+        while not self.stop_event.is_set():
+            try:
+                if not self.responses.poll(0.5):
+                    self._expire()
+                    continue
+                req_id, dets, error = self.responses.recv()
+            except (EOFError, OSError):
+                break
+            except Exception as e:
+                # A peer killed mid-message leaves a truncated record; skip it
+                self.log.warning("Dropping malformed inference reply: %s", e)
+                continue
+            self._resolve(req_id, dets, error)
+            self._expire()
+
+    def stop(self) -> None:
+        self.stop_event.set()
+        self._thread.join(timeout=2.0)
+
+
+class RemoteDetector:
+    """Detector proxy for one stream's DetectionPipeline, backed by the inference process.
+
+    `submit()` copies the frame into the stream's request ring once (tiles of the
+    same frame reuse the slot) and sends its sequence number. A slot is only
+    overwritten once every request reading its previous frame has been answered.
+    """
+
+    def __init__(self, client: RemoteClient, cfg: RTSPConfig, slots: int = 8, depth: int = 1) -> None:
+        self.client = client
+        self.cfg = cfg
+        self.depth = depth  # frames a pipeline keeps in flight
+        self.ring_name = request_ring_name(cfg.name)
+        self.slots = max(2, slots)
+        self.ring: Optional[FrameRing] = None
+        self._cond = threading.Condition()
+        self._seq = 0
+        self._last_image: Optional[np.ndarray] = None
+        self._refs: Dict[int, int] = {}  # seq -> unanswered requests (the newest seq stays until superseded)
+
+    def _forget(self, seq: int) -> None:
+        if self._refs.get(seq) == 0 and seq != self._seq:
+            del self._refs[seq]
+            self._cond.notify_all()
+
+    def _stage(self, image: np.ndarray) -> bool:
+        seq = self._seq + 1
+        victim = seq - self.slots  # previous occupant of the slot we are about to write
+        if not self._cond.wait_for(lambda: victim not in self._refs, timeout=self.client.timeout_s):
+            return False
+        if self.ring is None or image.nbytes > self.ring.slot_bytes:
+            if self.ring is not None:
+                self.ring.close(unlink=True)
+            self.ring = FrameRing.create(self.ring_name, image.nbytes, slots=self.slots)
+        self.ring.write(image, seq, time.time())
+        prev, self._seq, self._last_image = self._seq, seq, image
+        self._refs[seq] = 0
+        self._forget(prev)
+        return True
+
+    def _release(self, seq: int) -> None:
+        with self._cond:
+            self._refs[seq] -= 1
+            self._forget(seq)
+
+    def submit(self, image_bgr: np.ndarray, filt: Optional[DetectionFilter] = None) -> Future:
+        with self._cond:
+            if image_bgr is not self._last_image and not self._stage(image_bgr):
+                fut: Future = Future()
+                fut.set_exception(TimeoutError("request ring slot still in use by the inference process"))
+                return fut
+            seq = self._seq
+            self._refs[seq] += 1
+        rect = getattr(filt, "rect", None) if filt is not None else None
+        return self.client.request(self.cfg.name, seq, rect, lambda: self._release(seq))
+
+    def infer(self, image_bgr: np.ndarray, filt: Optional[DetectionFilter] = None) -> np.ndarray:
+        return self.submit(image_bgr, filt).result()
+
+    def close(self) -> None:
+        if self.ring is not None:
+            self.ring.close(unlink=True)
+            self.ring = None
+
+
+class InferenceServer(threading.Thread):
+    """Inference-process side: reads request rings and feeds the single detector front-end.
+
+    Filters are rebuilt here from the stream config (plus the tile rect of the
+    request), so only a few integers cross the process boundary per request.
+    """
+
+    def __init__(self, frontend: Any, streams: Sequence[RTSPConfig], requests: Dict[int, Connection], responses: Dict[int, Connection]) -> None:
+        super().__init__(daemon=True, name="infer-server")
+        self.frontend = frontend
+        self.requests = requests
+        self.responses = responses
+        self._send_locks = {w: threading.Lock() for w in responses}
+        self.filters = {s.name: DetectionFilter.from_stream(s) for s in streams}
+        self.rings: Dict[str, FrameRing] = {}
+        self.log = setup_logging("infer.server")
+        self.stop_event = threading.Event()
+
+    def _ring(self, stream: str) -> Optional[FrameRing]:
+        ring = self.rings.get(stream)
+        if ring is None or ring.replaced():
+            if ring is not None:
+                ring.close()
+            ring = FrameRing.attach(request_ring_name(stream))
+            if ring is None:
+                self.rings.pop(stream, None)
+                return None
+            self.rings[stream] = ring
+        return ring
+
+    def _reply(self, worker_id: int, req_id: int, dets: Optional[np.ndarray], error: Optional[str]) -> None:
+        try:
+            with self._send_locks[worker_id]:
+                self.responses[worker_id].send((req_id, dets, error))
+        except Exception as e:
+            self.log.warning("Reply to worker %d failed: %s", worker_id, e)
+
+    def run(self) -> None:
+        self.log.info("Inference server started for %d streams", len(self.filters))
+        conns = list(self.requests.values())
+        while not self.stop_event.is_set():
+            for conn in wait(conns, timeout=0.5):
+                try:
+                    request = conn.recv()
+                except (EOFError, OSError):
+                    conns.remove(conn)  # worker end closed for good
+                    continue
+                except Exception as e:
+                    self.log.warning("Dropping malformed inference request: %s", e)
+                    continue
+                self._handle(*request)
+        for ring in self.rings.values():
+            ring.close()
+
+    def _handle(self, worker_id: int, req_id: int, stream: str, seq: int, rect: Optional[Tuple[int, int, int, int]]) -> None:
+        ring = self._ring(stream)
+        got = ring.read(seq) if ring is not None else None
+        if got is None:
+            self._reply(worker_id, req_id, None, f"request frame {stream}#{seq} not available")
+            return
+        base = self.filters.get(stream)
+        filt = base if rect is None else (base or DetectionFilter()).for_rect(tuple(rect))
+        fut = self.frontend.submit(got[1], filt)
+        fut.add_done_callback(lambda f, w=worker_id, r=req_id: self._done(w, r, f))
+
+    def _done(self, worker_id: int, req_id: int, fut: Future) -> None:
+        try:
+            dets, error = fut.result(), None
+        except Exception as e:
+            dets, error = None, f"inference failed: {e}"
+        self._reply(worker_id, req_id, dets, error)
@@ -0,0 +1,93 @@
+from __future__ import annotations
+from pathlib import Path
+from typing import Dict, List, Optional, Sequence, Tuple, Union
+
+import copy
+
+import cv2
+import numpy as np
+
+from app.core.config import RTSPConfig
+
+
+CLASSES_FILE = Path(__file__).resolve().parents[2] / "config" / "classes.txt"
+
+
+def load_class_names(path: Path = CLASSES_FILE) -> List[str]:
+    try:
+        return [line.strip() for line in path.read_text().splitlines() if line.strip()]
+    except OSError:
+        return []
+
+
+def resolve_class_ids(classes: Sequence[Union[int, str]], names: Optional[List[str]] = None) -> np.ndarray:
+    """Map class ids / names (config/classes.txt order) to a sorted id array; unknown names raise ValueError."""
+    names = load_class_names() if names is None else names
+    ids = set()
+    for c in classes:
+        if isinstance(c, int):
+            ids.add(c)
+        elif c in names:
+            ids.add(names.index(c))
+        else:
+            raise ValueError(f"unknown class {c!r} (not in {CLASSES_FILE.name})")
+    return np.array(sorted(ids), dtype=np.int64)
+
+
+class DetectionFilter:
+    """Per-stream region-of-interest and class allow-list, applied inside postprocessing.
+
+    - `class_ids` restricts the score channels considered, so other classes never
+      become candidates.
+    - The ROI polygons (normalized coordinates) are rasterized once per frame size
+      into a mask; candidates whose box centre falls outside it are dropped before NMS.
+    - With `crop`, preprocessing only feeds the ROI bounding rectangle to the model;
+      `for_rect()` pins an explicit rectangle instead (one tile of a tiled frame).
+    """
+
+    def __init__(self, roi: Sequence[Sequence[Tuple[float, float]]] = (), class_ids: Optional[np.ndarray] = None, crop: bool = False) -> None:
+        self.roi = [np.asarray(poly, dtype=np.float32) for poly in roi]
+        self.class_ids = class_ids
+        self.crop = crop and bool(self.roi)
+        self.rect: Optional[Tuple[int, int, int, int]] = None
+        self._masks: Dict[Tuple[int, int], np.ndarray] = {}
+
+    @classmethod
+    def from_stream(cls, cfg: RTSPConfig) -> Optional["DetectionFilter"]:
+        if not cfg.roi and cfg.classes is None:
+            return None
+        class_ids = resolve_class_ids(cfg.classes) if cfg.classes is not None else None
+        return cls(cfg.roi, class_ids, cfg.roi_crop)
+
+    def polygons(self, shape: Tuple[int, ...]) -> List[np.ndarray]:
+        """ROI polygons in pixel coordinates for a frame of `shape`."""
+        h, w = shape[:2]
+        return [np.round(poly * (w - 1, h - 1)).astype(np.int32) for poly in self.roi]
+
+    def mask(self, shape: Tuple[int, ...]) -> Optional[np.ndarray]:
+        if not self.roi:
+            return None
+        key = (int(shape[0]), int(shape[1]))
+        m = self._masks.get(key)
+        if m is None:
+            m = np.zeros(key, dtype=np.uint8)
+            cv2.fillPoly(m, self.polygons(shape), 1)
+            self._masks[key] = m
+        return m
+
+    def for_rect(self, rect: Tuple[int, int, int, int]) -> "DetectionFilter":
+        """Copy of this filter that crops to `rect` (x0, y0, x1, y1); ROI masks stay shared."""
+        f = copy.copy(self)
+        f.rect = rect
+        return f
+
+    def crop_rect(self, shape: Tuple[int, ...]) -> Optional[Tuple[int, int, int, int]]:
+        """(x0, y0, x1, y1) region fed to the model: the pinned rect, the ROI bounding rectangle, or None."""
+        if self.rect is not None:
+            return self.rect
+        if not self.crop:
+            return None
+        pts = np.concatenate(self.polygons(shape))
+        x0, y0 = pts.min(axis=0)
+        x1, y1 = pts.max(axis=0) + 1
+        return int(x0), int(y0), int(x1), int(y1)
@@ -0,0 +1,119 @@
+from __future__ import annotations
+import queue
+import threading
+import time
+from concurrent.futures import Future
+from typing import List, Optional, Sequence, Tuple
+
+import numpy as np
+
+from app.utils.logging_setup import setup_logging
+from app.core.config import CONFIG, RTSPConfig
+from app.infer.hailo_infer import HailoYoloV8
+from app.infer.pipelined import PipelinedInference
+from app.infer.roi import DetectionFilter
+
+
+class InferenceScheduler(threading.Thread):
+    """Central batching front-end for one shared detector.
+
+    Pipelines call `infer()` (or `submit()` for a Future) exactly as they would on
+    HailoYoloV8. The scheduler thread takes the first waiting frame, keeps
+    collecting for up to `window_ms` or until `max_batch` frames are queued, runs a
+    single `infer_batch()` and hands each result back to the caller's Future. It is
+    also the only thread touching the device, so concurrent pipelines are safe.
+    After `stop()` every frame not yet inferred, and every later `submit()`, fails
+    with RuntimeError instead of leaving its caller waiting.
+    """
+
+    def __init__(self, detector: HailoYoloV8, max_batch: int = 4, window_ms: float = 5.0) -> None:
+        super().__init__(daemon=True, name="infer-scheduler")
+        self.detector = detector
+        self.max_batch = max(1, int(max_batch))
+        self.window = max(0.0, float(window_ms)) / 1000.0
+        self.log = setup_logging("infer.scheduler")
+        # The scheduler thread is the only caller of infer_batch(): one pooled canvas per batch slot
+        reserve = getattr(detector, "reserve_buffers", None)
+        if reserve is not None:
+            reserve(self.max_batch)
+        self.stop_event = threading.Event()
+        self._lock = threading.Lock()  # orders submit() against stop() and the final drain
+        self._q: "queue.Queue[Tuple[np.ndarray, Optional[DetectionFilter], Future]]" = queue.Queue()
+        self.batches = 0
+        self.frames = 0
+
+    def submit(self, image_bgr: np.ndarray, filt: Optional[DetectionFilter] = None) -> Future:
+        fut: Future = Future()
+        with self._lock:
+            if self.stop_event.is_set():
+                fut.set_exception(RuntimeError("scheduler stopped"))
+                return fut
+            self._q.put((image_bgr, filt, fut))
+        return fut
+
+    def infer(self, image_bgr: np.ndarray, filt: Optional[DetectionFilter] = None) -> np.ndarray:
+        return self.submit(image_bgr, filt).result()
+
+    def _collect(self) -> List[Tuple[np.ndarray, Optional[DetectionFilter], Future]]:
+        try:
+            batch = [self._q.get(timeout=0.5)]
+        except queue.Empty:
+            return []
+        deadline = time.monotonic() + self.window
+        while len(batch) < self.max_batch:
+            remaining = deadline - time.monotonic()
+            try:
+                batch.append(self._q.get(timeout=remaining) if remaining > 0 else self._q.get_nowait())
+            except queue.Empty:
+                break
+        return batch
+
+    def run(self) -> None:
+        self.log.info("Inference scheduler started (max_batch=%d, window=%.1fms)", self.max_batch, self.window * 1000)
+        while not self.stop_event.is_set():
+            batch = self._collect()
+            if not batch:
+                continue
+            images = [img for img, _, _ in batch]
+            try:
+                results = self.detector.infer_batch(images, [filt for _, filt, _ in batch])
+            except Exception as e:
+                for _, _, fut in batch:
+                    fut.set_exception(e)
+                continue
+            for (_, _, fut), dets in zip(batch, results):
+                fut.set_result(dets)
+            self.batches += 1
+            self.frames += len(batch)
+        self._fail_pending()
+
+    def _fail_pending(self) -> None:
+        with self._lock:
+            while True:
+                try:
+                    _, _, fut = self._q.get_nowait()
+                except queue.Empty:
+                    return
+                fut.set_exception(RuntimeError("scheduler stopped"))
+
+    def stop(self) -> None:
+        with self._lock:
+            self.stop_event.set()
+        if not self.is_alive():
+            # Never started or already gone: nobody else will drain the queue
+            self._fail_pending()
+
+
+def create_frontend(detector: HailoYoloV8, streams: Sequence[RTSPConfig]) -> InferenceScheduler | PipelinedInference:
+    """Shared detector front-end for `streams`, per CONFIG.hailo: pipelined stages or a batching scheduler (started)."""
+    max_batch = CONFIG.hailo.max_batch
+    if all(s.tiling == "off" for s in streams):
+        # One frame per stream at a time: a larger batch could never fill
+        max_batch = min(max_batch, max(1, len(streams)))
+    if CONFIG.hailo.pipeline_depth > 0:
+        # Overlap preprocess / device / postprocess; the device stage batches whatever is already queued
+        return PipelinedInference(detector, depth=CONFIG.hailo.pipeline_depth, max_batch=max_batch)
+    # All pipelines share one detector; batch their frames through a single scheduler thread
+    scheduler = InferenceScheduler(detector, max_batch=max_batch, window_ms=CONFIG.hailo.batch_window_ms)
+    scheduler.start()
+    return scheduler
@@ -0,0 +1,108 @@
+from __future__ import annotations
+import math
+from typing import List, Optional, Tuple
+
+import numpy as np
+
+from app.core.config import RTSPConfig
+from app.infer.postprocess import MAX_DETECTIONS, batched_nms, empty_dets
+from app.infer.roi import DetectionFilter
+
+
+Rect = Tuple[int, int, int, int]
+
+
+def _starts(length: int, tile: int, overlap: float) -> List[int]:
+    """Fewest full-size tiles overlapping by at least `overlap`, spread evenly from edge to edge."""
+    if length <= tile:
+        return [0]
+    min_overlap = int(tile * overlap)
+    n = math.ceil((length - min_overlap) / max(1, tile - min_overlap))
+    span = length - tile
+    return [round(i * span / (n - 1)) for i in range(n)]
+
+
+def tile_grid(region: Rect, tile: int, overlap: float = 0.2) -> List[Rect]:
+    """Overlapping tile x tile rectangles covering `region` (x0, y0, x1, y1)."""
+    x0, y0, x1, y1 = region
+    w, h = x1 - x0, y1 - y0
+    return [
+        (x0 + x, y0 + y, x0 + x + min(tile, w), y0 + y + min(tile, h))
+        for y in _starts(h, tile, overlap)
+        for x in _starts(w, tile, overlap)
+    ]
+
+
+def merge_tiles(parts: List[np.ndarray], iou_thresh: float, max_det: Optional[int] = MAX_DETECTIONS) -> np.ndarray:
+    """Concatenate per-tile DET_DTYPE arrays (frame coordinates) and suppress cross-tile duplicates."""
+    parts = [p for p in parts if p.size]
+    if not parts:
+        return empty_dets()
+    dets = np.concatenate(parts)
+    if len(parts) == 1:
+        return dets
+    boxes = np.stack([dets["x1"], dets["y1"], dets["x2"], dets["y2"]], axis=1)
+    keep = batched_nms(boxes, dets["conf"], dets["cls"], iou_thresh, max_det)
+    return dets[keep]
+
+
+class TilePlanner:
+    """Decide which crops of a frame go to the detector.
+
+    - "off": the whole frame (letterboxed down to the model size).
+    - "on": the whole frame plus every model-sized tile, so small objects are seen
+      at native resolution while large ones stay detectable in the full view.
+    - "adaptive": the whole frame plus only the tiles containing a track that was
+      small (height < `small_px`) in the previous result; every `refresh_every`
+      inferred frames (starting with the first) all tiles run, to pick up new
+      small objects. Frames skipped by `infer_every_n_frames` or the motion gate
+      never reach plan(), so they do not count.
+
+    Tiles that do not intersect the stream's ROI are never scheduled.
+    """
+
+    def __init__(self, cfg: RTSPConfig, det_filter: Optional[DetectionFilter] = None) -> None:
+        self.mode = cfg.tiling
+        self.tile = cfg.tile_size
+        self.overlap = cfg.tile_overlap
+        self.small_px = cfg.tile_small_px
+        self.refresh_every = max(1, cfg.tile_refresh_every)
+        self.det_filter = det_filter
+        self._grid: Optional[List[Rect]] = None
+        self._grid_shape: Optional[Tuple[int, int]] = None
+        self._planned = 0  # frames planned so far, i.e. sent to inference
+
+    def grid(self, shape: Tuple[int, ...]) -> List[Rect]:
+        key = (int(shape[0]), int(shape[1]))
+        if self._grid is None or self._grid_shape != key:
+            filt = self.det_filter
+            region = (filt.crop_rect(shape) if filt is not None else None) or (0, 0, key[1], key[0])
+            rects = tile_grid(region, self.tile, self.overlap)
+            mask = filt.mask(shape) if filt is not None else None
+            if mask is not None:
+                rects = [r for r in rects if mask[r[1]:r[3], r[0]:r[2]].any()]
+            self._grid, self._grid_shape = rects, key
+        return self._grid
+
+    def plan(self, shape: Tuple[int, ...], tracks: Optional[np.ndarray] = None) -> List[Optional[Rect]]:
+        """Crops for a frame about to be inferred; None stands for the whole frame (or the stream's ROI crop)."""
+        if self.mode == "off":
+            return [None]
+        index = self._planned
+        self._planned += 1
+        grid = self.grid(shape)
+        if len(grid) <= 1:
+            return [None]
+        if self.mode == "on" or index % self.refresh_every == 0:
+            return [None, *grid]
+        if tracks is None or not len(tracks):
+            return [None]
+        small = tracks[(tracks["y2"] - tracks["y1"]) < self.small_px]
+        if not len(small):
+            return [None]
+        # One tile per small track: the one whose centre is nearest (most context around it)
+        cx = (small["x1"] + small["x2"]) * 0.5
+        cy = (small["y1"] + small["y2"]) * 0.5
+        centres = np.array([((r[0] + r[2]) * 0.5, (r[1] + r[3]) * 0.5) for r in grid])
+        d2 = (cx[:, None] - centres[None, :, 0]) ** 2 + (cy[:, None] - centres[None, :, 1]) ** 2
+        return [None, *(grid[i] for i in np.unique(d2.argmin(axis=1)).tolist())]
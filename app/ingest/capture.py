@@ -0,0 +1,405 @@
+from __future__ import annotations
+import logging
+import os
+import struct
+import threading
+import time
+from typing import Any, Callable, Dict, Optional, Tuple, Type
+
+import cv2
+import numpy as np
+
+from app.core.config import RTSPConfig
+from app.utils.metrics import METRICS
+
+try:
+    import av  # PyAV: optional, only needed for the "pyav" backend
+except Exception:  # pragma: no cover - optional dependency
+    av = None
+
+
+_SOF_MARKERS = {0xC0, 0xC1, 0xC2, 0xC3, 0xC5, 0xC6, 0xC7, 0xC9, 0xCA, 0xCB, 0xCD, 0xCE, 0xCF}
+_RETRY_S = 0.25  # wait after a failed read; doubles per consecutive backend error
+_MAX_BACKOFF_S = 30.0
+
+
+def jpeg_shape(data: bytes) -> Optional[Tuple[int, int, int]]:
+    """(h, w, channels) from the JPEG SOF header without decoding; None if not found."""
+    i, n = 2, len(data)
+    while i + 9 < n:
+        if data[i] != 0xFF:
+            return None
+        marker = data[i + 1]
+        if marker == 0xFF:  # fill byte
+            i += 1
+            continue
+        seg = struct.unpack(">H", data[i + 2:i + 4])[0]
+        if marker in _SOF_MARKERS:
+            h, w = struct.unpack(">HH", data[i + 5:i + 9])
+            return h, w, data[i + 9]
+        i += 2 + seg
+    return None
+
+
+class CapturedFrame:
+    """One captured frame: decoded BGR pixels, the source JPEG, or both.
+
+    Passthrough backends only carry `jpeg`; `image` decodes it on first access,
+    so pixels are produced only when a consumer actually needs them.
+    """
+
+    __slots__ = ("jpeg", "_image")
+
+    def __init__(self, image: Optional[np.ndarray] = None, jpeg: Optional[bytes] = None) -> None:
+        self._image = image
+        self.jpeg = jpeg
+
+    @property
+    def decoded(self) -> bool:
+        return self._image is not None
+
+    @property
+    def image(self) -> Optional[np.ndarray]:
+        if self._image is None and self.jpeg is not None:
+            self._image = cv2.imdecode(np.frombuffer(self.jpeg, dtype=np.uint8), cv2.IMREAD_COLOR)
+        return self._image
+
+    @property
+    def shape(self) -> Optional[Tuple[int, ...]]:
+        if self._image is not None:
+            return self._image.shape
+        return jpeg_shape(self.jpeg) if self.jpeg is not None else None
+
+
+class CaptureBackend:
+    """Frame source used by RTSPIngestor.
+
+    Subclasses implement open() / read() / release(); read() returns None on a
+    failed read, and LatestFrameReader handles retries and reopening. Local files
+    are accepted wherever a URL is; they are played back at their own frame rate
+    and rewound at the end so they can stand in for a camera.
+    """
+
+    name = "base"
+
+    def __init__(self, cfg: RTSPConfig, log: logging.Logger) -> None:
+        self.cfg = cfg
+        self.log = log
+        self.loop_file = os.path.isfile(cfg.url)
+        self._next_at = 0.0
+
+    def _pace(self, fps: float) -> None:
+        # Files would otherwise be read as fast as they decode
+        if not self.loop_file:
+            return
+        now = time.monotonic()
+        if self._next_at > now:
+            time.sleep(self._next_at - now)
+        self._next_at = max(now, self._next_at) + 1.0 / (fps if fps > 0 else self.cfg.fps)
+
+    def open(self) -> bool:
+        raise NotImplementedError
+
+    def read(self) -> Optional[CapturedFrame]:
+        raise NotImplementedError
+
+    def release(self) -> None:
+        pass
+
+
+class OpenCVCapture(CaptureBackend):
+    """cv2.VideoCapture over FFmpeg with software decode (the original ingest path)."""
+
+    name = "opencv"
+    raw = False  # subclasses: forward compressed packets instead of decoded frames
+
+    def __init__(self, cfg: RTSPConfig, log: logging.Logger) -> None:
+        super().__init__(cfg, log)
+        self.cap: Optional[cv2.VideoCapture] = None
+        self.transport = "tcp"
+
+    def open(self) -> bool:
+        # Force transport to TCP for reliability
+        opts = [
+            f"rtsp_transport;{self.transport}",
+            "max_delay;5000000",
+            "stimeout;10000000",
+            "reorder_queue_size;0",
+            "buffer_size;2048",
+        ]
+        os.environ["OPENCV_FFMPEG_CAPTURE_OPTIONS"] = "|".join(opts)
+        self.cap = cv2.VideoCapture(self.cfg.url, cv2.CAP_FFMPEG)
+        if not (self.cap and self.cap.isOpened()):
+            self.log.error("Failed to open RTSP (%s): %s", self.transport, self.cfg.url)
+            return False
+        # Lower internal buffering
+        try:
+            self.cap.set(cv2.CAP_PROP_BUFFERSIZE, 1)
+        except Exception:
+            pass
+        # Optional timeouts if supported
+        for prop, val in (
+            (getattr(cv2, "CAP_PROP_OPEN_TIMEOUT_MSEC", None), 5000),
+            (getattr(cv2, "CAP_PROP_READ_TIMEOUT_MSEC", None), 5000),
+        ):
+            if prop is not None:
+                try:
+                    self.cap.set(prop, val)
+                except Exception:
+                    pass
+        if self.raw:
+            return self._enable_raw()
+        # Try to configure FPS and size if supported
+        self.cap.set(cv2.CAP_PROP_FPS, self.cfg.fps)
+        self.cap.set(cv2.CAP_PROP_FRAME_WIDTH, self.cfg.width)
+        self.cap.set(cv2.CAP_PROP_FRAME_HEIGHT, self.cfg.height)
+        return True
+
+    def _enable_raw(self) -> bool:
+        return False
+
+    def _read_once(self) -> Optional[CapturedFrame]:
+        ok, frame = self.cap.read() if self.cap is not None else (False, None)
+        return CapturedFrame(image=frame) if ok and frame is not None else None
+
+    def read(self) -> Optional[CapturedFrame]:
+        if self.cap is not None:
+            self._pace(self.cap.get(cv2.CAP_PROP_FPS))
+        frame = self._read_once()
+        if frame is None and self.loop_file and self.cap is not None:
+            self.release()
+            if self.open():
+                frame = self._read_once()
+        return frame
+
+    def release(self) -> None:
+        if self.cap is not None:
+            try:
+                self.cap.release()
+            except Exception:
+                pass
+            self.cap = None
+
+
+class MJPEGPassthroughCapture(OpenCVCapture):
+    """Forwards the camera's JPEG frames untouched (FFmpeg raw packet mode, no decode).
+
+    Only valid for MJPEG sources; anything else is refused at open() so the
+    operator notices instead of getting undecodable frames.
+    """
+
+    name = "mjpeg"
+    raw = True
+
+    def _enable_raw(self) -> bool:
+        fourcc = int(self.cap.get(cv2.CAP_PROP_FOURCC)).to_bytes(4, "little").decode("ascii", "replace")
+        if fourcc.upper() not in ("MJPG", "JPEG"):
+            self.log.error("MJPEG passthrough needs an MJPEG source, %s is %r", self.cfg.url, fourcc)
+            return False
+        if not self.cap.set(cv2.CAP_PROP_FORMAT, -1):
+            self.log.error("This OpenCV build cannot return raw FFmpeg packets")
+            return False
+        return True
+
+    def _read_once(self) -> Optional[CapturedFrame]:
+        ok, pkt = self.cap.read() if self.cap is not None else (False, None)
+        if not ok or pkt is None or pkt.size < 4:
+            return None
+        data = pkt.tobytes()
+        if not data.startswith(b"\xff\xd8"):
+            return None
+        return CapturedFrame(jpeg=data)
+
+
+class GStreamerCapture(OpenCVCapture):
+    """H.264 RTSP through a GStreamer pipeline, decoded by the V4L2 stateful decoder (v4l2h264dec).
+
+    Needs an OpenCV build with GStreamer support; set CAPTURE_HW_DECODE=0 to
+    use the software avdec_h264 element instead.
+    """
+
+    name = "gstreamer"
+
+    def _pipeline(self) -> str:
+        decoder = "v4l2h264dec" if self.cfg.hw_decode else "avdec_h264"
+        if self.loop_file:
+            src = f'filesrc location="{self.cfg.url}" ! qtdemux ! h264parse'
+        else:
+            src = f'rtspsrc location="{self.cfg.url}" latency=0 protocols=tcp ! rtph264depay ! h264parse'
+        return f"{src} ! {decoder} ! videoconvert ! video/x-raw,format=BGR ! appsink drop=true max-buffers=1 sync=false"
+
+    def open(self) -> bool:
+        if "GStreamer:                   YES" not in cv2.getBuildInformation():
+            self.log.error("OpenCV was built without GStreamer; use CAPTURE_BACKEND=pyav or opencv")
+            return False
+        self.cap = cv2.VideoCapture(self._pipeline(), cv2.CAP_GSTREAMER)
+        if not self.cap.isOpened():
+            self.log.error("Failed to open GStreamer pipeline for %s", self.cfg.url)
+            return False
+        return True
+
+
+class PyAVCapture(CaptureBackend):
+    """Demux with PyAV and decode H.264 with FFmpeg's V4L2 M2M decoder (h264_v4l2m2m) when available."""
+
+    name = "pyav"
+
+    def __init__(self, cfg: RTSPConfig, log: logging.Logger) -> None:
+        super().__init__(cfg, log)
+        self.container: Any = None
+        self.stream: Any = None
+        self.codec: Any = None
+        self.packets: Any = None
+        self.pending: list = []
+
+    def open(self) -> bool:
+        if av is None:
+            self.log.error("CAPTURE_BACKEND=pyav needs the optional 'av' package")
+            return False
+        options = {} if self.loop_file else {"rtsp_transport": "tcp", "fflags": "nobuffer", "flags": "low_delay"}
+        try:
+            self.container = av.open(self.cfg.url, options=options, timeout=10.0)
+            self.stream = self.container.streams.video[0]
+        except Exception as e:
+            self.log.error("Failed to open %s with PyAV: %s", self.cfg.url, e)
+            return False
+        self.codec = None
+        if self.cfg.hw_decode and self.stream.codec_context.name == "h264":
+            try:
+                self.codec = av.CodecContext.create("h264_v4l2m2m", "r")
+                self.codec.extradata = self.stream.codec_context.extradata
+            except Exception as e:
+                self.log.warning("h264_v4l2m2m unavailable (%s); decoding in software", e)
+                self.codec = None
+        if self.codec is None:
+            self.codec = self.stream.codec_context
+        self.packets = self.container.demux(self.stream)
+        self.pending = []
+        return True
+
+    def _read_once(self) -> Optional[CapturedFrame]:
+        try:
+            while not self.pending:
+                packet = next(self.packets)
+                if packet.size:
+                    self.pending.extend(self.codec.decode(packet))
+        except Exception:
+            return None
+        return CapturedFrame(image=self.pending.pop(0).to_ndarray(format="bgr24"))
+
+    def read(self) -> Optional[CapturedFrame]:
+        if self.packets is None:
+            return None
+        self._pace(float(self.stream.average_rate or 0))
+        frame = self._read_once()
+        if frame is None and self.loop_file:
+            self.release()
+            if self.open():
+                frame = self._read_once()
+        return frame
+
+    def release(self) -> None:
+        if self.container is not None:
+            try:
+                self.container.close()
+            except Exception:
+                pass
+        self.container = self.stream = self.codec = self.packets = None
+        self.pending = []
+
+
+class LatestFrameReader(threading.Thread):
+    """Drains a capture backend as fast as the source delivers into a single "latest frame" slot.
+
+    Keeping the decoder empty is what keeps published frames fresh: the consumer
+    samples `latest()` at its own rate and always gets the newest frame; frames
+    overwritten before anyone took them are counted as `capture_dropped`.
+    Sustained read failures trigger `reopen()` from this thread; a backend that
+    raises is reopened with exponential backoff. The thread only exits once
+    `stop_event` is set.
+    """
+
+    def __init__(self, backend: CaptureBackend, stop_event: threading.Event, reopen: Callable[[], None], log: logging.Logger, stream: str) -> None:
+        super().__init__(daemon=True, name=f"capture-{stream}")
+        self.backend = backend
+        self.stop_event = stop_event
+        self.reopen = reopen
+        self.log = log
+        self.stream = stream
+        self._cond = threading.Condition()
+        self._frame: Optional[CapturedFrame] = None
+        self._ts = 0.0
+        self._count = 0  # frames stored so far
+        self._taken = 0  # count of the last frame handed out
+
+    def _reopen(self) -> None:
+        try:
+            self.reopen()
+        except Exception as e:
+            self.log.warning("Reopen failed: %s", e)
+
+    def run(self) -> None:
+        fail_count = 0
+        backoff = _RETRY_S
+        while not self.stop_event.is_set():
+            try:
+                with METRICS.time(self.stream, "capture"):
+                    frame = self.backend.read()
+            except Exception as e:
+                # A backend bug or a dropped connection must not end capture for good
+                METRICS.inc(self.stream, "read_failures")
+                self.log.warning("Read raised %s: %s; reopening in %.2fs", type(e).__name__, e, backoff)
+                if self.stop_event.wait(backoff):
+                    break
+                backoff = min(backoff * 2, _MAX_BACKOFF_S)
+                self._reopen()
+                fail_count = 0
+                continue
+            if frame is None:
+                fail_count += 1
+                METRICS.inc(self.stream, "read_failures")
+                if fail_count % 10 == 0:
+                    self.log.warning("Read failed x%d, retrying...", fail_count)
+                # Reopen after sustained failures
+                if fail_count >= 12:
+                    self.log.info("Reopening RTSP due to repeated read failures")
+                    self._reopen()
+                    fail_count = 0
+                self.stop_event.wait(_RETRY_S)
+                continue
+            if fail_count:
+                self.log.info("Read recovered after %d failures", fail_count)
+            fail_count = 0
+            backoff = _RETRY_S
+            ts = time.time()
+            with self._cond:
+                if self._count > self._taken:
+                    METRICS.inc(self.stream, "capture_dropped")
+                self._frame, self._ts = frame, ts
+                self._count += 1
+                self._cond.notify_all()
+            METRICS.inc(self.stream, "captured")
+        with self._cond:
+            self._cond.notify_all()
+
+    def latest(self, after: int, timeout: float) -> Optional[Tuple[CapturedFrame, float, int]]:
+        """(frame, capture time, frame count) for the newest frame past count `after`; None on timeout/stop."""
+        with self._cond:
+            if not self._cond.wait_for(lambda: self._count > after or self.stop_event.is_set(), timeout):
+                return None
+            if self._count <= after or self._frame is None:
+                return None
+            self._taken = self._count
+            return self._frame, self._ts, self._count
+
+
+BACKENDS: Dict[str, Type[CaptureBackend]] = {
+    b.name: b for b in (OpenCVCapture, MJPEGPassthroughCapture, GStreamerCapture, PyAVCapture)
+}
+
+
+def create_capture(cfg: RTSPConfig, log: logging.Logger) -> CaptureBackend:
+    try:
+        return BACKENDS[cfg.capture_backend](cfg, log)
+    except KeyError:
+        raise ValueError(f"unknown capture backend {cfg.capture_backend!r}; expected one of {sorted(BACKENDS)}")
@@ -1,12 +1,16 @@
 import cv2
-import os
+import numpy as np
 import time
 import threading
-from typing import Optional, Tuple
+from typing import Any, Dict, Optional
 
 from app.utils.logging_setup import setup_logging
-from app.core.config import RTSPConfig
+from app.utils.metrics import METRICS
+from app.core.config import RTSPConfig, CONFIG
 from app.core.redis_client import RedisCache
+from app.core.frame_ring import FrameRing
+from app.core.controller import apply_quality_offset
+from app.ingest.capture import CaptureBackend, CapturedFrame, LatestFrameReader, create_capture
 
 
 class RTSPIngestor(threading.Thread):
@@ -18,58 +22,25 @@ class RTSPIngestor(threading.Thread):
         self.cache = cache
         self.log = setup_logging(f"ingest.{cfg.name}")
         self.stop_event = threading.Event()
-        self.cap: Optional[cv2.VideoCapture] = None
-        self.transport: str = "udp"  # prefer UDP; fallback to TCP on repeated failures
+        self.cap: Optional[CaptureBackend] = None
+        self.reader: Optional[LatestFrameReader] = None
         self.reopen_tries: int = 0
+        self.seq: int = 0  # monotonically increasing per published frame
+        self.ring: Optional[FrameRing] = None  # only with frame_transport == "shm"
+        self._viewer = False
+        self._viewer_checked_at = 0.0
+        self._control: Optional[Dict[str, Any]] = None  # AdaptiveController decision (pipeline side)
+        self._control_checked_at = 0.0
 
     def open(self) -> bool:
-        # Force transport to TCP for reliability
-        self.transport = "tcp"
-        desired_transport = self.transport
-        opts = [
-            f"rtsp_transport;{self.transport}",
-            "max_delay;5000000",
-            "stimeout;10000000",
-            "reorder_queue_size;0",
-            "buffer_size;2048",
-        ]
-        os.environ["OPENCV_FFMPEG_CAPTURE_OPTIONS"] = "|".join(opts)
-        self.cap = cv2.VideoCapture(self.cfg.url, cv2.CAP_FFMPEG)
-        if not (self.cap and self.cap.isOpened()):
-            self.log.error("Failed to open RTSP (%s): %s", self.transport, self.cfg.url)
-            return False
-        # Lower internal buffering
-        try:
-            self.cap.set(cv2.CAP_PROP_BUFFERSIZE, 1)
-        except Exception:
-            pass
-        # Optional timeouts if supported
-        for prop, val in (
-            (getattr(cv2, "CAP_PROP_OPEN_TIMEOUT_MSEC", None), 5000),
-            (getattr(cv2, "CAP_PROP_READ_TIMEOUT_MSEC", None), 5000),
-        ):
-            if prop is not None:
-                try:
-                    self.cap.set(prop, val)
-                except Exception:
-                    pass
-        # Try to configure FPS and size if supported
-        self.cap.set(cv2.CAP_PROP_FPS, self.cfg.fps)
-        self.cap.set(cv2.CAP_PROP_FRAME_WIDTH, self.cfg.width)
-        self.cap.set(cv2.CAP_PROP_FRAME_HEIGHT, self.cfg.height)
-        return True
+        if self.cap is None:
+            self.cap = create_capture(self.cfg, self.log)
+        return self.cap.open()
 
     def _reopen(self) -> None:
-        try:
-            if self.cap:
-                self.cap.release()
-        except Exception:
-            pass
-        # After a couple of failed reopen attempts on UDP, switch to TCP
+        if self.cap is not None:
+            self.cap.release()
         self.reopen_tries += 1
-        if self.transport == "udp" and self.reopen_tries >= 2:
-            self.transport = "tcp"
-            self.log.info("Switching RTSP transport to TCP due to repeated failures")
         time.sleep(1.0)
         self.open()
 
@@ -78,49 +49,136 @@ class RTSPIngestor(threading.Thread):
             self.cache.publish_probe(self.cfg.name, "error", {"reason": "open_failed"})
             return
         self.cache.publish_probe(self.cfg.name, "ok", {"event": "start"})
-        frame_interval = 1.0 / max(self.cfg.fps, 1)
+        self.seq = self.cache.get_frame_seq(self.cfg.name)
+        self.reader = LatestFrameReader(self.cap, self.stop_event, self._reopen, self.log, self.cfg.name)
+        self.reader.start()
+        name = self.cfg.name
         last = 0.0
-        fail_count = 0
+        taken = 0
         while not self.stop_event.is_set():
-            if not self.cap:
-                break
-            ok, frame = self.cap.read()
-            if not ok or frame is None:
-                fail_count += 1
-                if fail_count % 10 == 0:
-                    self.log.warning("Read failed x%d, retrying...", fail_count)
-                # Reopen after sustained failures
-                if fail_count >= 12:
-                    self.log.info("Reopening RTSP due to repeated read failures")
-                    self._reopen()
-                    fail_count = 0
-                time.sleep(0.25)
+            control = self._control_decision()
+            frame_interval = 1.0 / max(int(control.get("fps", self.cfg.fps)) if control else self.cfg.fps, 1)
+            quality_offset = int(control.get("jpeg_quality_offset", 0)) if control else 0
+            wait = last + frame_interval - time.time()
+            if wait > 0:
+                # throttle to desired fps; the reader keeps draining the source meanwhile
+                self.stop_event.wait(wait)
+            latest = self.reader.latest(taken, timeout=1.0)
+            if latest is None:
                 continue
-            if fail_count:
-                self.log.info("Read recovered after %d failures", fail_count)
-            fail_count = 0
-            now = time.time()
-            if now - last < frame_interval:
-                # throttle to desired fps
-                time.sleep(max(0.0, frame_interval - (now - last)))
+            captured, captured_at, taken = latest
             last = time.time()
 
-            self.log.info(f"RTSP frame captured: shape={frame.shape}, dtype={frame.dtype}, min={frame.min()}, max={frame.max()}")
-            # Encode frame as JPEG for caching and dashboard
-            ok, buf = cv2.imencode(".jpg", frame, [int(cv2.IMWRITE_JPEG_QUALITY), 95])
-            if ok:
-                self.log.info(f"RTSP frame encoded: size={len(buf.tobytes())} bytes, first 4 bytes={buf.tobytes()[:4]}")
-                # Write primary frame key and one alias (not duplicate alias of alias)
-                self.cache.push_frame(self.cfg.name, buf.tobytes())
-                self.cache.push_frame(f"frame:{self.cfg.name}", buf.tobytes())
-                self.log.info(f"RTSP frame pushed to Redis: key={self.cfg.name}, bytes={len(buf.tobytes())}")
-                self.cache.set_json(f"last_frame_meta:{self.cfg.name}", {
-                    "ts": int(last),
-                    "w": frame.shape[1],
-                    "h": frame.shape[0],
-                })
+            self.seq += 1
+            log_frame = self.cfg.frame_log_every > 0 and self.seq % self.cfg.frame_log_every == 0
+            shm = self.cfg.frame_transport == "shm"
+            shape = captured.shape or (0, 0)
+            # Everything this frame writes goes out in one transaction; the
+            # status hash carries what last_frame_meta / frame_seq used to
+            batch = self.cache.batch(name).status(w=shape[1], h=shape[0], published_at=repr(last))
+            aliases = (f"frame:{self.cfg.name}",) if CONFIG.redis.legacy_frame_aliases else ()
+            data = None
+            if shm:
+                if self._write_ring(self._pixels(captured), captured_at):
+                    # Raw pixels go through shared memory; wake the pipeline right away,
+                    # the JPEG below then only serves the dashboard.
+                    with METRICS.time(name, "redis_push"):
+                        batch.announce(self.seq, captured_at).execute()
+                    batch = None
+                # Dashboard-only JPEG: skip entirely unless someone is watching
+                want = not self.cfg.preview_on_demand or self._viewer_active()
+                if want and captured.jpeg is not None:
+                    data = captured.jpeg  # passthrough: the camera JPEG is the preview
+                elif want:
+                    with METRICS.time(name, "encode"):
+                        buf = self._encode_preview(captured.image, quality_offset)
+                    data = buf.tobytes() if buf is not None else None
+                if data is not None:
+                    with METRICS.time(name, "redis_push"):
+                        (batch or self.cache.batch(name)).frame(data, aliases).execute()
+                    batch = None
+            elif captured.jpeg is not None:
+                # MJPEG passthrough: forward the camera's JPEG, the pipeline decodes it
+                data = captured.jpeg
+                batch.frame(data, aliases).announce(self.seq, captured_at)
+            else:
+                # Encode frame as JPEG: this is the detector input, so the quality offset never applies
+                with METRICS.time(name, "encode"):
+                    ok, buf = cv2.imencode(".jpg", captured.image, [int(cv2.IMWRITE_JPEG_QUALITY), 95])
+                if not ok:
+                    continue
+                data = buf.tobytes()
+                batch.frame(data, aliases).announce(self.seq, captured_at)
+            if batch is not None:
+                with METRICS.time(name, "redis_push"):
+                    batch.execute()
+            if log_frame:
+                # Sampled: metadata only, no pixel reductions or decodes
+                self.log.info("Frame seq=%d shape=%s jpeg=%s bytes", self.seq, shape, len(data) if data is not None else "-")
+            METRICS.inc(name, "published")
+            # Capture-to-publish age: throttle wait plus encode/push
+            METRICS.observe(name, "frame_age", time.time() - captured_at)
+            METRICS.maybe_flush(self.cache)
+        self.reader.join(timeout=5.0)
+        if self.cap is not None:
+            self.cap.release()
+        if self.ring is not None:
+            self.ring.close(unlink=True)
+            self.ring = None
         self.cache.publish_probe(self.cfg.name, "stopped", {"event": "stop"})
 
+    def _viewer_active(self) -> bool:
+        # Lease lookups are cheap but not free; re-check at most once per second
+        now = time.monotonic()
+        if now - self._viewer_checked_at >= 1.0:
+            self._viewer_checked_at = now
+            try:
+                self._viewer = self.cache.has_viewer(self.cfg.name)
+            except Exception:
+                self._viewer = False
+        return self._viewer
+
+    def _control_decision(self) -> Optional[Dict[str, Any]]:
+        # Adaptive control is optional; without a live decision key the static config applies
+        if not self.cfg.adaptive:
+            return None
+        now = time.monotonic()
+        if now - self._control_checked_at >= 1.0:
+            self._control_checked_at = now
+            try:
+                self._control = self.cache.get_json(f"control:{self.cfg.name}")
+            except Exception:
+                self._control = None
+        return self._control
+
+    def _pixels(self, captured: CapturedFrame) -> np.ndarray:
+        if captured.decoded:
+            return captured.image
+        with METRICS.time(self.cfg.name, "decode"):
+            return captured.image
+
+    def _encode_preview(self, frame: np.ndarray, quality_offset: int = 0) -> Optional[np.ndarray]:
+        w = self.cfg.preview_width
+        if w and w < frame.shape[1]:
+            h = max(1, round(frame.shape[0] * w / frame.shape[1]))
+            frame = cv2.resize(frame, (w, h), interpolation=cv2.INTER_AREA)
+        ok, buf = cv2.imencode(".jpg", frame, [int(cv2.IMWRITE_JPEG_QUALITY), apply_quality_offset(self.cfg.preview_quality, quality_offset)])
+        return buf if ok else None
+
+    def _write_ring(self, frame: np.ndarray, ts: float) -> bool:
+        try:
+            if self.ring is None or frame.nbytes > self.ring.slot_bytes:
+                if self.ring is not None:
+                    self.log.info("Frame size changed to %s; recreating shared-memory ring", frame.shape)
+                    self.ring.close()
+                self.ring = FrameRing.create(self.cfg.name, frame.nbytes, slots=max(2, self.cfg.ring_slots))
+            with METRICS.time(self.cfg.name, "shm_write"):
+                self.ring.write(frame, self.seq, ts)
+            return True
+        except Exception as e:
+            self.log.error("Shared-memory ring write failed: %s", e)
+            return False
+
     def stop(self) -> None:
         self.stop_event.set()
         if self.cap:
@@ -7,6 +7,7 @@ from app.core.config import CONFIG
 from app.core.redis_client import RedisCache
 from app.ingest.rtsp_ingestor import RTSPIngestor
 from app.infer.hailo_infer import HailoYoloV8
+from app.infer.scheduler import InferenceScheduler, create_frontend
 from app.core.pipeline import DetectionPipeline
 from app.utils.logging_setup import setup_logging
 
@@ -17,13 +18,15 @@ log = setup_logging("main")
 def start_all() -> list[threading.Thread]:
     cache = RedisCache()
     hailo = HailoYoloV8(CONFIG.hailo)
-
     threads: list[threading.Thread] = []
+    scheduler = create_frontend(hailo, CONFIG.rtsp_streams)
+    if isinstance(scheduler, InferenceScheduler):
+        threads.append(scheduler)
 
     # Start ingestors and pipelines per stream
     for s in CONFIG.rtsp_streams:
         ing = RTSPIngestor(s, cache)
-        pipe = DetectionPipeline(s, cache, hailo)
+        pipe = DetectionPipeline(s, cache, scheduler)
         ing.start()
         pipe.start()
         threads.extend([ing, pipe])
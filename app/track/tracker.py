@@ -6,121 +6,294 @@ import numpy as np
 
 from app.utils.logging_setup import setup_logging
 
+try:  # SciPy ships with scikit-learn; fall back to greedy matching without it
+    from scipy.optimize import linear_sum_assignment
+except Exception:
+    linear_sum_assignment = None
 
-def _iou(a: np.ndarray, b: np.ndarray) -> float:
-    # a,b: [x1,y1,x2,y2]
-    ax1, ay1, ax2, ay2 = a
-    bx1, by1, bx2, by2 = b
-    inter_x1 = max(ax1, bx1)
-    inter_y1 = max(ay1, by1)
-    inter_x2 = min(ax2, bx2)
-    inter_y2 = min(ay2, by2)
-    iw = max(0.0, inter_x2 - inter_x1)
-    ih = max(0.0, inter_y2 - inter_y1)
-    inter = iw * ih
-    if inter <= 0:
-        return 0.0
-    area_a = max(0.0, ax2 - ax1) * max(0.0, ay2 - ay1)
-    area_b = max(0.0, bx2 - bx1) * max(0.0, by2 - by1)
-    denom = area_a + area_b - inter
-    return float(inter / denom) if denom > 0 else 0.0
-
-
-class _Track:
-    def __init__(self, tid: int, bbox: np.ndarray, cls: int, conf: float) -> None:
-        self.id = tid
-        self.bbox = bbox.astype(float)  # [x1,y1,x2,y2]
-        self.cls = int(cls)
-        self.conf = float(conf)
-        self.missed = 0
-        self.last_ts = time.time()
-
-    def update(self, bbox: np.ndarray, cls: int, conf: float):
-        self.bbox = bbox.astype(float)
-        self.cls = int(cls)
-        self.conf = float(conf)
-        self.missed = 0
-        self.last_ts = time.time()
+
+def _iou_matrix(a: np.ndarray, b: np.ndarray) -> np.ndarray:
+    """Pairwise IoU between boxes a (N,4) and b (M,4) in [x1,y1,x2,y2]; returns (N,M)."""
+    if a.size == 0 or b.size == 0:
+        return np.zeros((a.shape[0], b.shape[0]), dtype=float)
+    ix1 = np.maximum(a[:, None, 0], b[None, :, 0])
+    iy1 = np.maximum(a[:, None, 1], b[None, :, 1])
+    ix2 = np.minimum(a[:, None, 2], b[None, :, 2])
+    iy2 = np.minimum(a[:, None, 3], b[None, :, 3])
+    inter = np.clip(ix2 - ix1, 0.0, None) * np.clip(iy2 - iy1, 0.0, None)
+    area_a = np.clip(a[:, 2] - a[:, 0], 0.0, None) * np.clip(a[:, 3] - a[:, 1], 0.0, None)
+    area_b = np.clip(b[:, 2] - b[:, 0], 0.0, None) * np.clip(b[:, 3] - b[:, 1], 0.0, None)
+    denom = area_a[:, None] + area_b[None, :] - inter
+    return np.divide(inter, denom, out=np.zeros_like(inter), where=denom > 0)
+
+
+def _assign(iou: np.ndarray, thresh: float, method: str = "auto") -> tuple[np.ndarray, np.ndarray]:
+    """Match rows (tracks) to columns (detections); returns paired (row_idx, col_idx) arrays.
+
+    - "hungarian": globally optimal total IoU (SciPy), pairs below `thresh` dropped.
+    - "greedy": repeatedly take the highest remaining IoU pair; independent of row order.
+    - "auto": hungarian when SciPy is importable, else greedy.
+    """
+    empty = np.empty(0, dtype=int)
+    if iou.size == 0:
+        return empty, empty
+    if method == "auto":
+        method = "hungarian" if linear_sum_assignment is not None else "greedy"
+    if method == "hungarian" and linear_sum_assignment is not None:
+        # Forbid sub-threshold pairs up front so they cannot displace a valid match
+        cost = np.where(iou >= thresh, 1.0 - iou, 1e6)
+        rows, cols = linear_sum_assignment(cost)
+        keep = iou[rows, cols] >= thresh
+        return rows[keep], cols[keep]
+    cand_r, cand_c = np.nonzero(iou >= thresh)
+    if cand_r.size == 0:
+        return empty, empty
+    order = np.argsort(-iou[cand_r, cand_c], kind="stable")
+    cand_r, cand_c = cand_r[order], cand_c[order]
+    row_used = np.zeros(iou.shape[0], dtype=bool)
+    col_used = np.zeros(iou.shape[1], dtype=bool)
+    rows: list[int] = []
+    cols: list[int] = []
+    for r, c in zip(cand_r.tolist(), cand_c.tolist()):
+        if row_used[r] or col_used[c]:
+            continue
+        row_used[r] = col_used[c] = True
+        rows.append(r)
+        cols.append(c)
+    return np.asarray(rows, dtype=int), np.asarray(cols, dtype=int)
+
+
+# Motion model noise, relative to box size (max of w, h)
+_MEAS_STD = 0.05  # detector box jitter
+_ACC_STD = 2.0  # per s^2: how quickly targets change speed
+_INIT_VEL_STD = 1.0  # per s: unknown speed of a new track
+_MAX_DT = 2.0  # cap extrapolation after long gaps (seconds)
+_STATIC_ACTIVITY = 0.01  # moving-pixel fraction below which a track's box counts as static
+
+# Compact per-frame tracker output; convert with tracks_to_dicts() only when serializing
+TRACK_DTYPE = np.dtype([
+    ("track_id", "<i8"),
+    ("class_uid", "<i8"),
+    ("x1", "<f4"),
+    ("y1", "<f4"),
+    ("x2", "<f4"),
+    ("y2", "<f4"),
+    ("cls", "<i4"),
+    ("conf", "<f4"),
+])
+
+
+def tracks_to_dicts(tracks: np.ndarray) -> List[Dict[str, Any]]:
+    """Serialize a TRACK_DTYPE array into the JSON schema published to Redis."""
+    names = tracks.dtype.names or ()
+    return [dict(zip(names, row)) for row in tracks.tolist()]
+
+
+def _detections_to_arrays(detections: Any) -> tuple[np.ndarray, np.ndarray, np.ndarray]:
+    """Accept detection dicts, a structured array with x1..y2/cls/conf fields, or an (N,4+) array."""
+    if detections is None or len(detections) == 0:
+        return np.empty((0, 4)), np.empty(0, dtype=np.int32), np.empty(0, dtype=np.float32)
+    if isinstance(detections, np.ndarray) and detections.dtype.names:
+        boxes = np.stack([detections["x1"], detections["y1"], detections["x2"], detections["y2"]], axis=1).astype(float)
+        return boxes, detections["cls"].astype(np.int32), detections["conf"].astype(np.float32)
+    if isinstance(detections, np.ndarray):
+        # Plain (N,4) boxes, optionally followed by cls and conf columns
+        n = detections.shape[0]
+        cls = detections[:, 4].astype(np.int32) if detections.shape[1] > 4 else np.full(n, -1, dtype=np.int32)
+        conf = detections[:, 5].astype(np.float32) if detections.shape[1] > 5 else np.ones(n, dtype=np.float32)
+        return detections[:, :4].astype(float), cls, conf
+    boxes = np.array([[d["x1"], d["y1"], d["x2"], d["y2"]] for d in detections], dtype=float)
+    cls = np.array([d.get("cls", -1) for d in detections], dtype=np.int32)
+    conf = np.array([d.get("conf", 1.0) for d in detections], dtype=np.float32)
+    return boxes, cls, conf
+
+
+def _xyxy_to_cxcywh(b: np.ndarray) -> np.ndarray:
+    return np.stack([(b[:, 0] + b[:, 2]) / 2, (b[:, 1] + b[:, 3]) / 2, b[:, 2] - b[:, 0], b[:, 3] - b[:, 1]], axis=1)
+
+
+def _cxcywh_to_xyxy(m: np.ndarray) -> np.ndarray:
+    w = np.maximum(m[:, 2], 1.0)
+    h = np.maximum(m[:, 3], 1.0)
+    return np.stack([m[:, 0] - w / 2, m[:, 1] - h / 2, m[:, 0] + w / 2, m[:, 1] + h / 2], axis=1)
+
+
+class _TrackTable:
+    """Struct-of-arrays store: one contiguous array per track attribute.
+
+    Motion state is a constant-velocity Kalman filter per box coordinate
+    (cx, cy, w, h), kept decoupled so each track needs only its position,
+    velocity and the three distinct entries of a 2x2 covariance per axis.
+    """
+
+    __slots__ = ("ids", "uids", "bbox", "cls", "conf", "missed", "last_ts", "mean", "vel", "p00", "p01", "p11", "state_ts")
+
+    def __init__(self) -> None:
+        self.ids = np.empty(0, dtype=np.int64)
+        self.uids = np.empty(0, dtype=np.int64)
+        self.bbox = np.empty((0, 4), dtype=float)  # [x1,y1,x2,y2], derived from `mean`
+        self.cls = np.empty(0, dtype=np.int32)
+        self.conf = np.empty(0, dtype=np.float32)
+        self.missed = np.empty(0, dtype=np.int32)
+        self.last_ts = np.empty(0, dtype=float)  # last matched detection
+        self.mean = np.empty((0, 4), dtype=float)  # [cx,cy,w,h]
+        self.vel = np.empty((0, 4), dtype=float)  # per second
+        self.p00 = np.empty((0, 4), dtype=float)
+        self.p01 = np.empty((0, 4), dtype=float)
+        self.p11 = np.empty((0, 4), dtype=float)
+        self.state_ts = np.empty(0, dtype=float)  # time the state was last propagated to
+
+    def __len__(self) -> int:
+        return int(self.ids.shape[0])
+
+    def append(self, ids: np.ndarray, uids: np.ndarray, bbox: np.ndarray, cls: np.ndarray, conf: np.ndarray, ts: float) -> None:
+        n = ids.shape[0]
+        mean = _xyxy_to_cxcywh(bbox)
+        size = np.maximum(mean[:, 2:4].max(axis=1, keepdims=True), 1.0)
+        self.ids = np.concatenate([self.ids, ids])
+        self.uids = np.concatenate([self.uids, uids])
+        self.bbox = np.concatenate([self.bbox, bbox])
+        self.cls = np.concatenate([self.cls, cls])
+        self.conf = np.concatenate([self.conf, conf])
+        self.missed = np.concatenate([self.missed, np.zeros(n, dtype=np.int32)])
+        self.last_ts = np.concatenate([self.last_ts, np.full(n, ts)])
+        self.mean = np.concatenate([self.mean, mean])
+        self.vel = np.concatenate([self.vel, np.zeros((n, 4))])
+        self.p00 = np.concatenate([self.p00, np.repeat((2 * _MEAS_STD * size) ** 2, 4, axis=1)])
+        self.p01 = np.concatenate([self.p01, np.zeros((n, 4))])
+        self.p11 = np.concatenate([self.p11, np.repeat((_INIT_VEL_STD * size) ** 2, 4, axis=1)])
+        self.state_ts = np.concatenate([self.state_ts, np.full(n, ts)])
+
+    def keep(self, mask: np.ndarray) -> None:
+        for name in self.__slots__:
+            setattr(self, name, getattr(self, name)[mask])
+
+    # ---------------------------- motion model ----------------------------
+    def predict(self, ts: float) -> None:
+        """Propagate every track's state to time `ts` (x += v*dt, P = F P F^T + Q)."""
+        if not len(self):
+            return
+        dt = np.clip(ts - self.state_ts, 0.0, _MAX_DT)[:, None]
+        size = np.maximum(self.mean[:, 2:4].max(axis=1, keepdims=True), 1.0)
+        q = (_ACC_STD * size) ** 2
+        self.mean += self.vel * dt
+        self.p00 += dt * (2 * self.p01 + dt * self.p11) + q * dt ** 4 / 4
+        self.p01 += dt * self.p11 + q * dt ** 3 / 2
+        self.p11 += q * dt ** 2
+        self.state_ts[:] = ts
+        self.bbox = _cxcywh_to_xyxy(self.mean)
+
+    def correct(self, rows: np.ndarray, boxes: np.ndarray) -> None:
+        """Kalman update of tracks `rows` with measured xyxy `boxes`."""
+        z = _xyxy_to_cxcywh(boxes)
+        m = self.mean[rows]
+        size = np.maximum(z[:, 2:4].max(axis=1, keepdims=True), 1.0)
+        s = self.p00[rows] + (_MEAS_STD * size) ** 2
+        k0 = self.p00[rows] / s
+        k1 = self.p01[rows] / s
+        y = z - m
+        self.mean[rows] = m + k0 * y
+        self.vel[rows] += k1 * y
+        p01 = self.p01[rows]
+        self.p11[rows] -= k1 * p01
+        self.p01[rows] = (1 - k0) * p01
+        self.p00[rows] = (1 - k0) * self.p00[rows]
+        self.bbox[rows] = _cxcywh_to_xyxy(self.mean[rows])
 
 
 class MultiObjectTracker:
     """Lightweight IOU-based tracker for object tracking.
 
     - No external dependencies (no torch, no deep-sort-realtime).
-    - Greedy IoU matching; tracks expire after `max_age` missed updates.
+    - One vectorized IoU matrix per frame, optimal (Hungarian) or global-greedy
+      assignment; tracks expire after `max_age` missed updates.
+    - Tracks live in a struct-of-arrays table; `update()` returns a TRACK_DTYPE array.
+    - With `motion=True` a constant-velocity Kalman filter predicts boxes between
+      inference frames (`predict()`) and corrects them on detection frames, so
+      boxes keep moving when `infer_every_n_frames` > 1.
     """
 
-    def __init__(self, max_age: int = 30, iou_thresh: float = 0.3) -> None:
+    def __init__(self, max_age: int = 30, iou_thresh: float = 0.3, matcher: str = "auto", motion: bool = True) -> None:
         self.log = setup_logging("tracker")
         self.max_age = max(1, int(max_age))
         self.iou_thresh = float(iou_thresh)
-        self.tracks: list[_Track] = []
+        self.matcher = matcher
+        self.motion = motion
+        self.tracks = _TrackTable()
         self.next_tid: int = 1
-        # Preserve stable class_uid mapping like previous implementation
-        self.id_map: dict[int, int] = {}
         self.next_uid: int = 1
 
-    def _new_track(self, bbox: np.ndarray, cls: int, conf: float) -> _Track:
-        t = _Track(self.next_tid, bbox, cls, conf)
-        self.next_tid += 1
-        self.tracks.append(t)
-        return t
-
-    def update(self, detections: List[Dict[str, Any]], frame_bgr: Optional[np.ndarray] = None) -> List[Dict[str, Any]]:
-        # Convert detections into numpy bboxes
-        det_bboxes: list[np.ndarray] = []
-        det_meta: list[tuple[int, float]] = []  # (cls, conf)
-        for d in detections or []:
-            x1, y1, x2, y2 = float(d["x1"]), float(d["y1"]), float(d["x2"]), float(d["y2"])
-            det_bboxes.append(np.array([x1, y1, x2, y2], dtype=float))
-            det_meta.append((int(d.get("cls", -1)), float(d.get("conf", 1.0))))
-
-        # Age existing tracks
-        for t in self.tracks:
-            t.missed += 1
-
-        # Match detections to tracks greedily by IoU
-        unmatched_det_idxs = set(range(len(det_bboxes)))
-        for t in self.tracks:
-            # pick best det by IoU
-            best_iou = 0.0
-            best_j = None
-            for j in list(unmatched_det_idxs):
-                iou = _iou(t.bbox, det_bboxes[j])
-                if iou > best_iou:
-                    best_iou = iou
-                    best_j = j
-            if best_j is not None and best_iou >= self.iou_thresh:
-                cls, conf = det_meta[best_j]
-                t.update(det_bboxes[best_j], cls, conf)
-                if best_j in unmatched_det_idxs:
-                    unmatched_det_idxs.remove(best_j)
+    @property
+    def id_map(self) -> dict[int, int]:
+        """track_id -> class_uid for live tracks only (bounded by the number of tracks)."""
+        return dict(zip(self.tracks.ids.tolist(), self.tracks.uids.tolist()))
+
+    def _hold_static(self, motion_mask: Any) -> None:
+        """Zero the velocity of tracks whose box shows no motion, so parked objects do not drift."""
+        t = self.tracks
+        if motion_mask is None or not self.motion or not len(t):
+            return
+        t.vel[motion_mask.activity(t.bbox) < _STATIC_ACTIVITY] = 0.0
+
+    def predict(self, ts: Optional[float] = None, motion_mask: Any = None) -> np.ndarray:
+        """Advance tracks to `ts` without detections (frames where inference was skipped).
+
+        Unlike `update([])` this does not count as a miss. `motion_mask` (an
+        app.core.motion.MotionMask) pins tracks in static regions in place.
+        """
+        if self.motion:
+            self._hold_static(motion_mask)
+            self.tracks.predict(time.time() if ts is None else ts)
+        return self._output()
+
+    def update(self, detections: Any, frame_bgr: Optional[np.ndarray] = None, ts: Optional[float] = None, motion_mask: Any = None) -> np.ndarray:
+        now = time.time() if ts is None else ts
+        det_boxes, det_cls, det_conf = _detections_to_arrays(detections)
+        t = self.tracks
+
+        # Age existing tracks and move them to where they should be now
+        t.missed += 1
+        if self.motion:
+            self._hold_static(motion_mask)
+            t.predict(now)
+
+        # Match detections to (predicted) tracks on the full IoU matrix at once
+        unmatched = np.ones(det_boxes.shape[0], dtype=bool)
+        if len(t) and det_boxes.shape[0]:
+            rows, cols = _assign(_iou_matrix(t.bbox, det_boxes), self.iou_thresh, self.matcher)
+            if self.motion:
+                t.correct(rows, det_boxes[cols])
+            else:
+                t.bbox[rows] = det_boxes[cols]
+                t.mean[rows] = _xyxy_to_cxcywh(det_boxes[cols])
+            t.cls[rows] = det_cls[cols]
+            t.conf[rows] = det_conf[cols]
+            t.missed[rows] = 0
+            t.last_ts[rows] = now
+            unmatched[cols] = False
 
         # Create new tracks for unmatched detections
-        for j in sorted(unmatched_det_idxs):
-            cls, conf = det_meta[j] if j < len(det_meta) else (-1, 1.0)
-            self._new_track(det_bboxes[j], cls, conf)
+        n_new = int(unmatched.sum())
+        if n_new:
+            ids = np.arange(self.next_tid, self.next_tid + n_new, dtype=np.int64)
+            uids = np.arange(self.next_uid, self.next_uid + n_new, dtype=np.int64)
+            self.next_tid += n_new
+            self.next_uid += n_new
+            t.append(ids, uids, det_boxes[unmatched], det_cls[unmatched], det_conf[unmatched], now)
 
         # Drop stale tracks
-        self.tracks = [t for t in self.tracks if t.missed <= self.max_age]
-
-        # Build output in pipeline-expected schema
-        out: List[Dict[str, Any]] = []
-        for t in self.tracks:
-            tid = int(t.id)
-            if tid not in self.id_map:
-                self.id_map[tid] = self.next_uid
-                self.next_uid += 1
-            uid = self.id_map[tid]
-            x1, y1, x2, y2 = t.bbox.tolist()
-            out.append({
-                "track_id": tid,
-                "class_uid": uid,
-                "x1": float(x1),
-                "y1": float(y1),
-                "x2": float(x2),
-                "y2": float(y2),
-                "cls": int(t.cls),
-                "conf": float(t.conf),
-            })
+        stale = t.missed > self.max_age
+        if stale.any():
+            t.keep(~stale)
+
+        return self._output()
+
+    def _output(self) -> np.ndarray:
+        t = self.tracks
+        out = np.empty(len(t), dtype=TRACK_DTYPE)
+        out["track_id"] = t.ids
+        out["class_uid"] = t.uids
+        out["x1"], out["y1"], out["x2"], out["y2"] = t.bbox.T
+        out["cls"] = t.cls
+        out["conf"] = t.conf
         return out
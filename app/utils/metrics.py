@@ -0,0 +1,193 @@
+from __future__ import annotations
+import os
+import socket
+import threading
+import time
+from bisect import bisect_left
+from contextlib import contextmanager
+from typing import Any, Dict, Iterable, Iterator, List, Tuple
+
+
+# Upper bounds (seconds) of the latency buckets; one extra +Inf bucket follows
+LATENCY_BUCKETS: Tuple[float, ...] = (0.0005, 0.001, 0.002, 0.005, 0.01, 0.02, 0.05, 0.1, 0.2, 0.5, 1.0, 2.0, 5.0)
+QUANTILES = (0.5, 0.95, 0.99)
+# Series for work that is not tied to one stream (the shared detector)
+SHARED = "all"
+
+
+class Histogram:
+    """Fixed-bucket latency histogram: one bisect and three integer/float adds per sample."""
+
+    __slots__ = ("counts", "sum", "count")
+
+    def __init__(self) -> None:
+        self.counts = [0] * (len(LATENCY_BUCKETS) + 1)
+        self.sum = 0.0
+        self.count = 0
+
+    def observe(self, seconds: float) -> None:
+        self.counts[bisect_left(LATENCY_BUCKETS, seconds)] += 1
+        self.sum += seconds
+        self.count += 1
+
+
+class Metrics:
+    """Per-process registry of per-(stream, stage) histograms and per-(stream, name) counters.
+
+    Hot paths only touch a dict lookup and a Histogram; each series is normally
+    written by the one thread that owns the stage, so no lock is taken per sample
+    (a rare lost increment under contention is acceptable for metrics). Snapshots
+    are pushed to Redis (`metrics:<host>:<pid>`, indexed in `index:metrics`) at
+    most every `interval_s` by whichever loop calls `maybe_flush()`; the API
+    merges all processes' snapshots.
+    """
+
+    def __init__(self, interval_s: float = 5.0) -> None:
+        self.interval_s = interval_s
+        self.source = f"{socket.gethostname()}:{os.getpid()}"
+        self._hists: Dict[Tuple[str, str], Histogram] = {}
+        self._counters: Dict[Tuple[str, str], int] = {}
+        self._lock = threading.Lock()
+        self._last_flush = 0.0
+
+    def histogram(self, stream: str, stage: str) -> Histogram:
+        h = self._hists.get((stream, stage))
+        if h is None:
+            with self._lock:
+                h = self._hists.setdefault((stream, stage), Histogram())
+        return h
+
+    def observe(self, stream: str, stage: str, seconds: float) -> None:
+        self.histogram(stream, stage).observe(seconds)
+
+    @contextmanager
+    def time(self, stream: str, stage: str) -> Iterator[None]:
+        h = self.histogram(stream, stage)
+        t0 = time.perf_counter()
+        try:
+            yield
+        finally:
+            h.observe(time.perf_counter() - t0)
+
+    def inc(self, stream: str, name: str, n: int = 1) -> None:
+        key = (stream, name)
+        self._counters[key] = self._counters.get(key, 0) + n
+
+    def reset(self) -> None:
+        """Drop all series (benchmarks measure one run at a time)."""
+        with self._lock:
+            self._hists.clear()
+            self._counters.clear()
+
+    def snapshot(self) -> Dict[str, Any]:
+        with self._lock:
+            hists = list(self._hists.items())
+        return {
+            "ts": time.time(),
+            "buckets": list(LATENCY_BUCKETS),
+            "histograms": [
+                {"stream": s, "stage": st, "counts": list(h.counts), "sum": h.sum, "count": h.count}
+                for (s, st), h in hists
+            ],
+            "counters": [{"stream": s, "name": n, "value": v} for (s, n), v in list(self._counters.items())],
+        }
+
+    @property
+    def ttl(self) -> int:
+        return max(30, int(self.interval_s * 6))
+
+    def _due(self) -> bool:
+        now = time.monotonic()
+        if now - self._last_flush < self.interval_s:
+            return False
+        self._last_flush = now
+        return True
+
+    def maybe_flush(self, cache: Any) -> None:
+        if not self._due():
+            return
+        try:
+            cache.set_indexed_json("metrics", self.source, self.snapshot(), ttl=self.ttl)
+        except Exception:
+            pass  # metrics must never take the pipeline down
+
+    async def maybe_flush_async(self, cache: Any) -> None:
+        """maybe_flush() for an AsyncRedisCache (the API server's event loop)."""
+        if not self._due():
+            return
+        try:
+            await cache.set_indexed_json("metrics", self.source, self.snapshot(), ttl=self.ttl)
+        except Exception:
+            pass
+
+
+METRICS = Metrics()
+
+
+# ---------------------------- aggregation / exposition ----------------------------
+def merge_snapshots(snapshots: Iterable[Dict[str, Any]]) -> Tuple[Dict[Tuple[str, str], Histogram], Dict[Tuple[str, str], int]]:
+    """Sum histograms and counters with the same labels across processes."""
+    hists: Dict[Tuple[str, str], Histogram] = {}
+    counters: Dict[Tuple[str, str], int] = {}
+    for snap in snapshots:
+        if not snap or list(snap.get("buckets", ())) != list(LATENCY_BUCKETS):
+            continue
+        for h in snap.get("histograms", ()):
+            agg = hists.setdefault((h["stream"], h["stage"]), Histogram())
+            agg.counts = [a + b for a, b in zip(agg.counts, h["counts"])]
+            agg.sum += h["sum"]
+            agg.count += h["count"]
+        for c in snap.get("counters", ()):
+            key = (c["stream"], c["name"])
+            counters[key] = counters.get(key, 0) + int(c["value"])
+    return hists, counters
+
+
+def quantile(h: Histogram, q: float) -> float:
+    """Estimate quantile `q` by linear interpolation inside the containing bucket."""
+    if h.count == 0:
+        return 0.0
+    rank = q * h.count
+    seen = 0
+    for i, n in enumerate(h.counts):
+        if n and seen + n >= rank:
+            lo = LATENCY_BUCKETS[i - 1] if i > 0 else 0.0
+            hi = LATENCY_BUCKETS[i] if i < len(LATENCY_BUCKETS) else LATENCY_BUCKETS[-1]
+            return lo + (hi - lo) * (rank - seen) / n
+        seen += n
+    return LATENCY_BUCKETS[-1]
+
+
+def _labels(**kv: str) -> str:
+    return "{" + ",".join(f'{k}="{v}"' for k, v in kv.items()) + "}"
+
+
+def render_prometheus(snapshots: Iterable[Dict[str, Any]]) -> str:
+    """Prometheus text format (0.0.4): stage histograms, p50/p95/p99 estimates and counters."""
+    hists, counters = merge_snapshots(snapshots)
+    lines: List[str] = [
+        "# HELP pi_live_stage_seconds Per-stage processing time.",
+        "# TYPE pi_live_stage_seconds histogram",
+    ]
+    for (stream, stage), h in sorted(hists.items()):
+        cum = 0
+        for bound, n in zip([*LATENCY_BUCKETS, float("inf")], h.counts):
+            cum += n
+            le = "+Inf" if bound == float("inf") else repr(bound)
+            lines.append(f"pi_live_stage_seconds_bucket{_labels(stream=stream, stage=stage, le=le)} {cum}")
+        lines.append(f"pi_live_stage_seconds_sum{_labels(stream=stream, stage=stage)} {h.sum:.6f}")
+        lines.append(f"pi_live_stage_seconds_count{_labels(stream=stream, stage=stage)} {h.count}")
+    lines += [
+        "# HELP pi_live_stage_latency_seconds Per-stage quantiles estimated from the histogram buckets.",
+        "# TYPE pi_live_stage_latency_seconds gauge",
+    ]
+    for (stream, stage), h in sorted(hists.items()):
+        for q in QUANTILES:
+            lines.append(f"pi_live_stage_latency_seconds{_labels(stream=stream, stage=stage, quantile=str(q))} {quantile(h, q):.6f}")
+    lines += [
+        "# HELP pi_live_events_total Per-stream event counters.",
+        "# TYPE pi_live_events_total counter",
+    ]
+    for (stream, name), v in sorted(counters.items()):
+        lines.append(f"pi_live_events_total{_labels(stream=stream, event=name)} {v}")
+    return "\n".join(lines) + "\n"
@@ -1,10 +1,14 @@
 from __future__ import annotations
 import logging
-import json
+import queue
+import threading
 import time
-from typing import Optional
+from collections import defaultdict
+from typing import Any, Dict, List, Optional
 
+from app.core.config import CONFIG
 from app.core.redis_client import RedisCache
+from app.utils.metrics import METRICS, SHARED
 
 
 class RedisLogHandler(logging.Handler):
@@ -13,29 +17,93 @@ class RedisLogHandler(logging.Handler):
     Keys:
       pi-live:logs (global)
       pi-live:logs:<logger_name>
+
+    `emit()` only formats the record and puts it on a bounded queue; a daemon
+    thread drains the queue and writes each batch in one pipeline. When Redis
+    is slow or down the queue fills up and further records are dropped (counted
+    in `dropped` and the `logs_dropped` metric) instead of blocking the caller.
     """
 
-    def __init__(self, cache: Optional[RedisCache] = None, capacity: int = 500):
+    def __init__(
+        self,
+        cache: Optional[RedisCache] = None,
+        capacity: int = 500,
+        queue_size: Optional[int] = None,
+        batch_size: Optional[int] = None,
+    ):
         super().__init__()
         self.cache = cache or RedisCache()
         self.capacity = capacity
+        self.batch_size = max(1, batch_size or CONFIG.redis.log_batch_size)
+        self.queue: queue.Queue[Dict[str, Any]] = queue.Queue(maxsize=max(1, queue_size or CONFIG.redis.log_queue_size))
+        self.dropped = 0
+        self._stop = threading.Event()
+        self._thread = threading.Thread(target=self._drain, name="redis-log", daemon=True)
+        self._thread.start()
 
     def emit(self, record: logging.LogRecord) -> None:
         try:
             data = {
-                "ts": int(time.time()),
+                "ts": int(record.created),
                 "name": record.name,
                 "level": record.levelname,
                 "msg": self.format(record),
             }
-            self.cache.push_log_json("logs", data, capacity=self.capacity)
-            self.cache.push_log_json(f"logs:{record.name}", data, capacity=self.capacity)
+            self.queue.put_nowait(data)
+        except queue.Full:
+            self.dropped += 1
+            METRICS.inc(SHARED, "logs_dropped")
         except Exception:
             pass
 
+    def _batch(self, timeout: float) -> List[Dict[str, Any]]:
+        try:
+            batch = [self.queue.get(timeout=timeout)]
+        except queue.Empty:
+            return []
+        while len(batch) < self.batch_size:
+            try:
+                batch.append(self.queue.get_nowait())
+            except queue.Empty:
+                break
+        return batch
+
+    def _write(self, batch: List[Dict[str, Any]]) -> bool:
+        keyed: Dict[str, List[Dict[str, Any]]] = defaultdict(list)
+        for data in batch:
+            keyed["logs"].append(data)
+            keyed[f"logs:{data['name']}"].append(data)
+        try:
+            self.cache.push_logs_json(keyed, capacity=self.capacity)
+            return True
+        except Exception:
+            self.dropped += len(batch)
+            METRICS.inc(SHARED, "logs_dropped", len(batch))
+            return False
+
+    def _drain(self) -> None:
+        while not self._stop.is_set() or not self.queue.empty():
+            batch = self._batch(timeout=0.5)
+            if batch and not self._write(batch) and not self._stop.is_set():
+                time.sleep(1.0)  # Redis unavailable: back off, the bounded queue absorbs (or drops) the rest
+
+    def close(self) -> None:
+        self._stop.set()
+        self._thread.join(timeout=2.0)
+        super().close()
+
+
+_shared_handler: Optional[RedisLogHandler] = None
+_shared_lock = threading.Lock()
+
 
 def attach_redis_handler(logger: logging.Logger, capacity: int = 500) -> None:
-    handler = RedisLogHandler(capacity=capacity)
-    fmt = logging.Formatter(fmt='%(asctime)s %(name)s [%(levelname)s] %(message)s')
-    handler.setFormatter(fmt)
-    logger.addHandler(handler)
+    # One queue and writer thread per process, shared by every logger
+    global _shared_handler
+    with _shared_lock:
+        if _shared_handler is None:
+            handler = RedisLogHandler(capacity=capacity)
+            fmt = logging.Formatter(fmt='%(asctime)s %(name)s [%(levelname)s] %(message)s')
+            handler.setFormatter(fmt)
+            _shared_handler = handler
+    logger.addHandler(_shared_handler)
@@ -70,15 +70,18 @@ fi
 $SUDO cp systemd/pi-live-api.service /etc/systemd/system/
 $SUDO cp systemd/pi-live-ingest@.service /etc/systemd/system/
 $SUDO cp systemd/pi-live-pipeline@.service /etc/systemd/system/
+$SUDO cp systemd/pi-live-supervisor.service /etc/systemd/system/
 $SUDO systemctl daemon-reload
 
 # Patch systemd units for correct user/home
 $SUDO sed -i "s|User=.*|User=$RUN_USER|g" /etc/systemd/system/pi-live-api.service
 $SUDO sed -i "s|User=.*|User=$RUN_USER|g" /etc/systemd/system/pi-live-ingest@.service
 $SUDO sed -i "s|User=.*|User=$RUN_USER|g" /etc/systemd/system/pi-live-pipeline@.service
+$SUDO sed -i "s|User=.*|User=$RUN_USER|g" /etc/systemd/system/pi-live-supervisor.service
 $SUDO sed -i "s|/home/.*/pi-live-detect-rstp/.venv/bin/activate|$APP_DIR/.venv/bin/activate|g" /etc/systemd/system/pi-live-api.service
 $SUDO sed -i "s|/home/.*/pi-live-detect-rstp/.venv/bin/activate|$APP_DIR/.venv/bin/activate|g" /etc/systemd/system/pi-live-ingest@.service
 $SUDO sed -i "s|/home/.*/pi-live-detect-rstp/.venv/bin/activate|$APP_DIR/.venv/bin/activate|g" /etc/systemd/system/pi-live-pipeline@.service
+$SUDO sed -i "s|/home/.*/pi-live-detect-rstp/.venv/bin/activate|$APP_DIR/.venv/bin/activate|g" /etc/systemd/system/pi-live-supervisor.service
 
 # Enable and start services
 $SUDO systemctl enable pi-live-api.service
@@ -19,6 +19,7 @@ PY
 )
 
 # Stop services
+$SUDO systemctl stop pi-live-supervisor.service || true
 [ -n "$STREAM2" ] && $SUDO systemctl stop "pi-live-pipeline@${STREAM2}.service" || true
 [ -n "$STREAM1" ] && $SUDO systemctl stop "pi-live-pipeline@${STREAM1}.service" || true
 [ -n "$STREAM2" ] && $SUDO systemctl stop "pi-live-ingest@${STREAM2}.service" || true
@@ -26,6 +27,7 @@ PY
 $SUDO systemctl stop pi-live-api.service || true
 
 # Disable services
+$SUDO systemctl disable pi-live-supervisor.service || true
 [ -n "$STREAM2" ] && $SUDO systemctl disable "pi-live-pipeline@${STREAM2}.service" || true
 [ -n "$STREAM1" ] && $SUDO systemctl disable "pi-live-pipeline@${STREAM1}.service" || true
 [ -n "$STREAM2" ] && $SUDO systemctl disable "pi-live-ingest@${STREAM2}.service" || true
@@ -36,6 +38,7 @@ $SUDO systemctl disable pi-live-api.service || true
 $SUDO rm -f /etc/systemd/system/pi-live-api.service || true
 $SUDO rm -f /etc/systemd/system/pi-live-ingest@.service || true
 $SUDO rm -f /etc/systemd/system/pi-live-pipeline@.service || true
+$SUDO rm -f /etc/systemd/system/pi-live-supervisor.service || true
 $SUDO systemctl daemon-reload || true
 
 # Optional: remove app dir
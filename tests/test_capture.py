@@ -0,0 +1,99 @@
+from __future__ import annotations
+
+import logging
+import queue
+import threading
+from typing import List, Optional
+
+import cv2
+import numpy as np
+import pytest
+
+from app.core.config import RTSPConfig
+from app.ingest.capture import CaptureBackend, CapturedFrame, LatestFrameReader, jpeg_shape
+
+LOG = logging.getLogger("test.capture")
+
+
+def _jpeg(h: int, w: int, channels: int = 3) -> bytes:
+    img = np.full((h, w, channels) if channels > 1 else (h, w), 128, dtype=np.uint8)
+    ok, buf = cv2.imencode(".jpg", img)
+    assert ok
+    return buf.tobytes()
+
+
+def test_jpeg_shape_reads_the_sof_header() -> None:
+    assert jpeg_shape(_jpeg(48, 64)) == (48, 64, 3)
+    assert jpeg_shape(_jpeg(30, 20, channels=1)) == (30, 20, 1)
+    assert jpeg_shape(b"\xff\xd8not a jpeg at all") is None
+    assert jpeg_shape(_jpeg(48, 64)[:20]) is None  # truncated before the SOF segment
+
+
+def test_captured_frame_decodes_on_first_access_only() -> None:
+    frame = CapturedFrame(jpeg=_jpeg(48, 64))
+    assert frame.shape == (48, 64, 3)
+    assert not frame.decoded  # the shape comes from the header
+    image = frame.image
+    assert frame.decoded and image.shape == (48, 64, 3)
+    assert frame.image is image
+    assert CapturedFrame().image is None and CapturedFrame().shape is None
+
+
+class _QueueBackend(CaptureBackend):
+    """Hands out whatever the test puts in `items`; exceptions are raised, None is a failed read."""
+
+    def __init__(self) -> None:
+        super().__init__(RTSPConfig(name="cam", url="rtsp://test"), LOG)
+        self.items: "queue.Queue[object]" = queue.Queue()
+
+    def read(self) -> Optional[CapturedFrame]:
+        try:
+            item = self.items.get(timeout=0.05)
+        except queue.Empty:
+            return None
+        if isinstance(item, Exception):
+            raise item
+        return item  # type: ignore[return-value]
+
+
+@pytest.fixture
+def reader():
+    backend = _QueueBackend()
+    reopened: List[int] = []
+    stop = threading.Event()
+    thread = LatestFrameReader(backend, stop, lambda: reopened.append(1), LOG, "cam")
+    thread.start()
+    yield thread, backend, reopened
+    stop.set()
+    thread.join(timeout=2.0)
+    assert not thread.is_alive()
+
+
+def _wait_taken(reader: LatestFrameReader, count: int) -> None:
+    with reader._cond:
+        assert reader._cond.wait_for(lambda: reader._count >= count, timeout=2.0)
+
+
+def test_reader_hands_out_only_the_newest_frame(reader) -> None:
+    thread, backend, _ = reader
+    frames = [CapturedFrame(jpeg=_jpeg(8, 8)) for _ in range(3)]
+    for f in frames:
+        backend.items.put(f)
+    _wait_taken(thread, 3)
+    frame, _, count = thread.latest(0, timeout=1.0)
+    assert (frame, count) == (frames[-1], 3)
+    # Nothing newer yet: the consumer times out instead of getting the same frame again
+    assert thread.latest(count, timeout=0.1) is None
+    backend.items.put(frames[0])
+    frame, _, count = thread.latest(count, timeout=1.0)
+    assert (frame, count) == (frames[0], 4)
+
+
+def test_reader_survives_a_raising_backend(reader) -> None:
+    thread, backend, reopened = reader
+    backend.items.put(RuntimeError("demuxer crashed"))
+    frame = CapturedFrame(jpeg=_jpeg(8, 8))
+    backend.items.put(frame)
+    got = thread.latest(0, timeout=2.0)
+    assert got is not None and got[0] is frame
+    assert reopened == [1] and thread.is_alive()
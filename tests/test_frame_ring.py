@@ -0,0 +1,74 @@
+from __future__ import annotations
+
+import numpy as np
+import pytest
+
+from app.core import frame_ring
+from app.core.frame_ring import FrameRing
+
+SHAPE = (4, 6, 3)
+
+
+@pytest.fixture
+def ring(tmp_path, monkeypatch):
+    monkeypatch.setattr(frame_ring, "RING_DIR", tmp_path)
+    writer = FrameRing.create("cam", int(np.prod(SHAPE)), slots=3)
+    reader = FrameRing.attach("cam")
+    assert reader is not None
+    yield writer, reader
+    reader.close()
+    writer.close(unlink=True)
+
+
+def _frame(value: int) -> np.ndarray:
+    return np.full(SHAPE, value, dtype=np.uint8)
+
+
+def test_reader_sees_latest_frame(ring) -> None:
+    writer, reader = ring
+    assert reader.read_latest() is None
+    for seq in (1, 2):
+        writer.write(_frame(seq), seq, ts=float(seq))
+    seq, ts, view = reader.read_latest()
+    assert (seq, ts) == (2, 2.0)
+    assert (view == 2).all()
+    assert reader.is_valid(2)
+
+
+def test_writer_lapping_reader_is_detected_as_torn(ring) -> None:
+    writer, reader = ring
+    writer.write(_frame(1), 1, ts=1.0)
+    seq, _, view = reader.read_latest()
+    # The reader holds a zero-copy view while the writer wraps around onto its slot
+    for s in range(2, 2 + writer.slots):
+        writer.write(_frame(s), s, ts=float(s))
+    assert not reader.is_valid(seq)
+    assert reader.read(seq) is None
+    assert (view == 1 + writer.slots).all()  # the view now shows the newer frame
+
+
+def test_slot_is_invalid_while_being_overwritten(ring, monkeypatch) -> None:
+    writer, reader = ring
+    writer.write(_frame(1), 1, ts=1.0)
+    seen = []
+    copyto = np.copyto
+
+    def spy(dst, src, *args, **kwargs):
+        # Mid-copy: neither the old nor the new occupant of the slot may be read
+        seen.append((reader.is_valid(1), reader.read(1 + writer.slots)))
+        return copyto(dst, src, *args, **kwargs)
+
+    monkeypatch.setattr(frame_ring.np, "copyto", spy)
+    writer.write(_frame(9), 1 + writer.slots, ts=2.0)
+    monkeypatch.undo()
+    assert seen == [(False, None)]
+    assert reader.is_valid(1 + writer.slots)
+
+
+def test_replaced_after_writer_closes(ring) -> None:
+    writer, reader = ring
+    assert not reader.replaced()
+    writer.close()
+    assert reader.replaced()
+    writer.close(unlink=True)  # closing twice is harmless and still removes the file
+    assert not writer.path.exists()
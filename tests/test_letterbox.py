@@ -0,0 +1,41 @@
+from __future__ import annotations
+import threading
+import time
+
+import numpy as np
+
+from app.infer.letterbox import LetterboxCache
+
+SRC = (72, 128, 3)
+DST = (64, 64)
+
+
+def test_pool_reuses_reserved_canvases_round_robin() -> None:
+    cache = LetterboxCache()
+    cache.reserve(4)
+    ids = [id(cache.apply(np.zeros(SRC, dtype=np.uint8), DST)[0]) for _ in range(8)]
+    assert len(set(ids)) == 4
+    assert ids[:4] == ids[4:]
+
+
+def test_concurrent_callers_never_share_a_canvas() -> None:
+    cache = LetterboxCache()  # one canvas per thread, as direct infer() reserves
+    errors = []
+    start = threading.Barrier(4)
+
+    def caller(value: int) -> None:
+        img = np.full(SRC, value, dtype=np.uint8)
+        start.wait()
+        for _ in range(50):
+            canvas, plan = cache.apply(img, DST)
+            time.sleep(0.0005)  # let the other callers letterbox in the meantime
+            centre = canvas[plan.top + plan.new_h // 2, plan.left + plan.new_w // 2]
+            if not (centre == value).all():
+                errors.append((value, centre.tolist()))
+
+    threads = [threading.Thread(target=caller, args=(v,)) for v in (10, 20, 30, 40)]
+    for t in threads:
+        t.start()
+    for t in threads:
+        t.join()
+    assert errors == []
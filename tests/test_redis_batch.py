@@ -0,0 +1,62 @@
+from __future__ import annotations
+
+import pytest
+
+fakeredis = pytest.importorskip("fakeredis")
+import redis  # noqa: E402
+
+from app.core.redis_client import RedisCache  # noqa: E402
+
+TTL = 30
+
+
+@pytest.fixture
+def cache() -> RedisCache:
+    pool = redis.ConnectionPool(connection_class=getattr(fakeredis, "FakeRedisConnection", fakeredis.FakeConnection), server=fakeredis.FakeServer())
+    return RedisCache(pool=pool)
+
+
+def _ingest(cache: RedisCache, seq: int) -> None:
+    cache.batch("cam", TTL).frame(b"jpeg").announce(seq, 1.5 + seq).status(w=640, h=480).execute()
+
+
+def _expire_all(cache: RedisCache) -> None:
+    """Drop the TTL of every key, so a later refresh shows up as a TTL again."""
+    for key in cache.r.keys("*"):
+        cache.r.persist(key)
+
+
+def test_batch_writes_frame_announcement_and_status(cache: RedisCache) -> None:
+    _ingest(cache, 1)
+    cache.batch("cam", TTL).result(b"annotated", {"tracks": []}, 1, 2.5).status(processed_seq=1).execute()
+    assert cache.get_latest_frame("cam") == (1, 2.5, b"jpeg")
+    assert cache.get_status("cam") == {"seq": 1, "ts": 2.5, "w": 640, "h": 480, "processed_seq": 1}
+    assert cache.r.xlen(cache._k("frames", "cam")) == 1
+    assert cache.r.xlen(cache._k("results", "cam")) == 1
+    assert cache.r.sismember(cache._k("index", "streams"), "cam")
+    for kind in ("status", "frames", "results"):
+        assert 0 < cache.r.ttl(cache._k(kind, "cam")) <= TTL
+
+
+def test_ttl_refresh_only_when_due(cache: RedisCache) -> None:
+    status, frames = cache._k("status", "cam"), cache._k("frames", "cam")
+    _ingest(cache, 1)
+    _expire_all(cache)
+    # Within ttl/3 of the last refresh: data is written, TTLs are left alone
+    _ingest(cache, 2)
+    assert cache.get_frame_seq("cam") == 2
+    assert cache.r.ttl(status) == -1 and cache.r.ttl(frames) == -1
+    assert cache.r.ttl(cache._k("index", "streams")) == -1
+    # Once ttl/3 has passed, the next batch refreshes the hash, the stream and the index
+    for keys in cache._refreshed:
+        cache._refreshed[keys] -= TTL / 3.0
+    _ingest(cache, 3)
+    assert 0 < cache.r.ttl(status) <= TTL and 0 < cache.r.ttl(frames) <= TTL
+    assert 0 < cache.r.ttl(cache._k("index", "streams")) <= TTL
+
+
+def test_refresh_is_tracked_per_key_set(cache: RedisCache) -> None:
+    # Ingest and pipeline share the status hash but expire different streams
+    _ingest(cache, 1)
+    cache.batch("cam", TTL).result(None, {"tracks": []}, 1, 2.5).execute()
+    assert 0 < cache.r.ttl(cache._k("results", "cam")) <= TTL
@@ -0,0 +1,44 @@
+from __future__ import annotations
+
+import numpy as np
+import pytest
+
+from app.infer.fake_device import FakeDetector
+from app.infer.pipelined import PipelinedInference
+from app.infer.scheduler import InferenceScheduler
+
+FRAME = np.zeros((8, 8, 3), dtype=np.uint8)
+
+
+def test_stop_fails_queued_and_later_frames() -> None:
+    scheduler = InferenceScheduler(FakeDetector(pre_ms=0, device_ms=200, post_ms=0), max_batch=1, window_ms=0)
+    scheduler.start()
+    futs = [scheduler.submit(FRAME) for _ in range(4)]
+    scheduler.stop()
+    scheduler.join(timeout=3.0)
+    assert not scheduler.is_alive()
+    # The frame already on the device completes; the rest fail instead of hanging
+    outcomes = [f.exception(timeout=1.0) for f in futs]
+    assert all(isinstance(e, RuntimeError) for e in outcomes if e is not None)
+    assert sum(e is not None for e in outcomes) >= 3
+    late = scheduler.submit(FRAME)
+    assert late.done()
+    with pytest.raises(RuntimeError, match="scheduler stopped"):
+        late.result()
+
+
+def test_stop_before_start_fails_queued_frames() -> None:
+    scheduler = InferenceScheduler(FakeDetector())
+    fut = scheduler.submit(FRAME)
+    scheduler.stop()
+    with pytest.raises(RuntimeError, match="scheduler stopped"):
+        fut.result(timeout=1.0)
+
+
+def test_pipelined_stop_drains_then_rejects() -> None:
+    frontend = PipelinedInference(FakeDetector(pre_ms=1, device_ms=1, post_ms=1), depth=2)
+    futs = [frontend.submit(FRAME) for _ in range(3)]
+    frontend.stop()
+    assert all(len(f.result(timeout=1.0)) == 1 for f in futs)
+    with pytest.raises(RuntimeError, match="stopped"):
+        frontend.submit(FRAME).result(timeout=1.0)
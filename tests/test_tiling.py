@@ -0,0 +1,27 @@
+from __future__ import annotations
+
+from app.core.config import RTSPConfig
+from app.infer.tiling import TilePlanner, tile_grid
+
+SHAPE = (720, 1280, 3)
+
+
+def test_adaptive_refresh_counts_inferred_frames() -> None:
+    planner = TilePlanner(RTSPConfig(name="cam", url="x", tiling="adaptive", tile_refresh_every=3))
+    full = len(planner.grid(SHAPE)) + 1
+    # Each plan() call is one inferred frame, however many frames the pipeline skipped in between
+    sizes = [len(planner.plan(SHAPE)) for _ in range(7)]
+    assert sizes == [full, 1, 1, full, 1, 1, full]
+
+
+def test_grid_spreads_tiles_evenly_with_min_overlap() -> None:
+    rects = tile_grid((0, 0, 1280, 720), 640, overlap=0.2)
+    xs = sorted({r[0] for r in rects})
+    ys = sorted({r[1] for r in rects})
+    # ceil((1280 - 128) / 512) = 3 columns, ceil((720 - 128) / 512) = 2 rows
+    assert (xs, ys) == ([0, 320, 640], [0, 80])
+    assert all(r[2] - r[0] == 640 and r[3] - r[1] == 640 for r in rects)
+    assert rects[-1][2:] == (1280, 720)
+    for starts in (xs, ys):
+        gaps = {b - a for a, b in zip(starts, starts[1:])}
+        assert len(gaps) == 1 and 640 - gaps.pop() >= 128
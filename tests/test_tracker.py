@@ -0,0 +1,96 @@
+from __future__ import annotations
+from typing import Dict, Iterator, Tuple
+
+import numpy as np
+import pytest
+
+from app.track import tracker as tracker_mod
+from app.track.tracker import MultiObjectTracker, _iou_matrix
+
+FPS = 15.0
+MATCHERS = [
+    "greedy",
+    pytest.param("hungarian", marks=pytest.mark.skipif(tracker_mod.linear_sum_assignment is None, reason="needs SciPy")),
+]
+
+
+def _crossing(frames: int = 60, seed: int = 0) -> Iterator[Tuple[np.ndarray, np.ndarray]]:
+    """Ground truth and jittered detections for six targets whose paths cross.
+
+    Two head-on pairs in slightly offset lanes and one X-shaped pair; crossing
+    boxes reach an IoU of about 0.5 and 0.8 at their closest point.
+    """
+    rng = np.random.default_rng(seed)
+    start = np.array([[100, 200], [900, 215], [100, 500], [900, 480], [260, 100], [260, 620]], dtype=float)
+    vel = np.array([[14, 0], [-14, 0], [12, 0], [-12, 0], [10, 8], [10, -8]], dtype=float)
+    half = np.array([30.0, 40.0])
+    for f in range(frames):
+        c = start + vel * f
+        gt = np.hstack([c - half, c + half])
+        yield gt, gt + rng.normal(0, 1.5, size=gt.shape)
+
+
+def _boxes(tracks: np.ndarray) -> np.ndarray:
+    return np.stack([tracks["x1"], tracks["y1"], tracks["x2"], tracks["y2"]], axis=1).astype(float)
+
+
+@pytest.mark.parametrize("matcher", MATCHERS)
+@pytest.mark.parametrize("seed", range(3))
+def test_crossing_targets_keep_their_ids(matcher: str, seed: int) -> None:
+    trk = MultiObjectTracker(matcher=matcher)
+    shuffle = np.random.default_rng(100 + seed)
+    owner: Dict[int, int] = {}
+    for f, (gt, dets) in enumerate(_crossing(seed=seed)):
+        tracks = trk.update(dets[shuffle.permutation(len(dets))], ts=f / FPS)
+        assert len(tracks) == len(gt)
+        iou = _iou_matrix(gt, _boxes(tracks))
+        for g in range(len(gt)):
+            k = int(np.argmax(iou[g]))
+            assert iou[g, k] >= 0.5, f"target {g} lost at frame {f}"
+            tid = int(tracks["track_id"][k])
+            assert owner.setdefault(g, tid) == tid, f"ID switch for target {g} at frame {f}"
+
+
+def _crowd(objects: int = 30, frames: int = 40, seed: int = 3) -> Iterator[Tuple[np.ndarray, np.ndarray]]:
+    """Many targets criss-crossing a small area: most detections overlap several tracks."""
+    rng = np.random.default_rng(seed)
+    start = rng.uniform([100, 100], [400, 300], size=(objects, 2))
+    vel = rng.uniform(-8, 8, size=(objects, 2))
+    half = rng.uniform(20, 40, size=(objects, 2))
+    for f in range(frames):
+        c = start + vel * f
+        gt = np.hstack([c - half, c + half])
+        yield gt, gt + rng.normal(0, 3.0, size=gt.shape)
+
+
+def _rows(tracks: np.ndarray) -> np.ndarray:
+    boxes = _boxes(tracks)
+    return boxes[np.lexsort(boxes.T[::-1])]
+
+
+@pytest.mark.parametrize("matcher", MATCHERS)
+def test_update_is_independent_of_track_and_detection_order(matcher: str) -> None:
+    frames = [dets for _, dets in _crowd()]
+    rng = np.random.default_rng(7)
+
+    def run(first: np.ndarray, shuffled: bool) -> Tuple[Dict[int, np.ndarray], np.ndarray]:
+        """Final box of each first-frame track (keyed by the detection it started on) plus all final boxes, sorted."""
+        # Tracks created later get IDs in detection order, so those are compared by box only
+        trk = MultiObjectTracker(matcher=matcher)
+        tracks = trk.update(frames[0][first], ts=0.0)
+        origin = {int(tid): int(first[i]) for i, tid in enumerate(tracks["track_id"])}
+        for f, dets in enumerate(frames[1:], start=1):
+            order = rng.permutation(len(dets)) if shuffled else np.arange(len(dets))
+            tracks = trk.update(dets[order], ts=f / FPS)
+        kept = {origin[int(tid)]: box for tid, box in zip(tracks["track_id"], _boxes(tracks)) if int(tid) in origin}
+        return kept, _rows(tracks)
+
+    n = len(frames[0])
+    reference, rows = run(np.arange(n), shuffled=False)
+    # Reversed first frame: the internal track table is in the opposite order
+    for first, shuffled in ((np.arange(n)[::-1], False), (np.arange(n), True), (rng.permutation(n), True)):
+        kept, result_rows = run(first, shuffled)
+        assert kept.keys() == reference.keys()
+        for g, box in reference.items():
+            np.testing.assert_allclose(kept[g], box, rtol=0, atol=1e-6)
+        np.testing.assert_allclose(result_rows, rows, rtol=0, atol=1e-6)